@@ -1 +1,2 @@
 from app.api.routers import v1_router  # noqa
+from app.api.well_known import well_known_routes  # noqa
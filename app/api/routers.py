@@ -3,9 +3,13 @@ from fastapi import APIRouter
 from app.api.v1.users import user_routes
 from app.api.v1.projects import project_routes
 from app.api.v1.media import media
+from app.api.v1.metrics import metrics_routes
+from app.api.v1.tokens import token_routes
 
 v1_router = APIRouter(prefix='/api/v1')
 
 v1_router.include_router(user_routes, prefix='/users', tags=['users_auth'])
 v1_router.include_router(media, prefix="/media", tags=["media"])
 v1_router.include_router(project_routes, prefix='/projects', tags=['projects'])
+v1_router.include_router(token_routes, prefix='/tokens', tags=['tokens'])
+v1_router.include_router(metrics_routes, prefix='/metrics', tags=['metrics'])
@@ -0,0 +1,43 @@
+import typing as tp
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.config import settings
+from app.database import MongoManager
+from app.database.rabbit_mq import RabbitManager
+from app.repositories.user_cache import UserCache
+from app.services.deletion import CascadeDeletion
+from app.services.emails import EmailOutbox, TemplateRegistry
+from app.services.enrichment import CompanyEnrichment
+from app.services.fns import FnsClient
+from app.services.passwords import PasswordHasher
+from app.services.tokens import verified_tokens
+from app.utils.api_keys import api_key_matches, parse_api_keys
+
+metrics_routes = APIRouter()
+
+METRICS_API_KEYS: tp.List[bytes] = parse_api_keys(settings.METRICS_API_KEYS)
+
+
+def require_metrics_key(x_api_key: str = Header(default='')) -> None:
+    """
+    Internal state is served only to the monitoring holding one of METRICS_API_KEYS
+    """
+    if not api_key_matches(x_api_key, METRICS_API_KEYS):
+        raise HTTPException(status_code=401, detail='Invalid API key')
+
+
+@metrics_routes.get("/", status_code=200, dependencies=[Depends(require_metrics_key)])
+async def get_metrics() -> tp.Dict[str, tp.Any]:
+    return {
+        'password_hasher': PasswordHasher.metrics(),
+        'access_token_cache': verified_tokens.metrics(),
+        'email_outbox': EmailOutbox.metrics(),
+        'email_templates': TemplateRegistry.metrics(),
+        'events': RabbitManager.metrics(),
+        'fns': FnsClient.metrics(),
+        'company_enrichment': CompanyEnrichment.metrics(),
+        'user_cache': UserCache.metrics(),
+        'user_deletion': CascadeDeletion.metrics(),
+        'mongo': MongoManager.metrics(),
+    }
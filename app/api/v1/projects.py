@@ -2,7 +2,7 @@ import typing as tp
 
 from datetime import datetime
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, Request, Response
 
 from app.schemas.projects import (
     BaseProjectCreateUpdate,
@@ -12,6 +12,8 @@ from app.schemas.projects import (
     ProjectReadMembers
 )
 from fastapi.responses import PlainTextResponse
+from app.schemas.pagination import Cursor, cursor, next_cursor, stream_ndjson
+from app.schemas.projections import SparseFields, projection_for, sparse_fields
 from app.services import projects
 
 
@@ -30,17 +32,29 @@ async def register_private_person(request: Request, data: ProjectCreate) -> tp.D
 
 
 @project_routes.get("/get_projects/", status_code=200, response_model=tp.List[BaseProjectRead])
-async def get_project(request: Request):
+async def get_project(request: Request, response: Response, stream: bool = False, page: Cursor = Depends(cursor),
+                      fields: SparseFields = Depends(sparse_fields(BaseProjectRead, trusted=True))):
     user_id = request.state.user_id
-    return await projects.get_all_projects(owner_id=user_id)
+    if stream:
+        return stream_ndjson(projects.iterate_projects(owner_id=user_id, projection=fields.projection), fields)
+
+    found = await projects.get_all_projects(
+        owner_id=user_id, projection=fields.projection, after=page.after, limit=page.limit
+    )
+    after = next_cursor(found, page.limit)
+    if after is not None:
+        response.headers['X-Next-After'] = after
+    return fields.render(found, headers=dict(response.headers))
 
 
 @project_routes.get("/get/{project_id}/",
                     status_code=200,
                     response_model=BaseProjectCreateUpdate)
-async def get_project_by_id(request: Request, project_id: str):
+async def get_project_by_id(request: Request, project_id: str,
+                            fields: SparseFields = Depends(sparse_fields(BaseProjectCreateUpdate, trusted=True))):
     user_id = request.state.user_id
-    return await projects.get_project_by_id(project_id=project_id, owner_id=user_id)
+    project = await projects.get_project_by_id(project_id=project_id, owner_id=user_id, projection=fields.projection)
+    return fields.render(project)
 
 
 @project_routes.get("/get_project_members/{project_id}/",
@@ -48,7 +62,9 @@ async def get_project_by_id(request: Request, project_id: str):
                     response_model=ProjectReadMembers)
 async def get_project_members(request: Request, project_id: str):
     user_id = request.state.user_id
-    return await projects.get_project_by_id(project_id=project_id, owner_id=user_id)
+    return await projects.get_project_by_id(
+        project_id=project_id, owner_id=user_id, projection=projection_for(ProjectReadMembers)
+    )
 
 
 @project_routes.patch("/patch/{project_id}/", status_code=200, response_model=BaseProjectCreateUpdate)
@@ -0,0 +1,26 @@
+import typing as tp
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.config import settings
+from app.schemas import IntrospectTokensRequest, IntrospectTokensResponse
+from app import services
+from app.utils.api_keys import api_key_matches, parse_api_keys
+
+token_routes = APIRouter()
+
+SERVICE_API_KEYS: tp.List[bytes] = parse_api_keys(settings.TOKEN_INTROSPECTION_API_KEYS)
+
+
+def require_service_key(x_api_key: str = Header(default='')) -> None:
+    """
+    Only services holding one of TOKEN_INTROSPECTION_API_KEYS may call the endpoint
+    """
+    if not api_key_matches(x_api_key, SERVICE_API_KEYS):
+        raise HTTPException(status_code=401, detail='Invalid API key')
+
+
+@token_routes.post("/introspect", status_code=200, response_model=IntrospectTokensResponse,
+                   dependencies=[Depends(require_service_key)])
+async def introspect_tokens(data: IntrospectTokensRequest) -> tp.Dict[str, tp.Any]:
+    return {'tokens': await services.introspect_tokens(tokens=data.tokens)}
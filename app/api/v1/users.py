@@ -2,10 +2,10 @@ import typing as tp
 
 from datetime import datetime
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, Header, Request, Response
 
 
-from app.config import logger  # noqa
+from app.config import logger, settings  # noqa
 from app.enums import UserRole
 from app.schemas import (
     BaseUserRead as BaseUserReadSchema,
@@ -20,36 +20,76 @@ from app.schemas import (
     PrivateUserCreate,
     LegalUserCreate,
 )
+from app.schemas.pagination import Cursor, cursor, next_cursor, stream_ndjson
+from app.schemas.projections import SparseFields, projection_for, sparse_fields
 from app.schemas.tokens import ObtainTokenResponseSchema
-from app.schemas.users import PatchUserUpdateRequest, ReadUserProjects
+from app.schemas.users import (
+    DeletionJobStatus as DeletionJobStatusSchema,
+    EnrichmentStatus as EnrichmentStatusSchema,
+    PatchUserUpdateRequest,
+    ReadUserProjects,
+)
 from app import services
+from app.services.enrichment import CompanyEnrichment
 
 user_routes = APIRouter()
 
 
+def get_client_ip(request: Request) -> str:
+    forwarded_for = ','.join(request.headers.getlist('x-forwarded-for'))
+    return services.client_ip(request.client.host if request.client else None, forwarded_for)
+
+
+@user_routes.get("/", status_code=200, response_model=tp.List[BaseUserReadSchema])
+async def get_users(request: Request, response: Response, stream: bool = False, page: Cursor = Depends(cursor),
+                    fields: SparseFields = Depends(sparse_fields(BaseUserReadSchema, trusted=True))):
+    await services.require_admin(user_id=request.state.user_id)
+    if stream:
+        return stream_ndjson(services.iterate_users(projection=fields.projection), fields)
+
+    limit = page.limit or settings.PAGE_DEFAULT_LIMIT
+    users = await services.get_users_page(after=page.after, limit=limit, projection=fields.projection)
+    after = next_cursor(users, limit)
+    if after is not None:
+        response.headers['X-Next-After'] = after
+    return fields.render(users, headers=dict(response.headers))
+
+
 @user_routes.get("/get_projects/", status_code=200, response_model=ReadUserProjects)
 async def get_user_projects(request: Request):
     user_id = request.state.user_id
-    return await services.get_user_by_id(user_id)
+    return await services.get_user_by_id(user_id, projection=projection_for(ReadUserProjects))
 
 
 @user_routes.get("/me/", status_code=200, response_model=BaseUserReadSchema)
-async def get_user(request: Request):
-    return await services.get_user_by_id(user_id=request.state.user_id)
+async def get_user(request: Request, fields: SparseFields = Depends(sparse_fields(BaseUserReadSchema, trusted=True))):
+    user = await services.get_user_by_id(user_id=request.state.user_id, projection=fields.projection)
+    return fields.render(user)
+
 
+@user_routes.get("/me/enrichment/", status_code=200, response_model=EnrichmentStatusSchema)
+async def get_enrichment_status(request: Request):
+    return await services.get_enrichment_status(user_id=request.state.user_id)
 
-@user_routes.delete("/me/", status_code=200)
+
+@user_routes.delete("/me/", status_code=202)
 async def delete_person(request: Request):
     return await services.delete_person(user_id=request.state.user_id)
 
 
+@user_routes.get("/deletion/{job_id}/", status_code=200, response_model=DeletionJobStatusSchema)
+async def get_deletion_status(request: Request, job_id: str):
+    return await services.get_deletion_status(job_id=job_id, user_id=request.state.user_id)
+
+
 @user_routes.patch("/me/", status_code=200, response_model=BaseUserReadSchema)
 async def update_user_me(request: Request, body: PatchUserUpdateRequest):
     return await services.update_user(user_id=request.state.user_id, instance=body)
 
 
 @user_routes.post("/private_person/register/", status_code=201, response_model=ObtainTokenResponseSchema)
-async def register_private_person(data: PrivateUserCreate) -> tp.Dict[str, tp.Any]:
+async def register_private_person(request: Request, data: PrivateUserCreate) -> tp.Dict[str, tp.Any]:
+    await services.check_rate_limit('register', ip=get_client_ip(request), email=data.email)
     person = CreateUpdatePrivateUserSchema(
         role=UserRole.PRIVATE_PERSON,
         is_verified=False,
@@ -61,28 +101,34 @@ async def register_private_person(data: PrivateUserCreate) -> tp.Dict[str, tp.An
 
 
 @user_routes.post("/legal_person/register/", status_code=201, response_model=TokenSchema)
-async def register_legal_person(data: LegalUserCreate):
+async def register_legal_person(request: Request, data: LegalUserCreate):
+    await services.check_rate_limit('register', ip=get_client_ip(request), email=data.email)
     # todo: switch on after server's adjusting
-    data.additional_info = await services.collect_additional_info(data.additional_info.dict())
+    data.additional_info = await services.prepare_legal_additional_info(data.additional_info.dict())
     person = CreateUpdateRegularUserSchema(role=UserRole.LEGAL_PERSON, is_verified=False,
                                            created_at=datetime.now(), **data.dict())
     user = await services.create_user(person=person)
+    CompanyEnrichment.notify()
     return await services.create_tokens(user_id=str(user.get("_id")))
 
 
 @user_routes.post("/login/", response_model=RetrieveLoginSchema, status_code=200)
-async def login(data: LoginSchema):
+async def login(request: Request, data: LoginSchema):
+    await services.check_rate_limit('login', ip=get_client_ip(request), email=data.email)
     return await services.login_user(data=data)
 
 
 @user_routes.post("/forgot_password/", status_code=200)
-async def forgot_password(email: EmailSchema):
+async def forgot_password(request: Request, email: EmailSchema):
+    await services.check_rate_limit('forgot_password', ip=get_client_ip(request), email=email.email)
     await services.forgot_password(email=email)
 
 
 @user_routes.post("/reset_password/", status_code=200)
-async def reset_password(data: ResetPasswordsSchema):
-    return await services.reset_password(data=data)
+async def reset_password(request: Request, data: ResetPasswordsSchema):
+    client_ip = get_client_ip(request)
+    await services.check_rate_limit('reset_password', ip=client_ip)
+    return await services.reset_password(data=data, client_ip=client_ip)
 
 
 @user_routes.post("/activate/{user_id}/", status_code=200)
@@ -96,6 +142,16 @@ async def refresh_token(token: RefreshTokenSchema):
     return await services.generate_access_token_from_refresh(refresh_token=token.refresh_token)
 
 
+@user_routes.post("/logout/", status_code=200)
+async def logout(token: RefreshTokenSchema, all_sessions: bool = False, authorization: str = Header(default='')):
+    token_type, _, access_token = authorization.partition(' ')
+    await services.logout(
+        refresh_token=token.refresh_token,
+        all_sessions=all_sessions,
+        access_token=access_token if token_type == settings.TOKEN_TYPE else None,
+    )
+
+
 @user_routes.post("/check_inn/", status_code=200)
 async def check_company_by_inn(inn: str):
     await services.check_exist_company_by_inn(inn)
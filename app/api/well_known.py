@@ -0,0 +1,14 @@
+import typing as tp
+
+from fastapi import APIRouter, Response
+
+from app.config import settings
+from app.services.keys import SigningKeys
+
+well_known_routes = APIRouter(prefix='/.well-known')
+
+
+@well_known_routes.get("/jwks.json", status_code=200)
+async def get_jwks(response: Response) -> tp.Dict[str, tp.Any]:
+    response.headers['Cache-Control'] = f'public, max-age={settings.JWKS_MAX_AGE}'
+    return await SigningKeys.jwks()
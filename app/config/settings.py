@@ -1,5 +1,6 @@
 import logging
 import os
+import tempfile
 
 logger = logging.getLogger()
 logging.basicConfig(level=logging.DEBUG,
@@ -13,6 +14,24 @@ PORT = os.environ.get('FASTAPI_PORT', '8000')
 # MongoManager configuration
 MONGO_URI = os.environ['MONGO_URI']
 DB_NAME = os.environ['DB_NAME']
+# 'mongo' or 'memory', in-process collections for tests and benchmarks
+STORAGE_BACKEND: str = os.environ.get('STORAGE_BACKEND', 'mongo')
+MONGO_BULK_BATCH_SIZE: int = int(os.environ.get('MONGO_BULK_BATCH_SIZE', 1000))
+PAGE_DEFAULT_LIMIT: int = int(os.environ.get('PAGE_DEFAULT_LIMIT', 100))
+PAGE_MAX_LIMIT: int = int(os.environ.get('PAGE_MAX_LIMIT', 1000))
+STREAM_BATCH_SIZE: int = int(os.environ.get('STREAM_BATCH_SIZE', 500))
+MONGO_MAX_POOL_SIZE: int = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100))
+# connections opened at startup and kept open, first requests do not pay for the handshake
+MONGO_MIN_POOL_SIZE: int = int(os.environ.get('MONGO_MIN_POOL_SIZE', 10))
+MONGO_MAX_IDLE_TIME_MS: int = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 300000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000))
+MONGO_CONNECT_TIMEOUT_MS: int = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+# in order of preference, snappy needs python-snappy installed
+MONGO_COMPRESSORS: str = os.environ.get('MONGO_COMPRESSORS', 'zstd,zlib')
+# read preference of reads that tolerate replication lag (listings, streams, registry mirror),
+# e.g. secondaryPreferred
+MONGO_SECONDARY_READ_PREFERENCE: str = os.environ.get('MONGO_SECONDARY_READ_PREFERENCE', 'primary')
 
 SERVICE_URL = os.environ['SERVICE_URL']
 PARSER_COLLECTION_NAME = os.environ['PARSER_COLLECTION_NAME']
@@ -26,6 +45,29 @@ JWT_REFRESH_TTL = int(os.environ.get('JWT_REFRESH_TTL', 120))
 REFRESH_TOKEN_JWT_SUBJECT: str = 'refresh'
 ACCESS_TOKEN_JWT_SUBJECT: str = 'access'
 TOKEN_TYPE: str = "Bearer"
+ACCESS_TOKEN_CACHE_SIZE: int = int(os.environ.get('ACCESS_TOKEN_CACHE_SIZE', 10000))
+REVOCATION_SYNC_INTERVAL: int = int(os.environ.get('REVOCATION_SYNC_INTERVAL', 5))
+TOKEN_INTROSPECTION_MAX_BATCH: int = int(os.environ.get('TOKEN_INTROSPECTION_MAX_BATCH', 1000))
+# comma-separated keys of the services allowed to introspect tokens(X-Api-Key header), none disables the endpoint
+TOKEN_INTROSPECTION_API_KEYS: str = os.environ.get('TOKEN_INTROSPECTION_API_KEYS', '')
+# comma-separated keys of the monitoring allowed to read /metrics/(X-Api-Key header), none disables the endpoint
+METRICS_API_KEYS: str = os.environ.get('METRICS_API_KEYS', '')
+
+# Signing keys configuration(RS*/PS*/ES*/EdDSA algorithms only, HS* use SECRET_KEY)
+JWT_KEY_ROTATION_INTERVAL: int = int(os.environ.get('JWT_KEY_ROTATION_INTERVAL', 60 * 24 * 7))
+JWT_KEY_OVERLAP: int = int(os.environ.get('JWT_KEY_OVERLAP', JWT_REFRESH_TTL))
+JWT_KEY_REFRESH_INTERVAL: int = int(os.environ.get('JWT_KEY_REFRESH_INTERVAL', 60))
+JWT_KEY_MIN_RELOAD_INTERVAL: int = int(os.environ.get('JWT_KEY_MIN_RELOAD_INTERVAL', 5))
+JWT_RSA_KEY_SIZE: int = int(os.environ.get('JWT_RSA_KEY_SIZE', 2048))
+JWKS_MAX_AGE: int = int(os.environ.get('JWKS_MAX_AGE', 300))
+# seconds a replica may hold the rotation lease, a key is generated by one replica at a time
+JWT_KEY_ROTATION_LEASE: int = int(os.environ.get('JWT_KEY_ROTATION_LEASE', 60))
+JWT_KEY_WAIT_ATTEMPTS: int = int(os.environ.get('JWT_KEY_WAIT_ATTEMPTS', 25))
+
+# Password hashing configuration
+PASSWORD_HASH_EXECUTOR: str = os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread')
+PASSWORD_HASH_WORKERS: int = int(os.environ.get('PASSWORD_HASH_WORKERS', 4))
+PASSWORD_HASH_QUEUE_SIZE: int = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 64))
 
 # Redis configuration
 REDIS_HOST: str = os.environ['REDIS_HOST']
@@ -33,13 +75,89 @@ REDIS_PORT: str = os.environ['REDIS_PORT']
 REDIS_URI: str = f'redis://{REDIS_HOST}:{REDIS_PORT}'
 # REDIS_URI = f'0.0.0.0:{REDIS_PORT}'
 
+# Password reset configuration
+RESET_CODE_STORE: str = os.environ.get('RESET_CODE_STORE', 'redis')
+RESET_CODE_TTL: int = int(os.environ.get('RESET_CODE_TTL', 30 * 60))
+RESET_CODE_ATTEMPTS: int = int(os.environ.get('RESET_CODE_ATTEMPTS', 5))
+
+# Rate limiting configuration('<requests>/<seconds>')
+RATE_LIMIT_LOGIN_IP: str = os.environ.get('RATE_LIMIT_LOGIN_IP', '30/60')
+RATE_LIMIT_LOGIN_EMAIL: str = os.environ.get('RATE_LIMIT_LOGIN_EMAIL', '10/300')
+RATE_LIMIT_FORGOT_PASSWORD_IP: str = os.environ.get('RATE_LIMIT_FORGOT_PASSWORD_IP', '10/3600')
+RATE_LIMIT_FORGOT_PASSWORD_EMAIL: str = os.environ.get('RATE_LIMIT_FORGOT_PASSWORD_EMAIL', '3/900')
+RATE_LIMIT_RESET_PASSWORD_IP: str = os.environ.get('RATE_LIMIT_RESET_PASSWORD_IP', '10/60')
+RATE_LIMIT_REGISTER_IP: str = os.environ.get('RATE_LIMIT_REGISTER_IP', '20/3600')
+RATE_LIMIT_REGISTER_EMAIL: str = os.environ.get('RATE_LIMIT_REGISTER_EMAIL', '5/3600')
+RATE_LIMIT_LOCAL_KEYS: int = int(os.environ.get('RATE_LIMIT_LOCAL_KEYS', 100000))
+LOCKOUT_THRESHOLD: int = int(os.environ.get('LOCKOUT_THRESHOLD', 5))
+LOCKOUT_BASE_SECONDS: int = int(os.environ.get('LOCKOUT_BASE_SECONDS', 60))
+LOCKOUT_MAX_SECONDS: int = int(os.environ.get('LOCKOUT_MAX_SECONDS', 24 * 60 * 60))
+LOCKOUT_FAILURES_WINDOW: int = int(os.environ.get('LOCKOUT_FAILURES_WINDOW', 24 * 60 * 60))
+# comma-separated addresses or networks of the load balancers, X-Forwarded-For is honoured only when sent by them
+TRUSTED_PROXIES: str = os.environ.get('TRUSTED_PROXIES', '')
+
 # Email configuration
 EMAIL_HOST_USER: str = os.environ['EMAIL_HOST_USER']
 EMAIL_HOST_PASSWORD: str = os.environ['EMAIL_HOST_PASSWORD']
 EMAIL_HOST: str = os.environ['EMAIL_HOST']
+EMAIL_PORT: int = int(os.environ.get('EMAIL_PORT', 465))
+EMAIL_USE_SSL: bool = os.environ.get('EMAIL_USE_SSL', 'true').lower() in ('1', 'true', 'yes')
+EMAIL_TIMEOUT: int = int(os.environ.get('EMAIL_TIMEOUT', 30))
+EMAIL_WORKERS: int = int(os.environ.get('EMAIL_WORKERS', 2))
+EMAIL_OUTBOX_SIZE: int = int(os.environ.get('EMAIL_OUTBOX_SIZE', 1000))
+EMAIL_MAX_RETRIES: int = int(os.environ.get('EMAIL_MAX_RETRIES', 5))
+EMAIL_RETRY_BACKOFF: float = float(os.environ.get('EMAIL_RETRY_BACKOFF', 1))
+
+# User documents cache, seconds; the local TTL must not exceed USER_CACHE_TTL
+USER_CACHE_SIZE: int = int(os.environ.get('USER_CACHE_SIZE', 10000))
+USER_CACHE_TTL: int = int(os.environ.get('USER_CACHE_TTL', 3600))
+USER_CACHE_LOCAL_TTL: int = int(os.environ.get('USER_CACHE_LOCAL_TTL', 60))
+# seconds a document stored in redis is served, bounds staleness after an invalidation that did not reach redis
+USER_CACHE_MAX_STALENESS: int = int(os.environ.get('USER_CACHE_MAX_STALENESS', 300))
+
+# Cascade deletion of users
+DELETION_BATCH_SIZE: int = int(os.environ.get('DELETION_BATCH_SIZE', 500))
+# milliseconds of pause between batches, keeps write load of a big deletion low
+DELETION_THROTTLE_MS: int = int(os.environ.get('DELETION_THROTTLE_MS', 50))
+DELETION_LEASE: int = int(os.environ.get('DELETION_LEASE', 60))
+DELETION_POLL_INTERVAL: float = float(os.environ.get('DELETION_POLL_INTERVAL', 10))
+
+# Email templates configuration
+TEMPLATES_DIR: str = os.environ.get('TEMPLATES_DIR', 'app/static/templates')
+TEMPLATES_AUTO_RELOAD: bool = os.environ.get('TEMPLATES_AUTO_RELOAD', 'false').lower() in ('1', 'true', 'yes')
+TEMPLATES_BYTECODE_CACHE_DIR: str = os.environ.get(
+    'TEMPLATES_BYTECODE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'ms-auth-templates')
+)
 
 # Fns api
 API_FNS_KEY: str = os.environ['API_FNS_KEY']
+API_FNS_URL: str = os.environ.get('API_FNS_URL', 'https://api-fns.ru/api/egr')
+FNS_TIMEOUT: int = int(os.environ.get('FNS_TIMEOUT', 10))
+FNS_CONNECTION_LIMIT: int = int(os.environ.get('FNS_CONNECTION_LIMIT', 20))
+FNS_CACHE_SIZE: int = int(os.environ.get('FNS_CACHE_SIZE', 10000))
+# seconds, registry misses are cached for a shorter time
+FNS_CACHE_TTL: int = int(os.environ.get('FNS_CACHE_TTL', 86400))
+FNS_NEGATIVE_CACHE_TTL: int = int(os.environ.get('FNS_NEGATIVE_CACHE_TTL', 600))
+# seconds for the whole lookup including a hedged request
+FNS_DEADLINE: float = float(os.environ.get('FNS_DEADLINE', 5))
+FNS_BREAKER_FAILURES: int = int(os.environ.get('FNS_BREAKER_FAILURES', 5))
+FNS_BREAKER_RESET_TIMEOUT: float = float(os.environ.get('FNS_BREAKER_RESET_TIMEOUT', 30))
+FNS_HEDGE: bool = os.environ.get('FNS_HEDGE', 'false').lower() in ('1', 'true', 'yes')
+FNS_HEDGE_MIN_SAMPLES: int = int(os.environ.get('FNS_HEDGE_MIN_SAMPLES', 20))
+# milliseconds, lower bound of the hedge delay
+FNS_HEDGE_MIN_DELAY: float = float(os.environ.get('FNS_HEDGE_MIN_DELAY', 50))
+
+# Local company registry mirror, seconds after which a mirrored company is refreshed from api-fns.ru
+COMPANY_MIRROR_MAX_AGE: int = int(os.environ.get('COMPANY_MIRROR_MAX_AGE', 30 * 24 * 60 * 60))
+COMPANY_IMPORT_CHUNK_SIZE: int = int(os.environ.get('COMPANY_IMPORT_CHUNK_SIZE', 1000))
+
+# Company enrichment of legal persons: 'sync' (during registration) or 'deferred' (background worker)
+COMPANY_ENRICHMENT: str = os.environ.get('COMPANY_ENRICHMENT', 'sync')
+ENRICHMENT_INTERVAL: float = float(os.environ.get('ENRICHMENT_INTERVAL', 5))
+ENRICHMENT_BATCH_SIZE: int = int(os.environ.get('ENRICHMENT_BATCH_SIZE', 50))
+ENRICHMENT_MAX_ATTEMPTS: int = int(os.environ.get('ENRICHMENT_MAX_ATTEMPTS', 5))
+# seconds, doubled after every failed attempt
+ENRICHMENT_RETRY_DELAY: int = int(os.environ.get('ENRICHMENT_RETRY_DELAY', 60))
 
 # Test
 USER_EMAIL: str = os.environ.get("USER_EMAIL", 'some_mail@mail.ru')
@@ -48,3 +166,14 @@ USER_INN: str = os.environ.get("USER_INN", '123123')
 # Rabbit
 RABBIT_PORT = os.environ.get("RABBIT_PORT", 5672)
 RABBIT_HOST = os.environ.get("RABBIT_HOST", 'localhost')
+RABBIT_USER: str = os.environ.get("RABBIT_USER", 'guest')
+RABBIT_PASSWORD: str = os.environ.get("RABBIT_PASSWORD", 'guest')
+RABBIT_URI: str = os.environ.get("RABBIT_URI", f'amqp://{RABBIT_USER}:{RABBIT_PASSWORD}@{RABBIT_HOST}:{RABBIT_PORT}/')
+
+# Domain events: 'rabbit', 'memory' or 'disabled'
+EVENT_BROKER: str = os.environ.get('EVENT_BROKER', 'disabled')
+EVENT_EXCHANGE: str = os.environ.get('EVENT_EXCHANGE', 'auth.events')
+EVENT_CHANNEL_POOL_SIZE: int = int(os.environ.get('EVENT_CHANNEL_POOL_SIZE', 4))
+EVENT_QUEUE_SIZE: int = int(os.environ.get('EVENT_QUEUE_SIZE', 10000))
+EVENT_BATCH_SIZE: int = int(os.environ.get('EVENT_BATCH_SIZE', 100))
+EVENT_LINGER_MS: int = int(os.environ.get('EVENT_LINGER_MS', 10))
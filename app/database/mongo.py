@@ -1,32 +1,201 @@
+import asyncio
+import threading
+import time
+import typing as tp
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo.errors import PyMongoError
+from pymongo import IndexModel, WriteConcern, monitoring
+from pymongo.errors import OperationFailure, PyMongoError
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 from app.config import settings, logger
+from app.utils.metrics import TimingStats
+
+_INDEX_OPTIONS = ('unique', 'sparse', 'expireAfterSeconds', 'partialFilterExpression')
+
+# acknowledged by the primary only, for idempotent bulk writes that are safe to repeat
+FAST_WRITES = WriteConcern(w=1)
+
+
+def _index_matches(existing: tp.Dict[str, tp.Any], declared: tp.Dict[str, tp.Any]) -> bool:
+    if [tuple(key) for key in existing['key']] != list(declared['key'].items()):
+        return False
+    return all(bool(existing.get(option)) == bool(declared.get(option)) if option in ('unique', 'sparse')
+               else existing.get(option) == declared.get(option) for option in _INDEX_OPTIONS)
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Connection pool events of every server: checkout wait time and connection counts.
+    Events come from the driver threads, checkout start and end of one request happen in the same thread,
+    the counters shared between the threads are updated under a lock
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts: tp.Dict[str, TimingStats] = {}
+        self.in_use: tp.Dict[str, int] = {}
+        self.created: int = 0
+        self.closed: int = 0
+        self.cleared: int = 0
+        self._started = threading.local()
+
+    @staticmethod
+    def _server(address: tp.Tuple[str, int | None]) -> str:
+        return f'{address[0]}:{address[1]}'
+
+    def _wait(self, event: monitoring.ConnectionCheckedOutEvent | monitoring.ConnectionCheckOutFailedEvent,
+              failed: bool = False) -> None:
+        started = getattr(self._started, 'value', None)
+        if started is None:
+            return
+        self._started.value = None
+        with self._lock:
+            stats = self.checkouts.setdefault(self._server(event.address), TimingStats())
+            stats.observe((time.perf_counter() - started) * 1000, failed=failed)
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        ...
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        ...
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        with self._lock:
+            self.cleared += 1
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        ...
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self.created += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        ...
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self.closed += 1
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self._started.value = time.perf_counter()
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self._wait(event, failed=True)
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        self._wait(event)
+        server = self._server(event.address)
+        with self._lock:
+            self.in_use[server] = self.in_use.get(server, 0) + 1
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        server = self._server(event.address)
+        with self._lock:
+            self.in_use[server] = max(0, self.in_use.get(server, 0) - 1)
+
+    def as_dict(self) -> tp.Dict[str, tp.Any]:
+        with self._lock:
+            return {
+                'created': self.created,
+                'closed': self.closed,
+                'cleared': self.cleared,
+                'servers': {
+                    server: {'in_use': self.in_use.get(server, 0), 'checkout_wait': stats.as_dict()}
+                    for server, stats in self.checkouts.items()
+                },
+            }
+
+
+class _Database:
+    """
+    Database of the client, the client is created on the first access
+    """
+
+    def __get__(self, instance: tp.Any, owner: tp.Any) -> AsyncIOMotorDatabase:
+        return MongoManager.get_client()[settings.DB_NAME]
 
 
 class MongoManager:
-    client: AsyncIOMotorClient = AsyncIOMotorClient(settings.MONGO_URI)
-    db: AsyncIOMotorDatabase = client[settings.DB_NAME]
+    client: AsyncIOMotorClient | None = None
+    db: AsyncIOMotorDatabase = _Database()  # type: ignore
+    pool_monitor = PoolMonitor()
+    secondary_reads = make_read_preference(
+        read_pref_mode_from_name(settings.MONGO_SECONDARY_READ_PREFERENCE), None
+    )
+    # repositories declaring indexes, registered by BaseRepository
+    repositories: tp.List[type] = []
+
+    @classmethod
+    def get_client(cls) -> AsyncIOMotorClient:
+        if cls.client is None:
+            cls.client = AsyncIOMotorClient(
+                settings.MONGO_URI,
+                maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                compressors=settings.MONGO_COMPRESSORS,
+                event_listeners=[cls.pool_monitor],
+            )
+        return cls.client
 
     @classmethod
     async def connect(cls):
+        if settings.STORAGE_BACKEND != 'mongo':
+            logger.info(f"MongoDB is not used, documents are kept in {settings.STORAGE_BACKEND} storage")
+            return cls
+        client = cls.get_client()
         try:
+            await client.admin.command('ping')
+            # concurrent pings check out min pool size connections at once instead of waiting
+            # for the driver to open them in the background
+            await asyncio.gather(*(client.admin.command('ping') for _ in range(settings.MONGO_MIN_POOL_SIZE)))
             logger.info("Connected to MongoDB")
-            if cls.db is None:
-                cls.db = cls.client[settings.DB_NAME]
-            return cls
         except PyMongoError as e:
-            logger.info(f"Error connecting to MongoDB: {str(e)}")
+            logger.error(f"Error connecting to MongoDB: {str(e)}")
+        return cls
 
     @classmethod
     async def close(cls):
-        if cls.client:
+        if cls.client is not None:
             cls.client.close()
+            cls.client = None
+
+    @classmethod
+    async def reconcile_indexes(cls, collection: tp.Any, indexes: tp.List[IndexModel]) -> None:
+        """
+        Create missing indexes and recreate the ones whose keys or options changed, idempotent
+        """
+        existing = await collection.index_information()
+        for index in indexes:
+            declared = index.document
+            current = existing.get(declared['name'])
+            if current is not None and _index_matches(current, declared):
+                continue
+            try:
+                if current is not None:
+                    logger.info(f"Recreating index {collection.name}.{declared['name']}")
+                    await collection.drop_index(declared['name'])
+                await collection.create_indexes([index])
+            except OperationFailure as e:
+                # e.g. duplicates left in the data, the service keeps working without the index
+                logger.error(f"Failed to create index {collection.name}.{declared['name']}: {str(e)}")
 
     @classmethod
     async def create_indexes(cls):
-        # TODO create indexes
-        ...
+        for repository_class in cls.repositories:
+            repository = repository_class()
+            await repository.prepare()
+            await cls.reconcile_indexes(repository.documents(), repository.indexes)
+        logger.info("MongoDB indexes are reconciled")
 
     @classmethod
     async def get_db(cls) -> AsyncIOMotorDatabase:
-        return cls.db if cls.db is not None else await cls.connect()
+        return cls.db
+
+    @classmethod
+    def metrics(cls) -> tp.Dict[str, tp.Any]:
+        return {'pool': cls.pool_monitor.as_dict()}
@@ -1,42 +1,218 @@
-from pika import ConnectionParameters, BlockingConnection
-from pika.exceptions import AMQPConnectionError
-from app.config.settings import Config, logger  # type: ignore
+import json
+import uuid
+import time
+import asyncio
+import typing as tp
+
+from abc import ABC, abstractmethod
+
+import aio_pika
+from aio_pika.pool import Pool  # type: ignore
+
+from app.config import settings, logger
+from app.utils.metrics import TimingStats
+
+
+class EventMessage(tp.NamedTuple):
+    routing_key: str
+    body: bytes
+    message_id: str
+
+
+class BaseBroker(ABC):
+    @abstractmethod
+    async def connect(self) -> None:
+        ...
+
+    @abstractmethod
+    async def publish_batch(self, messages: tp.List[EventMessage]) -> None:
+        """
+        Publish the messages, return once the broker has confirmed all of them
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+
+class RabbitBroker(BaseBroker):
+    """
+    Robust connection with a pool of channels in publisher confirms mode, publishes go to a topic exchange
+    """
+
+    def __init__(self):
+        self.connection: aio_pika.abc.AbstractRobustConnection | None = None
+        self.channels: Pool | None = None
+
+    async def _get_channel(self) -> aio_pika.abc.AbstractChannel:
+        return await self.connection.channel(publisher_confirms=True)  # type: ignore
+
+    async def connect(self) -> None:
+        self.connection = await aio_pika.connect_robust(settings.RABBIT_URI)
+        self.channels = Pool(self._get_channel, max_size=settings.EVENT_CHANNEL_POOL_SIZE)
+        async with self.channels.acquire() as channel:
+            await channel.declare_exchange(settings.EVENT_EXCHANGE, aio_pika.ExchangeType.TOPIC, durable=True)
+        logger.info("Connected to RabbitMQ")
+
+    async def publish_batch(self, messages: tp.List[EventMessage]) -> None:
+        async with self.channels.acquire() as channel:  # type: ignore
+            exchange = await channel.get_exchange(settings.EVENT_EXCHANGE, ensure=False)
+            # confirmations are awaited together, the batch costs a single round trip
+            await asyncio.gather(*(
+                exchange.publish(
+                    aio_pika.Message(
+                        body=message.body,
+                        content_type='application/json',
+                        message_id=message.message_id,
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                    ),
+                    routing_key=message.routing_key,
+                )
+                for message in messages
+            ))
+
+    async def close(self) -> None:
+        if self.channels is not None:
+            await self.channels.close()
+            self.channels = None
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+
+class MemoryBroker(BaseBroker):
+    """
+    In-process stand-in for tests and local runs without RabbitMQ
+    """
+
+    def __init__(self):
+        self.batches: tp.List[tp.List[EventMessage]] = []
+
+    @property
+    def messages(self) -> tp.List[EventMessage]:
+        return [message for batch in self.batches for message in batch]
+
+    async def connect(self) -> None:
+        ...
+
+    async def publish_batch(self, messages: tp.List[EventMessage]) -> None:
+        self.batches.append(list(messages))
+
+    async def close(self) -> None:
+        ...
+
+
+def get_broker() -> BaseBroker | None:
+    if settings.EVENT_BROKER == 'rabbit':
+        return RabbitBroker()
+    if settings.EVENT_BROKER == 'memory':
+        return MemoryBroker()
+    return None
 
 
 class RabbitManager:
-    parameters: ConnectionParameters = ConnectionParameters(Config.RABBIT_HOST, Config.RABBIT_PORT)
-    connection: BlockingConnection = BlockingConnection(parameters)
-    channel = connection.channel()
+    """
+    Non-blocking event publisher: publish() only enqueues, a background task collects messages
+    for EVENT_LINGER_MS and publishes them as one confirmed batch.
+    close() enqueues a stop marker, so the task publishes everything queued before it and exits
+    """
+
+    broker: BaseBroker | None = None
+    queue: asyncio.Queue | None = None
+    task: asyncio.Task | None = None
+    stats = TimingStats()
+    published: int = 0
+    dropped: int = 0
 
     @classmethod
-    async def connect(cls):
-        try:
-            logger.info("Connected to RabbitMQ")
-            if cls.connection is None or cls.connection.is_closed:
-                cls.connection = BlockingConnection(cls.parameters)
+    async def connect(cls, broker: BaseBroker | None = None):
+        cls.broker = broker or get_broker()
+        if cls.broker is None:
+            logger.info("Event publishing is disabled")
             return cls
-        except AMQPConnectionError as e:
-            logger.info(f"Error connecting to RabbitMQ: {str(e)}")
-            raise ConnectionError("Failed to connect to RabbitMQ")
+        await cls.broker.connect()
+        cls.queue = asyncio.Queue(maxsize=settings.EVENT_QUEUE_SIZE)
+        cls.task = asyncio.create_task(cls._work())
+        return cls
+
+    @classmethod
+    def publish(cls, routing_key: str, payload: tp.Dict[str, tp.Any]) -> None:
+        if cls.queue is None:
+            return
+        message_id = str(uuid.uuid4())
+        body = json.dumps(
+            {'event': routing_key, 'id': message_id, 'occurred_at': time.time(), 'data': payload}, default=str
+        ).encode()
+        try:
+            cls.queue.put_nowait(EventMessage(routing_key=routing_key, body=body, message_id=message_id))
+        except asyncio.QueueFull:
+            cls.dropped += 1
+            logger.warning(f"Event queue is full, {routing_key} event is dropped")
 
     @classmethod
-    async def create_channel(cls):
-        return cls.connection.channel()
+    def _drain(cls, batch: tp.List[EventMessage]) -> bool:
+        """
+        Move queued messages to the batch, return True if the stop marker was taken
+        """
+        while len(batch) < settings.EVENT_BATCH_SIZE and not cls.queue.empty():  # type: ignore
+            message = cls.queue.get_nowait()  # type: ignore
+            if message is None:
+                return True
+            batch.append(message)
+        return False
 
     @classmethod
-    async def declare_queue(cls, queue_name):
-        cls.channel.queue_declare(queue=queue_name)
+    async def _publish(cls, batch: tp.List[EventMessage]) -> None:
+        try:
+            with cls.stats.measure():
+                await cls.broker.publish_batch(batch)  # type: ignore
+            cls.published += len(batch)
+        except Exception as e:
+            cls.dropped += len(batch)
+            logger.error(f"Failed to publish {len(batch)} events: {str(e)}")
 
     @classmethod
-    async def publish_message(cls, queue_name, message):
-        cls.channel.basic_publish(exchange='', routing_key=queue_name, body=message)
+    async def _work(cls):
+        while True:
+            message = await cls.queue.get()  # type: ignore
+            if message is None:
+                return
+            batch = [message]
+            await asyncio.sleep(settings.EVENT_LINGER_MS / 1000)
+            stopped = cls._drain(batch)
+            await cls._publish(batch)
+            if stopped:
+                return
 
     @classmethod
-    async def consume_messages(cls, queue_name, callback):
-        cls.channel.basic_consume(queue=queue_name, on_message_callback=callback, auto_ack=True)
-        cls.channel.start_consuming()
+    async def flush(cls):
+        if cls.queue is None:
+            return
+        while not cls.queue.empty():
+            batch: tp.List[EventMessage] = []
+            cls._drain(batch)
+            if batch:
+                await cls._publish(batch)
 
     @classmethod
     async def close(cls):
-        if cls.connection and not cls.connection.is_closed:
-            cls.connection.close()
+        if cls.task is not None:
+            # not cancelled: the task may hold a batch it took off the queue and has not published yet
+            await cls.queue.put(None)  # type: ignore
+            await cls.task
+            cls.task = None
+        await cls.flush()
+        if cls.broker is not None:
+            await cls.broker.close()
+        cls.broker = None
+        cls.queue = None
+
+    @classmethod
+    def metrics(cls) -> tp.Dict[str, tp.Any]:
+        return {
+            'broker': settings.EVENT_BROKER,
+            'queued': cls.queue.qsize() if cls.queue is not None else 0,
+            'published': cls.published,
+            'dropped': cls.dropped,
+            'batches': cls.stats.as_dict(),
+        }
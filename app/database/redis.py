@@ -12,26 +12,37 @@ class RedisManager:
 
     @classmethod
     async def connect(cls):
-        cls.redis = await aioredis.create_redis_pool(cls.redis_uri)
+        cls.redis = await aioredis.create_redis_pool(cls.redis_uri, encoding='utf-8')
         return cls
 
     @classmethod
     async def close(cls):
-        cls.redis.close()
-        await cls.redis.wait_closed()
+        if cls.redis is not None:
+            cls.redis.close()
+            await cls.redis.wait_closed()
+            cls.redis = None
 
     @classmethod
     def get_redis(cls):
         return cls.redis
 
+    @classmethod
+    async def get_connection(cls):
+        if cls.redis is None:
+            await cls.connect()
+        return cls.redis
+
 
 class RedisRepository(RedisManager):
     async def set(self, key: str, value: Any, expire: Optional[int] = None):
-        await self.redis.set(key, value, expire=expire)  # type: ignore
+        redis = await self.get_connection()
+        await redis.set(key, value, expire=expire)
 
     async def get(self, key: str) -> Any:
-        value = await self.redis.get(key)  # type: ignore
+        redis = await self.get_connection()
+        value = await redis.get(key)
         return value
 
     async def delete(self, key: str):
-        await self.redis.delete(key)  # type: ignore
+        redis = await self.get_connection()
+        await redis.delete(key)
@@ -1,13 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import v1_router
+from app.api import v1_router, well_known_routes
 from app.config import logger
-from app.database import MongoManager
-# from app.database.rabbit_mq import RabbitManager
+from app.database import MongoManager, RedisManager
+from app.database.rabbit_mq import RabbitManager
+from app.repositories.user_cache import UserCache
 from app.middlewares.auth_middleware import ApiKeyMiddleware
+from app.schemas.responses import ORJSONResponse
+from app.services.emails import EmailOutbox, TemplateRegistry
+from app.services.deletion import CascadeDeletion
+from app.services.enrichment import CompanyEnrichment
+from app.services.fns import FnsClient
+from app.services.keys import SigningKeys
+from app.services.passwords import PasswordHasher
+from app.services.sessions import RevocationFilter
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,9 +32,36 @@ app.add_middleware(ApiKeyMiddleware)
 @app.on_event("startup")
 async def on_startup():
     await MongoManager.connect()
-    # await RabbitManager.connect()
-    # await RedisManager.connect()
+    await MongoManager.create_indexes()
+    PasswordHasher.start()
+    await SigningKeys.start()
+    await RabbitManager.connect()
+    await RedisManager.connect()
+    await RevocationFilter.start()
+    await UserCache.start()
+    EmailOutbox.start()
+    TemplateRegistry.start()
+    FnsClient.start()
+    CompanyEnrichment.start()
+    CascadeDeletion.start()
     logger.info('Startup event - connecting to the database')
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await EmailOutbox.close()
+    await CompanyEnrichment.close()
+    await CascadeDeletion.close()
+    await RabbitManager.close()
+    await FnsClient.close()
+    await PasswordHasher.close()
+    await SigningKeys.close()
+    await RevocationFilter.close()
+    await UserCache.close()
+    await MongoManager.close()
+    await RedisManager.close()
+    logger.info('Shutdown event - releasing resources')
+
+
 app.include_router(v1_router)
+app.include_router(well_known_routes, tags=['jwks'])
@@ -1,50 +1,139 @@
+import re
 import json
-import jwt
 import typing as tp
 
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 from fastapi import Request
 
 from app.config import settings
+from app.services.tokens import UnexpectedTokenSubject, decode_access_token
 
 
-async def authenticate(request: Request) -> tp.Tuple[bool, tp.Dict[str, str]]:
+class RoutePolicy(tp.NamedTuple):
     """
-    Decorator for authenticate user(set current user to request)
+    Access policy for a path template, e.g. '/api/v1/projects/get/{project_id}/'
+    """
+
+    path: str
+    methods: tp.FrozenSet[str] | None = None
+    authenticated: bool = True
+
+    def applies_to(self, method: str) -> bool:
+        return method != 'OPTIONS' and (self.methods is None or method in self.methods)
+
+
+AUTH_POLICIES: tp.Tuple[RoutePolicy, ...] = (
+    RoutePolicy('/api/v1/users/', methods=frozenset({'GET'})),
+    RoutePolicy('/api/v1/users/me/'),
+    RoutePolicy('/api/v1/users/me/enrichment/'),
+    RoutePolicy('/api/v1/users/deletion/{job_id}/'),
+    RoutePolicy('/api/v1/users/get_projects/'),
+    RoutePolicy('/api/v1/media/me/avatar/'),
+    RoutePolicy('/api/v1/projects/create/'),
+    RoutePolicy('/api/v1/projects/get_projects/'),
+    RoutePolicy('/api/v1/projects/get/{project_id}/'),
+    RoutePolicy('/api/v1/projects/get_project_members/{project_id}/'),
+    RoutePolicy('/api/v1/projects/patch/{project_id}/'),
+    RoutePolicy('/api/v1/projects/delete/{project_id}/'),
+)
+
+_PATH_PARAM = re.compile(r'{([a-zA-Z_][a-zA-Z0-9_]*)}')
+
+
+class RouteMatcher:
+    """
+    Policy table compiled once: static paths go to a dict, templates are merged into one regex
     """
 
-    token_components = request.headers.get("Authorization", '').split(' ')
+    def __init__(self, policies: tp.Iterable[RoutePolicy]):
+        self.static: tp.Dict[str, RoutePolicy] = {}
+        self.templates: tp.Dict[str, RoutePolicy] = {}
+        patterns: tp.List[str] = []
+
+        for policy in policies:
+            if not _PATH_PARAM.search(policy.path):
+                self.static[policy.path] = policy
+                continue
+            group = f'p{len(patterns)}'
+            parts = _PATH_PARAM.split(policy.path)
+            # split() alternates literal chunks and parameter names
+            pattern = ''.join(re.escape(part) if index % 2 == 0 else '[^/]+' for index, part in enumerate(parts))
+            patterns.append(f'(?P<{group}>{pattern})')
+            self.templates[group] = policy
+
+        self.regex = re.compile('|'.join(patterns)) if patterns else None
+
+    def match(self, path: str) -> RoutePolicy | None:
+        policy = self.static.get(path)
+        if policy is not None or self.regex is None:
+            return policy
+
+        match = self.regex.fullmatch(path)
+        return self.templates[match.lastgroup] if match and match.lastgroup else None
+
+
+async def verify_authorization(authorization: str) -> tp.Tuple[bool, tp.Dict[str, str], str | None]:
+    """
+    Validate 'Authorization' header value, return (is_valid, error, user_id)
+    """
+
+    token_components = authorization.split(' ')
     token_type = token_components[0]
     access_token = token_components[-1]
 
     if token_type != settings.TOKEN_TYPE:
-        return False, {'token': 'Invalid token type'}
+        return False, {'token': 'Invalid token type'}, None
 
     try:
-        payload = jwt.decode(access_token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        if payload['sub'] != settings.ACCESS_TOKEN_JWT_SUBJECT:
-            return False, {'error': 'Access token is expected'}
-
-        request.state.user_id = payload['id']
-        return True, {}
+        payload = await decode_access_token(access_token)
+        return True, {}, payload['id']
+    except UnexpectedTokenSubject:
+        return False, {'error': 'Access token is expected'}, None
     except Exception:
-        request.state.user_id = None
-        return False, {'error': 'Invalid token or token is expired'}
+        return False, {'error': 'Invalid token or token is expired'}, None
+
+
+async def authenticate(request: Request) -> tp.Tuple[bool, tp.Dict[str, str]]:
+    """
+    Decorator for authenticate user(set current user to request)
+    """
 
+    is_valid, error_message, user_id = await verify_authorization(request.headers.get("Authorization", ''))
+    request.state.user_id = user_id
+    return is_valid, error_message
 
-class ApiKeyMiddleware(BaseHTTPMiddleware):
-    authorize_paths = [
-        '/api/v1/users/me/',
-        '/api/v1/media/me/avatar/'
-    ]
 
-    async def dispatch(self, request: Request, call_next: tp.Any) -> tp.Any:
-        if request.url.path in self.authorize_paths and request.method != 'OPTIONS':
-            is_valid, error_message = await authenticate(request=request)
+class ApiKeyMiddleware:
+    """
+    Pure ASGI middleware: authenticates requests whose path matches the policy table
+    """
+
+    def __init__(self, app: ASGIApp, policies: tp.Iterable[RoutePolicy] = AUTH_POLICIES):
+        self.app = app
+        self.matcher = RouteMatcher(policies)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault('state', {})
+        state['user_id'] = None
+
+        policy = self.matcher.match(scope['path'])
+        if policy is not None and policy.authenticated and policy.applies_to(scope['method']):
+            authorization = ''
+            for name, value in scope['headers']:
+                if name == b'authorization':
+                    authorization = value.decode('latin-1')
+                    break
+
+            is_valid, error_message, user_id = await verify_authorization(authorization)
             if not is_valid:
-                return Response(content=json.dumps(error_message), status_code=401)
-        else:
-            # TODO check and mb add set full user model
-            request.state.user_id = "1"
-        return await call_next(request)
+                response = Response(content=json.dumps(error_message), status_code=401)
+                await response(scope, receive, send)
+                return
+            state['user_id'] = user_id
+
+        await self.app(scope, receive, send)
@@ -1,3 +1,7 @@
 from app.repositories.base import BaseRepository  # noqa
 from app.repositories.users import UsersRepository  # noqa
 from app.repositories.projects import ProjectsRepository  # noqa
+from app.repositories.signing_keys import SigningKeysRepository  # noqa
+from app.repositories.companies import CompaniesRepository  # noqa
+from app.repositories.parsers import ParsersRepository  # noqa
+from app.repositories.deletion_jobs import DeletionJobsRepository  # noqa
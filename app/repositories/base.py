@@ -2,43 +2,197 @@ import typing as tp
 from typing import List
 
 from bson import ObjectId
+from motor.core import AgnosticCollection
+from pymongo import DeleteOne, IndexModel, ReturnDocument, UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError
 
+from app.config import settings
 from app.database import MongoManager
+from app.repositories.storage import BaseStorage, get_storage
 from app.schemas import BaseUserRead
 
 
+class BulkItemResult(tp.NamedTuple):
+    """
+    Outcome of a single item of a bulk operation, position is the index in the input
+    """
+
+    position: int
+    id: tp.Any
+    ok: bool = True
+    error: str | None = None
+
+
+def _batches(items: tp.Sequence[tp.Any], size: int) -> tp.Iterator[tp.Tuple[int, tp.Sequence[tp.Any]]]:
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+def _write_errors(error: BulkWriteError) -> tp.Dict[int, str]:
+    return {write_error['index']: write_error['errmsg'] for write_error in error.details.get('writeErrors', [])}
+
+
 class BaseRepository(MongoManager):
     collection: str
+    indexes: tp.ClassVar[tp.List[IndexModel]] = []
+    storage: tp.ClassVar[BaseStorage] = get_storage()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.indexes:
+            MongoManager.repositories.append(cls)
 
     def __init__(self):
         super().__init__()
 
-    async def get_by_id(self, _id: ObjectId) -> tp.Dict[tp.Any, tp.Any] | None:
-        return await self.db[self.collection].find_one({"_id": _id})  # type: ignore
+    async def prepare(self) -> None:
+        """
+        Called at startup before the indexes are reconciled, e.g. to backfill indexed fields
+        """
+
+    def documents(self) -> AgnosticCollection:
+        return self.storage.collection(self.collection)
+
+    def reader(self) -> AgnosticCollection:
+        """
+        Collection for reads that tolerate replication lag, routed by MONGO_SECONDARY_READ_PREFERENCE
+        """
+        return self.storage.collection(self.collection, read_preference=self.secondary_reads)
+
+    def writer(self, write_concern: WriteConcern | None = None) -> AgnosticCollection:
+        """
+        Collection with the write concern of a single operation, the client default if None
+        """
+        return self.storage.collection(self.collection, write_concern=write_concern)
+
+    async def get_by_id(self, _id: ObjectId,
+                        projection: tp.Dict[str, int] | None = None) -> tp.Dict[tp.Any, tp.Any] | None:
+        return await self.documents().find_one({"_id": _id}, projection)  # type: ignore
 
     async def update_password(self, user_id: str, _password: str):
-        return await self.db[self.collection].update_one({'_id': user_id}, {'_password': _password})
+        return await self.documents().update_one({'_id': user_id}, {'_password': _password})
 
     async def get_by_email(self, email: str):
-        return await self.db[self.collection].find_one({"email": email})
+        return await self.documents().find_one({"email": email})
+
+    async def get_all(self, projection: tp.Dict[str, int] | None = None) -> List[BaseUserRead]:
+        return await self.reader().find({}, projection).to_list(length=None)
 
-    async def get_by_name(self, name: str):
-        return await self.db[self.collection].find_one({"name": name})
+    async def find_page(self, query: tp.Dict[str, tp.Any], after: ObjectId | None = None, limit: int | None = None,
+                        projection: tp.Dict[str, int] | None = None) -> tp.List[dict]:
+        """
+        Keyset page ordered by _id, starts after the given id
+        """
+        if after is not None:
+            query = query | {'_id': {'$gt': after}}
+        cursor = self.reader().find(query, projection).sort('_id', 1)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit)
 
-    async def get_all(self) -> List[BaseUserRead]:
-        await self.get_db()
-        return await self.db[self.collection].find().to_list(length=None)
+    async def iterate(self, query: tp.Dict[str, tp.Any],
+                      projection: tp.Dict[str, int] | None = None) -> tp.AsyncIterator[dict]:
+        """
+        Documents one by one as the cursor fetches them in batches, memory does not grow with the collection
+        """
+        cursor = self.reader().find(query, projection).sort('_id', 1).batch_size(settings.STREAM_BATCH_SIZE)
+        document: dict
+        async for document in cursor:
+            yield document
 
     async def create(self, instance: dict) -> dict:
-        result = await self.db[self.collection].insert_one(instance)
-        created_instance = await self.db[self.collection].find_one({"_id": result.inserted_id})  # type: ignore
-        return created_instance  # type: ignore
+        # insert_one sets the generated _id on the instance itself
+        await self.documents().insert_one(instance)
+        return instance
 
     async def update_by_id(self, instance_id: ObjectId, instance) -> None:
-        await self.db[self.collection].update_one({'_id': instance_id}, {"$set": instance})
+        await self.documents().update_one({'_id': instance_id}, {"$set": instance})
+
+    async def set_fields(self, _id: ObjectId, fields: tp.Dict[str, tp.Any]) -> bool:
+        """
+        $set only the given fields, return False if there is no such document
+        """
+        result = await self.documents().update_one({'_id': _id}, {'$set': fields})
+        return result.matched_count > 0
+
+    async def update_and_get(self, query: tp.Dict[str, tp.Any],
+                             fields: tp.Dict[str, tp.Any]) -> tp.Dict[tp.Any, tp.Any] | None:
+        """
+        Atomically $set the fields of the document matching the query and return it updated, None if nothing matched
+        """
+        return await self.documents().find_one_and_update(  # type: ignore
+            query, {'$set': fields}, return_document=ReturnDocument.AFTER
+        )
+
+    async def delete_batch(self, query: tp.Dict[str, tp.Any], limit: int,
+                           write_concern: WriteConcern | None = None) -> int:
+        """
+        Delete at most limit matching documents, return how many were deleted
+        """
+        ids = [
+            document['_id']
+            for document in await self.documents().find(query, {'_id': 1}).limit(limit).to_list(length=limit)
+        ]
+        if not ids:
+            return 0
+        result = await self.writer(write_concern).delete_many({'_id': {'$in': ids}})
+        return result.deleted_count
 
     async def delete_by_id(self, _id: tp.Union[str, ObjectId]) -> None:
         user_id = ObjectId(_id) if isinstance(_id, str) else _id
-        await self.db[self.collection].delete_one({'_id': user_id})
+        await self.documents().delete_one({'_id': user_id})
+
+    async def _bulk_write(self, ids: tp.Sequence[tp.Any], requests: tp.Sequence[tp.Any],
+                          batch_size: int | None, write_concern: WriteConcern | None) -> tp.List[BulkItemResult]:
+        results: tp.List[BulkItemResult] = []
+        for start, batch in _batches(requests, batch_size or settings.MONGO_BULK_BATCH_SIZE):
+            try:
+                await self.writer(write_concern).bulk_write(list(batch), ordered=False)
+                errors: tp.Dict[int, str] = {}
+            except BulkWriteError as e:
+                errors = _write_errors(e)
+            results.extend(
+                BulkItemResult(position=start + i, id=ids[start + i], ok=i not in errors, error=errors.get(i))
+                for i in range(len(batch))
+            )
+        return results
+
+    async def bulk_create(self, instances: tp.Sequence[dict], batch_size: int | None = None,
+                          write_concern: WriteConcern | None = None) -> tp.List[BulkItemResult]:
+        """
+        Unordered insert_many per batch, a failed item (e.g. a duplicate) does not stop the others
+        """
+        results: tp.List[BulkItemResult] = []
+        for start, batch in _batches(instances, batch_size or settings.MONGO_BULK_BATCH_SIZE):
+            try:
+                await self.writer(write_concern).insert_many(batch, ordered=False)
+                errors: tp.Dict[int, str] = {}
+            except BulkWriteError as e:
+                errors = _write_errors(e)
+            results.extend(
+                BulkItemResult(position=start + i, id=instance['_id'], ok=i not in errors, error=errors.get(i))
+                for i, instance in enumerate(batch)
+            )
+        return results
+
+    async def bulk_update(self, updates: tp.Sequence[tp.Tuple[ObjectId, dict]], batch_size: int | None = None,
+                          write_concern: WriteConcern | None = None) -> tp.List[BulkItemResult]:
+        """
+        $set every (id, fields) pair with unordered bulk_write batches
+        """
+        return await self._bulk_write(
+            ids=[_id for _id, _ in updates],
+            requests=[UpdateOne({'_id': _id}, {'$set': instance}) for _id, instance in updates],
+            batch_size=batch_size,
+            write_concern=write_concern,
+        )
 
-    # bulk create; bulk update, bulk_delete
+    async def bulk_delete(self, ids: tp.Sequence[tp.Union[str, ObjectId]], batch_size: int | None = None,
+                          write_concern: WriteConcern | None = None) -> tp.List[BulkItemResult]:
+        object_ids = [ObjectId(_id) if isinstance(_id, str) else _id for _id in ids]
+        return await self._bulk_write(
+            ids=object_ids,
+            requests=[DeleteOne({'_id': _id}) for _id in object_ids],
+            batch_size=batch_size,
+            write_concern=write_concern,
+        )
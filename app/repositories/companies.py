@@ -0,0 +1,47 @@
+import typing as tp
+
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from app.database.mongo import FAST_WRITES
+from app.repositories import BaseRepository
+
+
+class CompaniesRepository(BaseRepository):
+    """
+    Local mirror of the company registry, documents are keyed by TIN: {_id: inn, items, source, updated_at}
+    """
+
+    def __init__(self):
+        self.collection = 'companies'
+        super().__init__()
+
+    async def get_by_inn(self, inn: str) -> tp.Dict[str, tp.Any] | None:
+        return await self.reader().find_one({'_id': inn})  # type: ignore
+
+    async def upsert(self, inn: str, items: tp.List[dict], source: str) -> None:
+        await self.documents().update_one(
+            {'_id': inn}, {'$set': {'items': items, 'source': source, 'updated_at': datetime.utcnow()}}, upsert=True
+        )
+
+    async def upsert_many(self, companies: tp.List[tp.Dict[str, tp.Any]], source: str) -> int:
+        """
+        Unordered bulk upsert of {'inn', 'items'} documents, return number of inserted and modified ones
+        """
+        if not companies:
+            return 0
+        now = datetime.utcnow()
+        # an interrupted import is simply repeated, a primary acknowledgement is enough
+        result = await self.writer(FAST_WRITES).bulk_write(
+            [
+                UpdateOne(
+                    {'_id': company['inn']},
+                    {'$set': {'items': company['items'], 'source': source, 'updated_at': now}},
+                    upsert=True,
+                )
+                for company in companies
+            ],
+            ordered=False,
+        )
+        return result.upserted_count + result.modified_count
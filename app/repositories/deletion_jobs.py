@@ -0,0 +1,69 @@
+import typing as tp
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+from app.repositories import BaseRepository
+
+
+class DeletionJobsRepository(BaseRepository):
+    """
+    Cascade deletion of a user: {user_id, status, deleted: {collection: count}, locked_until, ...}
+    """
+
+    indexes = [
+        IndexModel([('user_id', ASCENDING)], name='user_id', unique=True),
+        IndexModel([('status', ASCENDING), ('locked_until', ASCENDING)], name='status_locked_until'),
+    ]
+
+    def __init__(self):
+        self.collection = 'deletion_jobs'
+        super().__init__()
+
+    async def schedule(self, user_id: str) -> tp.Dict[str, tp.Any]:
+        """
+        Create the job of the user or return the existing one
+        """
+        now = datetime.utcnow()
+        return await self.documents().find_one_and_update(  # type: ignore
+            {'user_id': user_id},
+            {'$setOnInsert': {
+                'user_id': user_id, 'status': 'pending', 'deleted': {}, 'created_at': now, 'locked_until': now,
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def get_for_user(self, _id: ObjectId, user_id: str) -> tp.Dict[str, tp.Any] | None:
+        """
+        The job only if it belongs to the user
+        """
+        return await self.documents().find_one({'_id': _id, 'user_id': user_id})  # type: ignore
+
+    async def claim(self, lease: int) -> tp.Dict[str, tp.Any] | None:
+        """
+        Take a pending job or a running one whose worker stopped renewing the lease (e.g. after a restart)
+        """
+        now = datetime.utcnow()
+        return await self.documents().find_one_and_update(  # type: ignore
+            {'status': {'$in': ['pending', 'running']}, 'locked_until': {'$lte': now}},
+            {'$set': {'status': 'running', 'locked_until': now + timedelta(seconds=lease)}},
+            sort=[('locked_until', ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def record_progress(self, _id: ObjectId, collection: str, deleted: int, lease: int) -> None:
+        await self.documents().update_one(
+            {'_id': _id},
+            {
+                '$inc': {f'deleted.{collection}': deleted},
+                '$set': {'locked_until': datetime.utcnow() + timedelta(seconds=lease)},
+            },
+        )
+
+    async def finish(self, _id: ObjectId) -> None:
+        await self.documents().update_one(
+            {'_id': _id}, {'$set': {'status': 'done', 'finished_at': datetime.utcnow()}}
+        )
@@ -0,0 +1,382 @@
+import copy
+import typing as tp
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, IndexModel, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+_MISSING = object()
+
+
+def _get(document: tp.Any, path: str) -> tp.Any:
+    for key in path.split('.'):
+        if not isinstance(document, dict) or key not in document:
+            return _MISSING
+        document = document[key]
+    return document
+
+
+def _set(document: dict, path: str, value: tp.Any) -> None:
+    *parents, key = path.split('.')
+    for parent in parents:
+        document = document.setdefault(parent, {})
+    document[key] = value
+
+
+def _unset(document: dict, path: str) -> None:
+    *parents, key = path.split('.')
+    for parent in parents:
+        document = document.get(parent)  # type: ignore
+        if not isinstance(document, dict):
+            return
+    document.pop(key, None)
+
+
+def _compare(value: tp.Any, operator: str, operand: tp.Any) -> bool:
+    if operator == '$exists':
+        return (value is not _MISSING) == bool(operand)
+    if value is _MISSING:
+        value = None
+    if operator == '$eq':
+        return value == operand or (isinstance(value, list) and operand in value)
+    if operator == '$ne':
+        return not _compare(value, '$eq', operand)
+    if operator == '$in':
+        return any(_compare(value, '$eq', item) for item in operand)
+    if operator == '$nin':
+        return not _compare(value, '$in', operand)
+    if operator in ('$gt', '$gte', '$lt', '$lte'):
+        if value is None:
+            return False
+        try:
+            return {'$gt': value > operand, '$gte': value >= operand,
+                    '$lt': value < operand, '$lte': value <= operand}[operator]
+        except TypeError:
+            # mongo compares values of different types by type order, such documents never match here
+            return False
+    raise NotImplementedError(f'Query operator {operator} is not supported by the memory storage')
+
+
+def matches(document: dict, query: tp.Dict[str, tp.Any] | None) -> bool:
+    for key, condition in (query or {}).items():
+        if key == '$or':
+            if not any(matches(document, subquery) for subquery in condition):
+                return False
+        elif key == '$and':
+            if not all(matches(document, subquery) for subquery in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(operator.startswith('$') for operator in condition):
+            value = _get(document, key)
+            if not all(_compare(value, operator, operand) for operator, operand in condition.items()):
+                return False
+        elif not _compare(_get(document, key), '$eq', condition):
+            return False
+    return True
+
+
+def apply_update(document: dict, update: tp.Any, inserting: bool = False) -> None:
+    if not isinstance(update, dict):
+        raise NotImplementedError('Aggregation pipeline updates are not supported by the memory storage')
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            if operator == '$set' or operator == '$setOnInsert' and inserting:
+                _set(document, path, copy.deepcopy(value))
+            elif operator == '$inc':
+                current = _get(document, path)
+                _set(document, path, (0 if current is _MISSING else current) + value)
+            elif operator == '$unset':
+                _unset(document, path)
+            elif operator != '$setOnInsert':
+                raise NotImplementedError(f'Update operator {operator} is not supported by the memory storage')
+
+
+def project(document: dict, projection: tp.Dict[str, tp.Any] | None) -> dict:
+    if not projection:
+        return copy.deepcopy(document)
+    fields = {path: value for path, value in projection.items() if path != '_id'}
+    if fields and any(fields.values()):
+        result: tp.Dict[str, tp.Any] = {}
+        for path in fields:
+            value = _get(document, path)
+            if value is not _MISSING:
+                _set(result, path, copy.deepcopy(value))
+        if projection.get('_id', 1):
+            result['_id'] = document['_id']
+        return result
+
+    result = copy.deepcopy(document)
+    for path, value in projection.items():
+        if not value:
+            _unset(result, path)
+    return result
+
+
+def _sort_value(document: dict, path: str) -> tp.Tuple[bool, tp.Any]:
+    value = _get(document, path)
+    # missing and null values go first, as in mongo
+    return (False, 0) if value is _MISSING or value is None else (True, value)
+
+
+def _sorted(documents: tp.List[dict], sort: tp.Sequence[tp.Tuple[str, int]]) -> tp.List[dict]:
+    # python sort is stable: sorting by the last key first gives the compound order
+    for path, direction in reversed(sort):
+        documents = sorted(documents, key=lambda document: _sort_value(document, path), reverse=direction < 0)
+    return documents
+
+
+class MemoryCursor:
+    """
+    Result of MemoryCollection.find, supports the cursor methods the repositories chain
+    """
+
+    def __init__(self, documents: tp.List[dict], projection: tp.Dict[str, tp.Any] | None):
+        self.documents = documents
+        self.projection = projection
+        self._sort: tp.List[tp.Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list: tp.Any, direction: int = 1) -> 'MemoryCursor':
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def skip(self, skip: int) -> 'MemoryCursor':
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> 'MemoryCursor':
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> 'MemoryCursor':
+        return self
+
+    def _results(self) -> tp.List[dict]:
+        documents = _sorted(self.documents, self._sort)[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return [project(document, self.projection) for document in documents]
+
+    async def to_list(self, length: int | None = None) -> tp.List[dict]:
+        results = self._results()
+        return results if length is None else results[:length]
+
+    async def __aiter__(self) -> tp.AsyncIterator[dict]:
+        for document in self._results():
+            yield document
+
+
+class MemoryCollection:
+    """
+    Collection kept in a dict by _id with the query and update subset the repositories use.
+    Unique indexes are enforced, TTL indexes are stored but documents do not expire
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.documents: tp.Dict[tp.Any, dict] = {}
+        self.indexes: tp.Dict[str, tp.Dict[str, tp.Any]] = {'_id_': {'key': [('_id', 1)], 'v': 2}}
+        # unique index name -> index key -> _id
+        self.unique: tp.Dict[str, tp.Dict[tp.Tuple[tp.Any, ...], tp.Any]] = {}
+
+    def _index_key(self, name: str, document: dict) -> tp.Tuple[tp.Any, ...] | None:
+        index = self.indexes[name]
+        if 'partialFilterExpression' in index and not matches(document, index['partialFilterExpression']):
+            return None
+        key = tuple(_get(document, path) for path, _ in index['key'])
+        if index.get('sparse') and all(value is _MISSING for value in key):
+            return None
+        return tuple(None if value is _MISSING else value for value in key)
+
+    def _index_keys(self, document: dict) -> tp.Dict[str, tp.Tuple[tp.Any, ...] | None]:
+        return {name: self._index_key(name, document) for name in self.unique}
+
+    def _store(self, document: dict, previous: dict | None = None) -> None:
+        keys = self._index_keys(document)
+        for name, key in keys.items():
+            owner = self.unique[name].get(key, document['_id']) if key is not None else document['_id']
+            if owner != document['_id']:
+                raise DuplicateKeyError(
+                    f'E11000 duplicate key error collection: {self.name} index: {name} dup key: {key}', 11000
+                )
+        if previous is not None:
+            self._forget(previous)
+        for name, key in keys.items():
+            if key is not None:
+                self.unique[name][key] = document['_id']
+        self.documents[document['_id']] = document
+
+    def _forget(self, document: dict) -> None:
+        for name, key in self._index_keys(document).items():
+            if key is not None:
+                self.unique[name].pop(key, None)
+
+    def _insert(self, document: dict) -> None:
+        if document['_id'] in self.documents:
+            raise DuplicateKeyError(
+                f'E11000 duplicate key error collection: {self.name} index: _id_ dup key: {document["_id"]}', 11000
+            )
+        self._store(copy.deepcopy(document))
+
+    def _find(self, query: tp.Dict[str, tp.Any] | None,
+              sort: tp.Sequence[tp.Tuple[str, int]] | None = None) -> tp.List[dict]:
+        _id = (query or {}).get('_id', _MISSING)
+        if _id is not _MISSING and not isinstance(_id, dict):
+            candidates = [self.documents[_id]] if _id in self.documents else []
+        else:
+            candidates = list(self.documents.values())
+        return _sorted([document for document in candidates if matches(document, query)], sort or [])
+
+    def _update(self, query: tp.Dict[str, tp.Any], update: tp.Any, upsert: bool, many: bool,
+                sort: tp.Sequence[tp.Tuple[str, int]] | None = None,
+                ) -> tp.Tuple[int, int, tp.Any, tp.List[tp.Tuple[dict | None, dict]]]:
+        """
+        Matched and modified counts, upserted _id and (before, after) documents of the updated ones
+        """
+        documents = self._find(query, sort)
+        if not many:
+            documents = documents[:1]
+        modified = 0
+        changes: tp.List[tp.Tuple[dict | None, dict]] = []
+        for document in documents:
+            updated = copy.deepcopy(document)
+            apply_update(updated, update)
+            if updated != document:
+                self._store(updated, previous=document)
+                modified += 1
+            changes.append((document, updated))
+
+        upserted_id = None
+        if not documents and upsert:
+            inserted: tp.Dict[str, tp.Any] = {}
+            for path, condition in query.items():
+                if not path.startswith('$') and not (
+                        isinstance(condition, dict) and any(key.startswith('$') for key in condition)):
+                    _set(inserted, path, copy.deepcopy(condition))
+            apply_update(inserted, update, inserting=True)
+            inserted.setdefault('_id', ObjectId())
+            self._insert(inserted)
+            upserted_id = inserted['_id']
+            changes.append((None, inserted))
+        return len(documents), modified, upserted_id, changes
+
+    @staticmethod
+    def _update_result(matched: int, modified: int, upserted_id: tp.Any) -> UpdateResult:
+        raw_result: tp.Dict[str, tp.Any] = {'n': matched + (upserted_id is not None), 'nModified': modified}
+        if upserted_id is not None:
+            raw_result['upserted'] = upserted_id
+        return UpdateResult(raw_result, acknowledged=True)
+
+    def _delete(self, query: tp.Dict[str, tp.Any], many: bool) -> int:
+        documents = self._find(query)
+        if not many:
+            documents = documents[:1]
+        for document in documents:
+            self._forget(document)
+            del self.documents[document['_id']]
+        return len(documents)
+
+    async def find_one(self, filter: tp.Dict[str, tp.Any] | None = None,
+                       projection: tp.Dict[str, tp.Any] | None = None, sort: tp.Any = None) -> dict | None:
+        documents = self._find(filter, sort)
+        return project(documents[0], projection) if documents else None
+
+    def find(self, filter: tp.Dict[str, tp.Any] | None = None,
+             projection: tp.Dict[str, tp.Any] | None = None) -> MemoryCursor:
+        return MemoryCursor(self._find(filter), projection)
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        document.setdefault('_id', ObjectId())
+        self._insert(document)
+        return InsertOneResult(document['_id'], acknowledged=True)
+
+    async def insert_many(self, documents: tp.Iterable[dict], ordered: bool = True) -> InsertManyResult:
+        documents = list(documents)
+        for document in documents:
+            document.setdefault('_id', ObjectId())
+        await self.bulk_write([InsertOne(document) for document in documents], ordered=ordered)
+        return InsertManyResult([document['_id'] for document in documents], acknowledged=True)
+
+    async def update_one(self, filter: tp.Dict[str, tp.Any], update: tp.Any, upsert: bool = False) -> UpdateResult:
+        matched, modified, upserted_id, _ = self._update(filter, update, upsert=upsert, many=False)
+        return self._update_result(matched, modified, upserted_id)
+
+    async def update_many(self, filter: tp.Dict[str, tp.Any], update: tp.Any, upsert: bool = False) -> UpdateResult:
+        matched, modified, upserted_id, _ = self._update(filter, update, upsert=upsert, many=True)
+        return self._update_result(matched, modified, upserted_id)
+
+    async def find_one_and_update(self, filter: tp.Dict[str, tp.Any], update: tp.Any,
+                                  projection: tp.Dict[str, tp.Any] | None = None, sort: tp.Any = None,
+                                  upsert: bool = False,
+                                  return_document: bool = ReturnDocument.BEFORE) -> dict | None:
+        _, _, _, changes = self._update(filter, update, upsert=upsert, many=False, sort=sort)
+        if not changes:
+            return None
+        document = changes[0][1] if return_document == ReturnDocument.AFTER else changes[0][0]
+        return project(document, projection) if document is not None else None
+
+    async def delete_one(self, filter: tp.Dict[str, tp.Any]) -> DeleteResult:
+        return DeleteResult({'n': self._delete(filter, many=False)}, acknowledged=True)
+
+    async def delete_many(self, filter: tp.Dict[str, tp.Any]) -> DeleteResult:
+        return DeleteResult({'n': self._delete(filter, many=True)}, acknowledged=True)
+
+    async def bulk_write(self, requests: tp.Sequence[tp.Any], ordered: bool = True) -> BulkWriteResult:
+        result: tp.Dict[str, tp.Any] = {
+            'writeErrors': [], 'nInserted': 0, 'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0,
+            'upserted': [],
+        }
+        for position, request in enumerate(requests):
+            # pymongo keeps the operation arguments in private attributes only
+            query: tp.Any = getattr(request, '_filter', None)
+            document: tp.Any = getattr(request, '_doc', None)
+            upsert: tp.Any = getattr(request, '_upsert', None)
+            try:
+                if isinstance(request, InsertOne):
+                    document.setdefault('_id', ObjectId())
+                    self._insert(document)
+                    result['nInserted'] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany)):
+                    matched, modified, upserted_id, _ = self._update(
+                        query, document, upsert=bool(upsert), many=isinstance(request, UpdateMany)
+                    )
+                    result['nMatched'] += matched
+                    result['nModified'] += modified
+                    if upserted_id is not None:
+                        result['nUpserted'] += 1
+                        result['upserted'].append({'index': position, '_id': upserted_id})
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    result['nRemoved'] += self._delete(query, many=isinstance(request, DeleteMany))
+                else:
+                    raise NotImplementedError(f'{type(request).__name__} is not supported by the memory storage')
+            except DuplicateKeyError as e:
+                result['writeErrors'].append({'index': position, 'code': e.code, 'errmsg': str(e)})
+                if ordered:
+                    break
+        if result['writeErrors']:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, acknowledged=True)
+
+    async def index_information(self) -> tp.Dict[str, tp.Dict[str, tp.Any]]:
+        return copy.deepcopy(self.indexes)
+
+    async def create_indexes(self, indexes: tp.Sequence[IndexModel]) -> tp.List[str]:
+        for index in indexes:
+            document = dict(index.document)
+            name = document.pop('name')
+            document['key'] = list(document['key'].items())
+            self.indexes[name] = document
+            if document.get('unique'):
+                self.unique[name] = {}
+                try:
+                    for stored in self.documents.values():
+                        self._store(stored, previous=stored)
+                except DuplicateKeyError as e:
+                    del self.indexes[name], self.unique[name]
+                    raise OperationFailure(str(e), code=11000) from e
+        return [index.document['name'] for index in indexes]
+
+    async def drop_index(self, name: str) -> None:
+        self.indexes.pop(name, None)
+        self.unique.pop(name, None)
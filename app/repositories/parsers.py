@@ -0,0 +1,20 @@
+import typing as tp
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+
+from app.repositories import BaseRepository
+from app.config import settings
+
+
+class ParsersRepository(BaseRepository):
+    indexes = [
+        IndexModel([('owner_id', ASCENDING)], name='owner_id'),
+    ]
+
+    def __init__(self):
+        self.collection = settings.PARSER_COLLECTION_NAME
+        super().__init__()
+
+    async def delete_by_owner(self, owner_id: tp.Union[str, ObjectId]):
+        return await self.documents().delete_many({"owner_id": owner_id})
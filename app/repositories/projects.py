@@ -2,25 +2,35 @@ from app.repositories import BaseRepository
 import typing as tp
 
 from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
 
 from app.schemas import BaseUserRead
 
 
 class ProjectsRepository(BaseRepository):
+    indexes = [
+        IndexModel([('owner', ASCENDING), ('name', ASCENDING)], name='owner_name', unique=True),
+        # keyset pagination of the owner's projects
+        IndexModel([('owner', ASCENDING), ('_id', ASCENDING)], name='owner_id'),
+    ]
+
     def __init__(self):
         self.collection = 'projects'
         super().__init__()
 
+    async def get_by_owner_and_name(self, owner_id: str, name: str):
+        return await self.documents().find_one({"owner": owner_id, "name": name})
+
     async def delete_project_by_id(self, _id: tp.Union[str, ObjectId], owner_id: str) -> None:
         project_id = ObjectId(_id) if isinstance(_id, str) else _id
-        await self.db[self.collection].delete_one({'_id': project_id, "owner": owner_id})
+        await self.documents().delete_one({'_id': project_id, "owner": owner_id})
 
-    async def get_project_by_id(self, _id: ObjectId, owner_id: str):
-        return await self.db[self.collection].find_one({"_id": _id, "owner": owner_id})
+    async def get_project_by_id(self, _id: ObjectId, owner_id: str, projection: tp.Dict[str, int] | None = None):
+        return await self.documents().find_one({"_id": _id, "owner": owner_id}, projection)
 
-    async def get_all_projects(self, owner_id: str) -> tp.List[BaseUserRead]:
-        await self.get_db()
-        return await self.db[self.collection].find({"owner": owner_id}).to_list(length=None)
+    async def get_all_projects(self, owner_id: str, projection: tp.Dict[str, int] | None = None,
+                               after: ObjectId | None = None, limit: int | None = None) -> tp.List[BaseUserRead]:
+        return await self.find_page({"owner": owner_id}, after=after, limit=limit, projection=projection)  # type: ignore
 
     async def delete_all_user_projects(self, owner_id: tp.Union[str, ObjectId]):
-        return await self.db[self.collection].delete_many({"owner": owner_id})
+        return await self.documents().delete_many({"owner": owner_id})
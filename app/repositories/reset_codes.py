@@ -0,0 +1,83 @@
+import time
+import heapq
+import typing as tp
+
+from abc import ABC, abstractmethod
+
+from app.config import settings
+from app.database.redis import RedisRepository
+
+
+class BaseResetCodesRepository(ABC):
+    """
+    Single-use password reset codes with expiration
+    """
+
+    @abstractmethod
+    async def save(self, code: str, user_id: str, expire: int) -> bool:
+        """
+        Store the code for expire seconds, return False if the code is already taken
+        """
+
+    @abstractmethod
+    async def consume(self, code: str) -> str | None:
+        """
+        Atomically read and remove the code, return user id or None if the code is unknown or expired
+        """
+
+
+class RedisResetCodesRepository(BaseResetCodesRepository, RedisRepository):
+    @staticmethod
+    def _key(code: str) -> str:
+        return f'reset_code:{code}'
+
+    async def save(self, code: str, user_id: str, expire: int) -> bool:
+        redis = await self.get_connection()
+        return bool(await redis.set(self._key(code), user_id, expire=expire, exist=redis.SET_IF_NOT_EXIST))
+
+    async def consume(self, code: str) -> str | None:
+        redis = await self.get_connection()
+        transaction = redis.multi_exec()
+        transaction.get(self._key(code))
+        transaction.delete(self._key(code))
+        user_id, _ = await transaction.execute()
+        return user_id
+
+
+class MemoryResetCodesRepository(BaseResetCodesRepository):
+    """
+    In-process store for tests and single-node setups, expired codes are dropped through an expiry heap
+    """
+
+    def __init__(self):
+        self.codes: tp.Dict[str, tp.Tuple[float, str]] = {}
+        self.expirations: tp.List[tp.Tuple[float, str]] = []
+
+    def _purge(self, now: float) -> None:
+        while self.expirations and self.expirations[0][0] <= now:
+            expires_at, code = heapq.heappop(self.expirations)
+            entry = self.codes.get(code)
+            if entry is not None and entry[0] == expires_at:
+                del self.codes[code]
+
+    async def save(self, code: str, user_id: str, expire: int) -> bool:
+        now = time.time()
+        self._purge(now)
+        if code in self.codes:
+            return False
+
+        expires_at = now + expire
+        self.codes[code] = (expires_at, user_id)
+        heapq.heappush(self.expirations, (expires_at, code))
+        return True
+
+    async def consume(self, code: str) -> str | None:
+        self._purge(time.time())
+        entry = self.codes.pop(code, None)
+        return entry[1] if entry is not None else None
+
+
+def get_reset_codes_repository() -> BaseResetCodesRepository:
+    if settings.RESET_CODE_STORE == 'memory':
+        return MemoryResetCodesRepository()
+    return RedisResetCodesRepository()
@@ -0,0 +1,67 @@
+import typing as tp
+
+from app.database.redis import RedisRepository
+
+
+class SessionsRepository(RedisRepository):
+    """
+    Refresh-token sessions: 'refresh_token:<jti>' keys expiring with the token, grouped per user in
+    'user_sessions:<user_id>' sets, a 'revoked_users' sorted set(user_id scored by revocation time)
+    and a 'revoked_tokens' sorted set(access token digest scored by the token's expiration)
+    """
+
+    revoked_users_key = 'revoked_users'
+    revoked_tokens_key = 'revoked_tokens'
+
+    @staticmethod
+    def _token_key(jti: str) -> str:
+        return f'refresh_token:{jti}'
+
+    @staticmethod
+    def _sessions_key(user_id: str) -> str:
+        return f'user_sessions:{user_id}'
+
+    async def add_refresh_token(self, user_id: str, jti: str, expire: int) -> None:
+        redis = await self.get_connection()
+        transaction = redis.multi_exec()
+        transaction.set(self._token_key(jti), user_id, expire=expire)
+        transaction.sadd(self._sessions_key(user_id), jti)
+        transaction.expire(self._sessions_key(user_id), expire)
+        await transaction.execute()
+
+    async def consume_refresh_token(self, user_id: str, jti: str) -> bool:
+        """
+        Atomically remove the refresh token, return False if it was already used or revoked
+        """
+        redis = await self.get_connection()
+        transaction = redis.multi_exec()
+        transaction.delete(self._token_key(jti))
+        transaction.srem(self._sessions_key(user_id), jti)
+        deleted, _ = await transaction.execute()
+        return deleted == 1
+
+    async def revoke_all(self, user_id: str, revoked_at: float, keep_revocations_for: int) -> None:
+        redis = await self.get_connection()
+        jtis = await redis.smembers(self._sessions_key(user_id))
+        transaction = redis.multi_exec()
+        if jtis:
+            transaction.delete(*[self._token_key(jti) for jti in jtis])
+        transaction.delete(self._sessions_key(user_id))
+        transaction.zadd(self.revoked_users_key, revoked_at, user_id)
+        transaction.zremrangebyscore(self.revoked_users_key, max=revoked_at - keep_revocations_for)
+        await transaction.execute()
+
+    async def get_revocations(self, since: float) -> tp.List[tp.Tuple[str, float]]:
+        redis = await self.get_connection()
+        return await redis.zrangebyscore(self.revoked_users_key, min=since, withscores=True)
+
+    async def revoke_token(self, digest: str, expires_at: float, now: float) -> None:
+        redis = await self.get_connection()
+        transaction = redis.multi_exec()
+        transaction.zadd(self.revoked_tokens_key, expires_at, digest)
+        transaction.zremrangebyscore(self.revoked_tokens_key, max=now)
+        await transaction.execute()
+
+    async def get_revoked_tokens(self, now: float) -> tp.List[tp.Tuple[str, float]]:
+        redis = await self.get_connection()
+        return await redis.zrangebyscore(self.revoked_tokens_key, min=now, withscores=True)
@@ -0,0 +1,50 @@
+import typing as tp
+
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
+
+from app.repositories import BaseRepository
+
+
+class SigningKeysRepository(BaseRepository):
+    """
+    Signing keys by kid, plus one rotation lease document per algorithm(it has no expires_at, so it is
+    never loaded as a key)
+    """
+
+    indexes = [
+        # expired keys are removed by mongo
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_ttl', expireAfterSeconds=0),
+    ]
+
+    def __init__(self):
+        self.collection = 'signing_keys'
+        super().__init__()
+
+    async def get_valid_keys(self, now: datetime) -> tp.List[dict]:
+        return await self.documents().find(
+            {'expires_at': {'$gt': now}}
+        ).sort('created_at', 1).to_list(length=None)
+
+    async def acquire_rotation_lease(self, algorithm: str, owner: str, lease: int) -> bool:
+        """
+        Take the rotation lease of the algorithm unless another replica holds an unexpired one
+        """
+        now = datetime.utcnow()
+        try:
+            await self.documents().update_one(
+                {'_id': f'rotation:{algorithm}', 'locked_until': {'$lte': now}},
+                {'$set': {'owner': owner, 'locked_until': now + timedelta(seconds=lease)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # the lease document exists and is locked, the upsert tried to insert a second one
+            return False
+        return True
+
+    async def release_rotation_lease(self, algorithm: str, owner: str) -> None:
+        await self.documents().update_one(
+            {'_id': f'rotation:{algorithm}', 'owner': owner}, {'$set': {'locked_until': datetime.utcnow()}}
+        )
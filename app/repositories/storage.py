@@ -0,0 +1,52 @@
+import typing as tp
+
+from abc import ABC, abstractmethod
+
+from pymongo import WriteConcern
+
+from app.config import settings
+from app.database import MongoManager
+from app.repositories.memory import MemoryCollection
+
+
+class BaseStorage(ABC):
+    """
+    Where repositories keep their documents, collections follow the Motor collection interface
+    """
+
+    @abstractmethod
+    def collection(self, name: str, read_preference: tp.Any = None,
+                   write_concern: WriteConcern | None = None) -> tp.Any:
+        ...
+
+
+class MotorStorage(BaseStorage):
+    def collection(self, name: str, read_preference: tp.Any = None,
+                   write_concern: WriteConcern | None = None) -> tp.Any:
+        if read_preference is None and write_concern is None:
+            return MongoManager.db[name]
+        return MongoManager.db.get_collection(name, read_preference=read_preference, write_concern=write_concern)
+
+
+class MemoryStorage(BaseStorage):
+    """
+    In-process collections for tests and benchmarks, read preference and write concern are ignored
+    """
+
+    def __init__(self):
+        self.collections: tp.Dict[str, MemoryCollection] = {}
+
+    def collection(self, name: str, read_preference: tp.Any = None,
+                   write_concern: WriteConcern | None = None) -> MemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = MemoryCollection(name)
+        return self.collections[name]
+
+    def clear(self) -> None:
+        self.collections.clear()
+
+
+def get_storage() -> BaseStorage:
+    if settings.STORAGE_BACKEND == 'memory':
+        return MemoryStorage()
+    return MotorStorage()
@@ -0,0 +1,190 @@
+import time
+import asyncio
+import typing as tp
+
+from bson import json_util
+
+from app.config import settings, logger
+from app.database.redis import RedisRepository
+from app.utils.cache import TTLCache
+
+# store the document only if no write bumped the version since it was read from mongo
+_FILL_SCRIPT = """
+local version = redis.call('HGET', KEYS[1], 'version') or '0'
+if version ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1])
+redis.call('HSET', KEYS[1], 'doc', ARGV[2])
+redis.call('HSET', KEYS[1], 'filled_at', ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class CachedUser(tp.NamedTuple):
+    """
+    version is None when redis is unavailable, the cache is bypassed then
+    """
+
+    version: int | None
+    document: tp.Dict[str, tp.Any] | None = None
+
+
+class UserCache(RedisRepository):
+    """
+    Two-tier cache of user documents without the password hash: in process and a redis hash per user
+    holding the document and a version bumped by every write, a document read before a write is never stored after it.
+    Writes publish the ids of changed users, every process listens to them and drops its local entries. While the
+    process is subscribed a local entry is served without asking redis, otherwise(the listener is down or not started)
+    it is served only while its version matches the one in redis.
+    USER_CACHE_LOCAL_TTL must not exceed USER_CACHE_TTL, a version must outlive the local entries checked against it.
+
+    An invalidation that fails(redis is unreachable) is kept and retried with the next redis operation
+    of the process. Until then other processes may serve the old document, but a document stored in redis
+    is served for USER_CACHE_MAX_STALENESS seconds at most, so a missed invalidation is visible for no longer
+    than USER_CACHE_MAX_STALENESS + USER_CACHE_LOCAL_TTL
+    """
+
+    channel = 'user_cache:invalidations'
+    local = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_LOCAL_TTL)
+    local_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    rejected_fills: int = 0
+    # users whose invalidation did not reach redis yet
+    pending: tp.Set[str] = set()
+    listener: asyncio.Task | None = None
+    subscribed: bool = False
+    # bumped by every invalidation the process sees, a document read before one is not kept locally
+    generation: int = 0
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f'user_cache:{user_id}'
+
+    async def get(self, user_id: str) -> CachedUser:
+        key = self._key(user_id)
+        cached = self.local.get(user_id)
+        if cached is not None and UserCache.subscribed:
+            UserCache.local_hits += 1
+            return cached
+        generation = UserCache.generation
+        try:
+            redis = await self.get_connection()
+            await self._invalidate_pending(redis)
+            if cached is not None:
+                version = int(await redis.hget(key, 'version') or 0)
+                if version == cached.version:
+                    UserCache.local_hits += 1
+                    return cached
+                self.local.pop(user_id)
+            version, document, filled_at = await redis.hmget(key, 'version', 'doc', 'filled_at')
+        except Exception as e:
+            logger.warning(f"User cache is unavailable: {str(e)}")
+            return CachedUser(version=None)
+
+        if document is not None and time.time() - float(filled_at or 0) > settings.USER_CACHE_MAX_STALENESS:
+            # refilled from mongo with the same version
+            document = None
+        if document is None:
+            UserCache.misses += 1
+            return CachedUser(version=int(version or 0))
+        UserCache.redis_hits += 1
+        cached = CachedUser(version=int(version or 0), document=json_util.loads(document))
+        if UserCache.generation == generation:
+            self.local.set(user_id, cached)
+        return cached
+
+    async def fill(self, user_id: str, version: int, document: tp.Dict[str, tp.Any]) -> None:
+        generation = UserCache.generation
+        try:
+            redis = await self.get_connection()
+            await self._invalidate_pending(redis)
+            stored = await redis.eval(
+                _FILL_SCRIPT,
+                keys=[self._key(user_id)],
+                args=[version, json_util.dumps(document), settings.USER_CACHE_TTL, time.time()],
+            )
+        except Exception as e:
+            logger.warning(f"User cache is unavailable: {str(e)}")
+            return
+        if stored and UserCache.generation == generation:
+            self.local.set(user_id, CachedUser(version=version, document=document))
+        elif not stored:
+            UserCache.rejected_fills += 1
+
+    async def _invalidate_pending(self, redis: tp.Any) -> None:
+        if not UserCache.pending:
+            return
+        user_ids = list(UserCache.pending)
+        transaction = redis.multi_exec()
+        for user_id in user_ids:
+            transaction.hincrby(self._key(user_id), 'version', 1)
+            transaction.hdel(self._key(user_id), 'doc')
+            transaction.expire(self._key(user_id), settings.USER_CACHE_TTL)
+        transaction.publish(self.channel, ','.join(user_ids))
+        await transaction.execute()
+        UserCache.pending.difference_update(user_ids)
+
+    @classmethod
+    def _evict(cls, user_ids: tp.Iterable[str]) -> None:
+        cls.generation += 1
+        for user_id in user_ids:
+            cls.local.pop(user_id)
+
+    async def invalidate(self, *user_ids: str) -> None:
+        self._evict(user_ids)
+        UserCache.pending.update(user_ids)
+        try:
+            redis = await self.get_connection()
+            await self._invalidate_pending(redis)
+        except Exception as e:
+            logger.error(f"Failed to invalidate cached users {user_ids}, will retry: {str(e)}")
+
+    @classmethod
+    async def _listen(cls):
+        while True:
+            try:
+                redis = await cls.get_connection()
+                [channel] = await redis.subscribe(cls.channel)
+                # entries kept while unsubscribed may have missed invalidations
+                cls.generation += 1
+                cls.local.clear()
+                cls.subscribed = True
+                async for message in channel.iter(encoding='utf-8'):
+                    cls._evict(message.split(','))
+            except Exception as e:
+                logger.error(f"User cache invalidations are not received: {str(e)}")
+            cls.subscribed = False
+            await asyncio.sleep(1)
+
+    @classmethod
+    async def start(cls):
+        if cls.listener is None:
+            cls.listener = asyncio.create_task(cls._listen())
+
+    @classmethod
+    async def close(cls):
+        if cls.listener is not None:
+            cls.listener.cancel()
+            cls.listener = None
+            cls.subscribed = False
+            try:
+                await (await cls.get_connection()).unsubscribe(cls.channel)
+            except Exception:
+                pass
+
+    @classmethod
+    def metrics(cls) -> tp.Dict[str, tp.Any]:
+        lookups = cls.local_hits + cls.redis_hits + cls.misses
+        return {
+            'local_hits': cls.local_hits,
+            'redis_hits': cls.redis_hits,
+            'misses': cls.misses,
+            'rejected_fills': cls.rejected_fills,
+            'pending_invalidations': len(cls.pending),
+            'subscribed': cls.subscribed,
+            'hit_ratio': round((cls.local_hits + cls.redis_hits) / lookups, 4) if lookups else 0.0,
+            'local': cls.local.metrics(),
+        }
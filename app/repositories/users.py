@@ -1,13 +1,140 @@
+import typing as tp
+
+from datetime import datetime, timedelta
+
 from bson import ObjectId
+from pymongo import ASCENDING, IndexModel, ReturnDocument, WriteConcern
 
 from app.repositories import BaseRepository
-from app.config import settings
+from app.repositories.base import BulkItemResult
+from app.repositories.user_cache import UserCache
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
 
 
 class UsersRepository(BaseRepository):
+    indexes = [
+        IndexModel([('email_normalized', ASCENDING)], name='email_normalized', unique=True),
+        IndexModel(
+            [('additional_info.enrichment', ASCENDING)],
+            name='enrichment_pending',
+            partialFilterExpression={'additional_info.enrichment': 'pending'},
+        ),
+    ]
+
     def __init__(self):
         self.collection = "users"
         super().__init__()
 
-    async def delete_user_parsers(self, owner_id: ObjectId):
-        return await self.db[settings.PARSER_COLLECTION_NAME].delete_many({"owner_id": owner_id})  # type: ignore
+    async def prepare(self) -> None:
+        # users created before email_normalized existed
+        await self.documents().update_many(
+            {'email_normalized': {'$exists': False}},
+            [{'$set': {'email_normalized': {'$toLower': {'$trim': {'input': '$email'}}}}}],
+        )
+
+    async def get_by_id(self, _id: ObjectId,
+                        projection: tp.Dict[str, int] | None = None) -> tp.Dict[tp.Any, tp.Any] | None:
+        """
+        Reads with an inclusive projection without the password go through the user cache
+        """
+        if not projection or 'password' in projection or not all(projection.values()):
+            return await super().get_by_id(_id=_id, projection=projection)
+
+        user_cache = UserCache()
+        cached = await user_cache.get(str(_id))
+        document = cached.document
+        if document is None:
+            document = await super().get_by_id(_id=_id, projection={'password': 0})
+            if document is None:
+                return None
+            if cached.version is not None:
+                await user_cache.fill(str(_id), cached.version, document)
+        return {key: value for key, value in document.items() if key in projection or key == '_id'}
+
+    async def get_by_email(self, email: str):
+        return await self.documents().find_one({"email_normalized": normalize_email(email)})
+
+    async def create(self, instance: dict) -> dict:
+        return await super().create(self._with_normalized_email(instance))
+
+    # the cache is invalidated after every write, a read racing with the write cannot store the old document
+
+    async def update_by_id(self, instance_id: ObjectId, instance) -> None:
+        await super().update_by_id(instance_id=instance_id, instance=self._with_normalized_email(instance))
+        await UserCache().invalidate(str(instance_id))
+
+    async def set_fields(self, _id: ObjectId, fields: tp.Dict[str, tp.Any]) -> bool:
+        matched = await super().set_fields(_id=_id, fields=self._with_normalized_email(fields))
+        await UserCache().invalidate(str(_id))
+        return matched
+
+    async def update_and_get(self, query: tp.Dict[str, tp.Any],
+                             fields: tp.Dict[str, tp.Any]) -> tp.Dict[tp.Any, tp.Any] | None:
+        user = await super().update_and_get(query=query, fields=self._with_normalized_email(fields))
+        if user is not None:
+            await UserCache().invalidate(str(user['_id']))
+        return user
+
+    async def delete_by_id(self, _id: tp.Union[str, ObjectId]) -> None:
+        await super().delete_by_id(_id)
+        await UserCache().invalidate(str(_id))
+
+    async def bulk_create(self, instances: tp.Sequence[dict], batch_size: int | None = None,
+                          write_concern: WriteConcern | None = None) -> tp.List[BulkItemResult]:
+        return await super().bulk_create(
+            [self._with_normalized_email(instance) for instance in instances], batch_size, write_concern
+        )
+
+    async def bulk_update(self, updates: tp.Sequence[tp.Tuple[ObjectId, dict]], batch_size: int | None = None,
+                          write_concern: WriteConcern | None = None) -> tp.List[BulkItemResult]:
+        results = await super().bulk_update(
+            [(_id, self._with_normalized_email(instance)) for _id, instance in updates], batch_size, write_concern
+        )
+        await UserCache().invalidate(*(str(_id) for _id, _ in updates))
+        return results
+
+    async def bulk_delete(self, ids: tp.Sequence[tp.Union[str, ObjectId]], batch_size: int | None = None,
+                          write_concern: WriteConcern | None = None) -> tp.List[BulkItemResult]:
+        results = await super().bulk_delete(ids, batch_size, write_concern)
+        await UserCache().invalidate(*(str(_id) for _id in ids))
+        return results
+
+    @staticmethod
+    def _with_normalized_email(instance: dict) -> dict:
+        if instance.get('email'):
+            return instance | {'email_normalized': normalize_email(instance['email'])}
+        return instance
+
+    async def claim_pending_enrichment(self, limit: int, lease: int) -> tp.List[dict]:
+        """
+        Legal persons waiting for company enrichment, claimed ones are hidden from other workers for lease seconds.
+        Every user is claimed with its own find_one_and_update, so two workers never get the same one
+        """
+        users: tp.List[dict] = []
+        while len(users) < limit:
+            now = datetime.utcnow()
+            user: dict | None = await self.documents().find_one_and_update(
+                {
+                    'additional_info.enrichment': 'pending',
+                    '$or': [{'enrichment_retry_at': {'$exists': False}}, {'enrichment_retry_at': {'$lte': now}}],
+                },
+                {'$set': {'enrichment_retry_at': now + timedelta(seconds=lease)}},
+                projection={'additional_info': 1, 'enrichment_attempts': 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if user is None:
+                break
+            users.append(user)
+        return users
+
+    async def update_enrichment(self, _id: ObjectId, status: str, fields: tp.Dict[str, tp.Any] | None = None,
+                                attempts: int = 0, retry_at: datetime | None = None) -> None:
+        values: tp.Dict[str, tp.Any] = {f'additional_info.{key}': value for key, value in (fields or {}).items()}
+        values |= {'additional_info.enrichment': status, 'enrichment_attempts': attempts}
+        if retry_at is not None:
+            values['enrichment_retry_at'] = retry_at
+        await self.documents().update_one({'_id': _id}, {'$set': values})
+        await UserCache().invalidate(str(_id))
@@ -1,4 +1,10 @@
-from app.schemas.tokens import Token, AccessToken, RefreshToken  # noqa
+from app.schemas.tokens import (  # noqa
+    Token,
+    AccessToken,
+    RefreshToken,
+    IntrospectTokensRequest,
+    IntrospectTokensResponse,
+)
 from app.schemas.users import (  # noqa
     BaseUserRead,
     UserRead,
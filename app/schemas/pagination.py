@@ -0,0 +1,47 @@
+import typing as tp
+
+from bson import ObjectId
+from fastapi import HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.schemas.projections import SparseFields
+from app.schemas.responses import dumps
+
+
+class Cursor(tp.NamedTuple):
+    """
+    Keyset pagination by _id: the page starts after the given id, limit None means no limit
+    """
+
+    after: ObjectId | None = None
+    limit: int | None = None
+
+
+def cursor(
+    after: str | None = Query(None, description="Return documents after this id"),
+    limit: int | None = Query(None, ge=1, le=settings.PAGE_MAX_LIMIT),
+) -> Cursor:
+    if after is not None and not ObjectId.is_valid(after):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return Cursor(after=ObjectId(after) if after is not None else None, limit=limit)
+
+
+def next_cursor(page: tp.List[dict], limit: int | None) -> str | None:
+    """
+    Value of ?after= for the next page, None when this page is the last one
+    """
+    if limit is None or len(page) < limit:
+        return None
+    return str(page[-1]['_id'])
+
+
+def stream_ndjson(documents: tp.AsyncIterator[dict], fields: SparseFields) -> StreamingResponse:
+    """
+    One JSON document per line, written as the cursor yields them
+    """
+    async def lines() -> tp.AsyncIterator[bytes]:
+        async for document in documents:
+            yield dumps(fields.encode(document)) + b'\n'
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
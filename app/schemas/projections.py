@@ -0,0 +1,89 @@
+import typing as tp
+
+from functools import lru_cache
+
+from fastapi import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field, create_model
+
+from app.schemas.responses import ORJSONResponse, trusted_encoder
+
+
+@lru_cache(maxsize=None)
+def projection_for(model: tp.Type[BaseModel], fields: tp.FrozenSet[str] | None = None) -> tp.Dict[str, int]:
+    """
+    Mongo projection of the documents a response model (or the given fields of it) is built from
+    """
+    names = fields if fields is not None else frozenset(model.__fields__)
+    return {model.__fields__[name].alias: 1 for name in sorted(names)}
+
+
+@lru_cache(maxsize=None)
+def partial_model(model: tp.Type[BaseModel]) -> tp.Type[BaseModel]:
+    """
+    The response model with every field optional, to render documents fetched with a sparse projection
+    """
+    definitions: tp.Dict[str, tp.Any] = {
+        name: (tp.Optional[field.outer_type_], Field(None, alias=field.alias)) for name, field in model.__fields__.items()
+    }
+    return create_model(f'Partial{model.__name__}', __base__=model, **definitions)  # type: ignore
+
+
+class SparseFields:
+    """
+    Fields requested with ?fields=, None means the whole response model.
+    Trusted documents come from our own database and are rendered without validation
+    """
+
+    def __init__(self, model: tp.Type[BaseModel], fields: tp.FrozenSet[str] | None = None, trusted: bool = False):
+        self.model = model
+        self.fields = fields
+        self.trusted = trusted
+
+    @property
+    def projection(self) -> tp.Dict[str, int]:
+        return projection_for(self.model, self.fields)
+
+    def encode(self, document: dict) -> tp.Any:
+        """
+        JSON compatible representation of the document with the requested fields
+        """
+        if self.trusted:
+            return trusted_encoder(self.model, self.fields)(document)
+        if self.fields is None:
+            return jsonable_encoder(self.model.parse_obj(document))
+        include: tp.Set[tp.Union[int, str]] = set(self.fields)
+        return jsonable_encoder(partial_model(self.model).parse_obj(document), include=include)
+
+    def render(self, data: tp.Any, headers: tp.Dict[str, str] | None = None) -> tp.Any:
+        """
+        Documents as they are for the endpoint's response model, or a response with the requested fields only.
+        A response returned here replaces the one injected into the endpoint, so its headers are passed in
+        """
+        if self.fields is None and not self.trusted or data is None:
+            return data
+        if isinstance(data, list):
+            return ORJSONResponse([self.encode(item) for item in data], headers=headers)
+        return ORJSONResponse(self.encode(data), headers=headers)
+
+
+def sparse_fields(model: tp.Type[BaseModel], trusted: bool = False) -> tp.Callable[..., SparseFields]:
+    """
+    Dependency parsing ?fields=email,avatar_link against the model, field names and aliases are accepted.
+    trusted skips the validation of documents the endpoint reads from our own database
+    """
+    names = {name: name for name in model.__fields__} | {field.alias: name for name, field in model.__fields__.items()}
+
+    def dependency(
+        fields: str | None = Query(None, description=f"Comma separated fields of {model.__name__} to return")
+    ) -> SparseFields:
+        if not fields:
+            return SparseFields(model, trusted=trusted)
+        requested = set()
+        for field in fields.split(','):
+            if field.strip() not in names:
+                raise HTTPException(status_code=400, detail=f"Unknown field: {field.strip()}")
+            requested.add(names[field.strip()])
+        return SparseFields(model, frozenset(requested), trusted=trusted)
+
+    return dependency
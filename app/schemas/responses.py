@@ -0,0 +1,55 @@
+import typing as tp
+
+from functools import lru_cache
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(value: tp.Any) -> tp.Any:
+    # datetime, enums, UUIDs and dataclasses are serialized by orjson natively
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.dict(by_alias=True)
+    raise TypeError(f'Type is not JSON serializable: {type(value).__name__}')
+
+
+def dumps(content: tp.Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    Default response class of the app, renders ObjectId as its string and datetime/enums without jsonable_encoder
+    """
+
+    def render(self, content: tp.Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def trusted_encoder(model: tp.Type[BaseModel],
+                    fields: tp.FrozenSet[str] | None = None) -> tp.Callable[[dict], tp.Dict[str, tp.Any]]:
+    """
+    Renders a document read from our own database with the response model without validating it again:
+    the model fields (by alias) are picked and missing optional ones get their defaults.
+    Values computed by validators come from the model's trusted(document) classmethod, if it has one
+    """
+    selected = [field for name, field in model.__fields__.items() if fields is None or name in fields]
+    computed = getattr(model, 'trusted', None)
+
+    def encode(document: dict) -> tp.Dict[str, tp.Any]:
+        if computed is not None:
+            document = computed(document)
+        encoded = {}
+        for field in selected:
+            if field.alias in document:
+                encoded[field.alias] = document[field.alias]
+            elif not field.required:
+                encoded[field.alias] = field.get_default()
+        return encoded
+
+    return encode
@@ -1,5 +1,9 @@
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 
+from app.config import settings
+
 
 class RefreshToken(BaseModel):
     refresh_token: str
@@ -18,3 +22,20 @@ class ObtainTokenResponseSchema(BaseModel):
 
 class Token(AccessToken):
     ...
+
+
+class IntrospectTokensRequest(BaseModel):
+    tokens: List[str] = Field(
+        description='Access tokens to verify', min_items=1, max_items=settings.TOKEN_INTROSPECTION_MAX_BATCH
+    )
+
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    user_id: Optional[str] = None
+    sub: Optional[str] = None
+    exp: Optional[int] = None
+
+
+class IntrospectTokensResponse(BaseModel):
+    tokens: List[TokenIntrospection] = Field(description='Results in the order of the requested tokens')
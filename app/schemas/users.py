@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Union, Any, Optional, List
+from typing import Union, Any, Optional, List, Dict
 
 from fastapi.exceptions import HTTPException
 
@@ -42,6 +42,9 @@ class LegalPersonBaseCreate(PrivatePersonBase):
 class LegalPersonBase(LegalPersonBaseCreate):
     address: Optional[str]
     bank_details: Optional[str]
+    name: Optional[str]
+    head: Optional[str]
+    enrichment: Optional[str]
 
 
 class LegalPersonCreateUpdate(LegalPersonBase):
@@ -83,11 +86,20 @@ class BaseUserRead(BaseModel):
     additional_info: dict
     avatar_link: str | None
 
+    @staticmethod
+    def avatar_url(avatar_link: str | None) -> str | None:
+        # users without an avatar have no link
+        return f"{settings.SERVICE_URL}/{avatar_link}/" if avatar_link else None
+
     @root_validator()
     def validator(cls, values: dict) -> dict:
-        values["avatar_link"] = f"{settings.SERVICE_URL}/{values['avatar_link']}/"
+        values["avatar_link"] = cls.avatar_url(values.get('avatar_link'))
         return values
 
+    @classmethod
+    def trusted(cls, document: dict) -> dict:
+        return document | {"avatar_link": cls.avatar_url(document.get("avatar_link"))}
+
     class Config:
         allow_population_by_field_name = True
         arbitrary_types_allowed = True
@@ -163,9 +175,23 @@ class RetrieveLogin(Token):
         json_encoders = {ObjectId: str}
 
 
+class EnrichmentStatus(BaseModel):
+    status: str
+    attempts: int = 0
+    retry_at: Optional[datetime] = None
+
+
+class DeletionJobStatus(BaseModel):
+    status: str
+    deleted: Dict[str, int] = {}
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
 class Email(BaseModel):
     email: str
     is_change: bool = False
+    locale: Optional[str] = None
 
 
 class ResetPasswords(BaseModel):
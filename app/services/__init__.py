@@ -1,3 +1,4 @@
 from app.services.users import *  # noqa
 from app.services.tokens import *  # noqa
 from app.services.emails import *  # noqa
+from app.services.rate_limit import check_rate_limit, client_ip  # noqa
@@ -0,0 +1,68 @@
+import csv
+import json
+import argparse
+import asyncio
+import typing as tp
+
+from app.config import settings, logger
+from app.repositories import CompaniesRepository
+
+
+def registry_item(inn: str, name: str, head: str, address: str) -> dict:
+    """
+    Company row in the shape of an api-fns.ru 'egr' item, so mirrored and live answers are interchangeable
+    """
+    return {
+        "ЮЛ": {
+            "ИНН": inn,
+            "НаимСокрЮЛ": name,
+            "Руководитель": {"ФИОПолн": head},
+            "Адрес": {"АдресПолн": address},
+        }
+    }
+
+
+def read_companies(path: str, file_format: str) -> tp.Iterator[tp.Dict[str, tp.Any]]:
+    """
+    Stream companies from a registry dump without loading it into memory.
+    csv: header with inn,name,head,address columns; json: one api-fns.ru item per line
+    """
+    with open(path, encoding='utf-8', newline='') as dump:
+        if file_format == 'csv':
+            for row in csv.DictReader(dump):
+                item = registry_item(row['inn'], row['name'], row['head'], row['address'])
+                yield {'inn': row['inn'], 'items': [item]}
+        else:
+            for line in dump:
+                if line.strip():
+                    item = json.loads(line)
+                    yield {'inn': item['ЮЛ']['ИНН'], 'items': [item]}
+
+
+def chunked(companies: tp.Iterable[dict], size: int) -> tp.Iterator[tp.List[dict]]:
+    chunk: tp.List[dict] = []
+    for company in companies:
+        chunk.append(company)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def import_companies(path: str, file_format: str, chunk_size: int = settings.COMPANY_IMPORT_CHUNK_SIZE) -> int:
+    repository = CompaniesRepository()
+    imported = 0
+    for chunk in chunked(read_companies(path, file_format), chunk_size):
+        imported += await repository.upsert_many(chunk, source='import')
+        logger.info(f"Imported {imported} companies from {path}")
+    return imported
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import a company registry dump into the companies collection')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=('csv', 'json'), default='csv')
+    parser.add_argument('--chunk-size', type=int, default=settings.COMPANY_IMPORT_CHUNK_SIZE)
+    arguments = parser.parse_args()
+    asyncio.run(import_companies(arguments.path, arguments.format, arguments.chunk_size))
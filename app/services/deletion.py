@@ -0,0 +1,107 @@
+import asyncio
+import typing as tp
+
+from bson import ObjectId
+
+from app.config import settings, logger
+from app.repositories import (
+    BaseRepository,
+    DeletionJobsRepository,
+    ParsersRepository,
+    ProjectsRepository,
+    UsersRepository,
+)
+from app.services.events import publish_event
+
+
+def _dependents(user_id: str) -> tp.List[tp.Tuple[str, BaseRepository, tp.Dict[str, tp.Any]]]:
+    return [
+        ('parsers', ParsersRepository(), {'owner_id': ObjectId(user_id)}),
+        ('projects', ProjectsRepository(), {'owner': user_id}),
+    ]
+
+
+class CascadeDeletion:
+    """
+    Background worker deleting users marked as deleting together with their parsers and projects.
+    Dependents go in throttled batches and the job lease is renewed after each of them; a job of a stopped
+    worker is taken over once its lease expires and continues with whatever is left
+    """
+
+    task: asyncio.Task | None = None
+    wakeup: asyncio.Event | None = None
+    completed: int = 0
+    failed: int = 0
+
+    @classmethod
+    def start(cls):
+        if cls.task is None:
+            cls.wakeup = asyncio.Event()
+            cls.task = asyncio.create_task(cls._work())
+
+    @classmethod
+    async def close(cls):
+        if cls.task is not None:
+            cls.task.cancel()
+            cls.task = None
+            cls.wakeup = None
+
+    @classmethod
+    def notify(cls):
+        if cls.wakeup is not None:
+            cls.wakeup.set()
+
+    @classmethod
+    async def run_job(cls, job: tp.Dict[str, tp.Any]) -> None:
+        jobs = DeletionJobsRepository()
+        user_id = job['user_id']
+        for collection, repository, query in _dependents(user_id):
+            while True:
+                # default(majority) write concern: a deletion acknowledged by the primary only could be rolled back
+                # by a failover after the job is marked done, and a done job is never resumed
+                deleted = await repository.delete_batch(query, limit=settings.DELETION_BATCH_SIZE)
+                if deleted:
+                    await jobs.record_progress(job['_id'], collection, deleted, lease=settings.DELETION_LEASE)
+                if deleted < settings.DELETION_BATCH_SIZE:
+                    break
+                await asyncio.sleep(settings.DELETION_THROTTLE_MS / 1000)
+
+        await UsersRepository().delete_by_id(_id=ObjectId(user_id))
+        await jobs.finish(job['_id'])
+        publish_event('user.deleted', {'user_id': user_id})
+
+    @classmethod
+    async def run_pending(cls) -> int:
+        """
+        Run claimable jobs until there are none, return how many were completed
+        """
+        jobs = DeletionJobsRepository()
+        completed = 0
+        while (job := await jobs.claim(lease=settings.DELETION_LEASE)) is not None:
+            try:
+                await cls.run_job(job)
+            except Exception as e:
+                # the job stays running and is picked up again when its lease expires
+                cls.failed += 1
+                logger.error(f"Deletion of user {job['user_id']} failed: {str(e)}")
+                continue
+            cls.completed += 1
+            completed += 1
+        return completed
+
+    @classmethod
+    async def _work(cls):
+        while True:
+            try:
+                await cls.run_pending()
+            except Exception as e:
+                logger.error(f"Deletion jobs are unavailable: {str(e)}")
+            try:
+                await asyncio.wait_for(cls.wakeup.wait(), timeout=settings.DELETION_POLL_INTERVAL)  # type: ignore
+            except asyncio.TimeoutError:
+                pass
+            cls.wakeup.clear()  # type: ignore
+
+    @classmethod
+    def metrics(cls) -> tp.Dict[str, tp.Any]:
+        return {'completed': cls.completed, 'failed': cls.failed}
@@ -1,43 +1,232 @@
+import os
+import time
+import asyncio
 import smtplib
+import typing as tp
 
 from fastapi.exceptions import HTTPException
 
 from email.message import EmailMessage
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 from app.config import settings, logger
+from app.utils.metrics import TimingStats
 
 
-async def send_mail(email: str, content: str):
-    try:
-        msg = EmailMessage()
-        msg["Subject"] = "Registration"
-        msg["From"] = settings.EMAIL_HOST_USER
-        msg["To"] = email
-        msg.add_alternative(content, subtype="html")
-        with smtplib.SMTP_SSL(settings.EMAIL_HOST, 465) as smtp:
+class SMTPConnection:
+    """
+    Authenticated SMTP connection owned by a single outbox worker, reopened when the server drops it
+    """
+
+    def __init__(self):
+        self.smtp: smtplib.SMTP | None = None
+
+    def _open(self) -> smtplib.SMTP:
+        if settings.EMAIL_USE_SSL:
+            smtp: smtplib.SMTP = smtplib.SMTP_SSL(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=settings.EMAIL_TIMEOUT)
+        else:
+            smtp = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=settings.EMAIL_TIMEOUT)
+        if settings.EMAIL_HOST_PASSWORD:
             smtp.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-            smtp.send_message(msg)
-        logger.info(f"Email successfully send: TO: {email}")
-    except Exception:
-        # TODO ask and update status code
-        raise HTTPException(status_code=409)
+        return smtp
 
+    def send(self, message: EmailMessage) -> None:
+        if self.smtp is None:
+            self.smtp = self._open()
+        try:
+            self.smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # idle connection was closed by the server
+            self.smtp = self._open()
+            self.smtp.send_message(message)
 
-async def open_html(user_email: str, user_name: str, user_code: str, action: bool):
-    environment = Environment(loader=FileSystemLoader("app/static/templates"))
-    try:
-        if action:
-            html_template = environment.get_template("change.html")
+    def close(self) -> None:
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.smtp = None
+
+
+class EmailOutbox:
+    """
+    In-process queue of outgoing emails drained by background workers,
+    each worker keeps its own SMTP connection(pool of EMAIL_WORKERS connections).
+    A failed email is put back into the queue after a backoff, the worker moves on to the next one meanwhile
+    """
+
+    queue: asyncio.Queue | None = None
+    workers: tp.List[asyncio.Task] = []
+    connections: tp.List[SMTPConnection] = []
+    # retries waiting for their backoff to pass
+    delayed: tp.Set[asyncio.TimerHandle] = set()
+    stats: TimingStats = TimingStats()
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+
+    @classmethod
+    def start(cls):
+        if cls.queue is not None:
+            return
+        cls.queue = asyncio.Queue(maxsize=settings.EMAIL_OUTBOX_SIZE)
+        for _ in range(settings.EMAIL_WORKERS):
+            connection = SMTPConnection()
+            cls.connections.append(connection)
+            cls.workers.append(asyncio.create_task(cls._work(cls.queue, connection)))
+
+    @classmethod
+    async def close(cls, timeout: float = 10):
+        if cls.queue is None:
+            return
+        try:
+            await asyncio.wait_for(cls.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Email outbox closed with {cls.queue.qsize()} unsent emails")
+        if cls.delayed:
+            logger.error(f"Email outbox closed with {len(cls.delayed)} emails waiting for a retry")
+        for handle in cls.delayed:
+            handle.cancel()
+        for worker in cls.workers:
+            worker.cancel()
+        for connection in cls.connections:
+            await asyncio.to_thread(connection.close)
+        cls.queue, cls.workers, cls.connections, cls.delayed = None, [], [], set()
+
+    @classmethod
+    def enqueue(cls, message: EmailMessage) -> None:
+        cls.start()
+        try:
+            cls.queue.put_nowait((message, 0))  # type: ignore
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail='Email service is busy, try again later.')
+
+    @classmethod
+    def _requeue(cls, queue: asyncio.Queue, message: EmailMessage, attempt: int) -> None:
+        try:
+            queue.put_nowait((message, attempt))
+        except asyncio.QueueFull:
+            cls.failed += 1
+            logger.error(f"Email was not sent: TO: {message['To']}: outbox is full for a retry")
+
+    @classmethod
+    def _retry_later(cls, queue: asyncio.Queue, message: EmailMessage, attempt: int) -> None:
+        def retry() -> None:
+            cls.delayed.discard(handle)
+            cls._requeue(queue, message, attempt)
+
+        handle = asyncio.get_running_loop().call_later(settings.EMAIL_RETRY_BACKOFF * 2 ** (attempt - 1), retry)
+        cls.delayed.add(handle)
+
+    @classmethod
+    async def _work(cls, queue: asyncio.Queue, connection: SMTPConnection):
+        while True:
+            message, attempt = await queue.get()
+            try:
+                await cls._deliver(queue, message, attempt, connection)
+            finally:
+                queue.task_done()
+
+    @classmethod
+    async def _deliver(cls, queue: asyncio.Queue, message: EmailMessage, attempt: int, connection: SMTPConnection):
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(connection.send, message)
+        except Exception as e:
+            cls.stats.observe((time.perf_counter() - started) * 1000, failed=True)
+            await asyncio.to_thread(connection.close)
+            if attempt == settings.EMAIL_MAX_RETRIES:
+                cls.failed += 1
+                logger.error(f"Email was not sent: TO: {message['To']}: {str(e)}")
+                return
+            cls.retries += 1
+            cls._retry_later(queue, message, attempt + 1)
         else:
-            html_template = environment.get_template("reset.html")
+            cls.stats.observe((time.perf_counter() - started) * 1000)
+            cls.sent += 1
+            logger.info(f"Email successfully send: TO: {message['To']}")
+
+    @classmethod
+    def metrics(cls) -> tp.Dict[str, tp.Any]:
+        return {
+            'queue_depth': cls.queue.qsize() if cls.queue is not None else 0,
+            'waiting_for_retry': len(cls.delayed),
+            'workers': len(cls.workers),
+            'sent': cls.sent,
+            'failed': cls.failed,
+            'retries': cls.retries,
+            'send': cls.stats.as_dict(),
+        }
+
+
+async def send_mail(email: str, content: str):
+    msg = EmailMessage()
+    msg["Subject"] = "Registration"
+    msg["From"] = settings.EMAIL_HOST_USER
+    msg["To"] = email
+    msg.add_alternative(content, subtype="html")
+    EmailOutbox.enqueue(msg)
+
+
+class TemplateRegistry:
+    """
+    Jinja2 environment created once: templates are compiled at startup, bytecode is cached on disk and
+    (unless TEMPLATES_AUTO_RELOAD is on) sources are never re-read. Locale variants are named '<name>.<locale>.html'
+    """
+
+    environment: Environment | None = None
+    available: tp.Set[str] = set()
+    stats: tp.Dict[str, TimingStats] = {}
+
+    @classmethod
+    def start(cls) -> Environment:
+        if cls.environment is None:
+            os.makedirs(settings.TEMPLATES_BYTECODE_CACHE_DIR, exist_ok=True)
+            cls.environment = Environment(
+                loader=FileSystemLoader(settings.TEMPLATES_DIR),
+                bytecode_cache=FileSystemBytecodeCache(settings.TEMPLATES_BYTECODE_CACHE_DIR),
+                auto_reload=settings.TEMPLATES_AUTO_RELOAD,
+                enable_async=True,
+            )
+            cls.available = set(cls.environment.list_templates())
+            for name in cls.available:
+                cls.environment.get_template(name)
+            logger.info(f"Email templates compiled: {sorted(cls.available)}")
+        return cls.environment
+
+    @classmethod
+    def resolve(cls, name: str, locale: str | None = None) -> str:
+        if settings.TEMPLATES_AUTO_RELOAD:
+            cls.available = set(cls.environment.list_templates())  # type: ignore
+        if locale:
+            base, extension = os.path.splitext(name)
+            localized = f"{base}.{locale.lower()}{extension}"
+            if localized in cls.available:
+                return localized
+        return name
+
+    @classmethod
+    async def render(cls, name: str, locale: str | None = None, **context: tp.Any) -> str:
+        environment = cls.start()
+        template_name = cls.resolve(name, locale)
+        stats = cls.stats.setdefault(template_name, TimingStats())
+        with stats.measure():
+            return await environment.get_template(template_name).render_async(**context)
+
+    @classmethod
+    def metrics(cls) -> tp.Dict[str, tp.Any]:
+        return {name: stats.as_dict() for name, stats in cls.stats.items()}
+
+
+async def open_html(user_email: str, user_name: str, user_code: str, action: bool, locale: str | None = None):
+    try:
         data = {
             "user_email": user_email,
             "user_name": user_name,
             "user_code": user_code,
         }
-        rendered = html_template.render(**data)
-        return rendered
+        return await TemplateRegistry.render("change.html" if action else "reset.html", locale=locale, **data)
 
     except IOError:
         logger.info("The template file doesn't found")
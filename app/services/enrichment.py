@@ -0,0 +1,91 @@
+import asyncio
+import typing as tp
+
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+
+from app.config import settings, logger
+from app.repositories import UsersRepository
+from app.services.fns import FnsClient, company_info
+
+
+class CompanyEnrichment:
+    """
+    Background worker filling name/head/address of legal persons registered with enrichment 'pending'.
+    Failed lookups are retried with exponential backoff, a TIN missing from the registry is final
+    """
+
+    task: asyncio.Task | None = None
+    wakeup: asyncio.Event | None = None
+    enriched: int = 0
+    failed: int = 0
+
+    @classmethod
+    def start(cls):
+        if settings.COMPANY_ENRICHMENT == 'deferred' and cls.task is None:
+            cls.wakeup = asyncio.Event()
+            cls.task = asyncio.create_task(cls._work())
+
+    @classmethod
+    async def close(cls):
+        if cls.task is not None:
+            cls.task.cancel()
+            cls.task = None
+            cls.wakeup = None
+
+    @classmethod
+    def notify(cls):
+        """
+        Process new registrations right away instead of waiting for the next poll
+        """
+        if cls.wakeup is not None:
+            cls.wakeup.set()
+
+    @classmethod
+    async def _enrich(cls, repository: UsersRepository, user: dict) -> None:
+        attempts = user.get('enrichment_attempts', 0) + 1
+        try:
+            items = await FnsClient.find_companies(user['additional_info']['inn'])
+            if not items:
+                await repository.update_enrichment(user['_id'], status='not_found', attempts=attempts)
+                return
+            # values the user entered win over the registry, as in the sync mode
+            additional_info = user['additional_info']
+            fields = {key: value for key, value in company_info(items).items() if additional_info.get(key) is None}
+            await repository.update_enrichment(user['_id'], status='done', fields=fields, attempts=attempts)
+            cls.enriched += 1
+        except (HTTPException, KeyError, IndexError) as e:
+            cls.failed += 1
+            status = 'pending' if attempts < settings.ENRICHMENT_MAX_ATTEMPTS else 'failed'
+            retry_at = datetime.utcnow() + timedelta(seconds=settings.ENRICHMENT_RETRY_DELAY * 2 ** (attempts - 1))
+            await repository.update_enrichment(user['_id'], status=status, attempts=attempts, retry_at=retry_at)
+            logger.warning(f"Company enrichment of user {user['_id']} failed ({attempts} attempt): {str(e)}")
+
+    @classmethod
+    async def run_once(cls) -> int:
+        repository = UsersRepository()
+        users = await repository.claim_pending_enrichment(
+            limit=settings.ENRICHMENT_BATCH_SIZE, lease=int(settings.FNS_DEADLINE * 2) + 1
+        )
+        await asyncio.gather(*(cls._enrich(repository, user) for user in users))
+        return len(users)
+
+    @classmethod
+    async def _work(cls):
+        while True:
+            try:
+                processed = await cls.run_once()
+            except Exception as e:
+                logger.error(f"Company enrichment batch failed: {str(e)}")
+                processed = 0
+            if processed < settings.ENRICHMENT_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(cls.wakeup.wait(), timeout=settings.ENRICHMENT_INTERVAL)  # type: ignore
+                except asyncio.TimeoutError:
+                    pass
+                cls.wakeup.clear()  # type: ignore
+
+    @classmethod
+    def metrics(cls) -> tp.Dict[str, tp.Any]:
+        return {'mode': settings.COMPANY_ENRICHMENT, 'enriched': cls.enriched, 'failed': cls.failed}
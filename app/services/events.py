@@ -0,0 +1,10 @@
+import typing as tp
+
+from app.database.rabbit_mq import RabbitManager
+
+
+def publish_event(event: str, payload: tp.Dict[str, tp.Any]) -> None:
+    """
+    Fire-and-forget domain event (user.created, project.deleted, ...), never blocks the request
+    """
+    RabbitManager.publish(routing_key=event, payload=payload)
@@ -0,0 +1,262 @@
+import json
+import time
+import asyncio
+import aiohttp
+import typing as tp
+
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from pymongo.errors import PyMongoError
+
+from app.config import settings, logger
+from app.database.redis import RedisRepository
+from app.repositories import CompaniesRepository
+from app.utils.cache import TTLCache
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.metrics import TimingStats
+
+
+class FnsClient(RedisRepository):
+    """
+    api-fns.ru client: one pooled keep-alive session for the app lifetime, results cached in process and in redis
+    (registry misses are cached for a shorter time) and answered from the local registry mirror when it is fresh,
+    concurrent lookups of the same TIN share one upstream call.
+    Upstream calls have a deadline, are hedged past the p95 latency and fail fast while the circuit breaker is open
+    """
+
+    session: aiohttp.ClientSession | None = None
+    cache = TTLCache(maxsize=settings.FNS_CACHE_SIZE)
+    in_flight: tp.Dict[str, asyncio.Future] = {}
+    breaker = CircuitBreaker(
+        failure_threshold=settings.FNS_BREAKER_FAILURES, reset_timeout=settings.FNS_BREAKER_RESET_TIMEOUT
+    )
+    stats = TimingStats()
+    hedged: int = 0
+    upstream_calls: int = 0
+    redis_hits: int = 0
+    coalesced: int = 0
+    mirror_hits: int = 0
+    stale_mirror_hits: int = 0
+
+    @classmethod
+    def start(cls) -> aiohttp.ClientSession:
+        if cls.session is None or cls.session.closed:
+            cls.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=settings.FNS_CONNECTION_LIMIT, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=settings.FNS_TIMEOUT),
+            )
+        return cls.session
+
+    @classmethod
+    async def close(cls):
+        if cls.session is not None:
+            await cls.session.close()
+            cls.session = None
+
+    @staticmethod
+    def _key(tin: str) -> str:
+        return f'fns:inn:{tin}'
+
+    @staticmethod
+    def _ttl(items: tp.List[dict]) -> int:
+        return settings.FNS_CACHE_TTL if items else settings.FNS_NEGATIVE_CACHE_TTL
+
+    @classmethod
+    async def _request(cls, tin: str) -> tp.List[dict]:
+        started = time.perf_counter()
+        try:
+            async with cls.start().get(
+                settings.API_FNS_URL, params={'req': tin, 'key': settings.API_FNS_KEY}
+            ) as response:
+                # TODO: Fix the description
+                if response.status == 403:
+                    raise HTTPException(
+                        status_code=500,
+                        detail="I'll fix the description later, if I threw it out, "
+                        "then it means you can't make a request to the api-fns",
+                    )
+                if response.status >= 500:
+                    raise HTTPException(status_code=502, detail="Company registry is unavailable.")
+                company_exist = await response.json()
+        except aiohttp.ClientError as e:
+            cls.stats.observe((time.perf_counter() - started) * 1000, failed=True)
+            raise HTTPException(status_code=502, detail="Company registry is unavailable.") from e
+        except HTTPException:
+            cls.stats.observe((time.perf_counter() - started) * 1000, failed=True)
+            raise
+        # cancelled hedges are not observed, they would drag the latency percentiles down
+        cls.stats.observe((time.perf_counter() - started) * 1000)
+        return company_exist.get("items", None) or []
+
+    @classmethod
+    def _hedge_delay(cls) -> float | None:
+        if not settings.FNS_HEDGE or cls.stats.count < settings.FNS_HEDGE_MIN_SAMPLES:
+            return None
+        return max(cls.stats.percentile(0.95) or 0.0, settings.FNS_HEDGE_MIN_DELAY) / 1000
+
+    @classmethod
+    async def _hedged_request(cls, tin: str) -> tp.List[dict]:
+        """
+        Send a second request if the first one is slower than the usual p95, the first successful answer wins
+        """
+        delay = cls._hedge_delay()
+        if delay is None:
+            return await cls._request(tin)
+
+        requests = [asyncio.ensure_future(cls._request(tin))]
+        try:
+            done, _ = await asyncio.wait(requests, timeout=delay)
+            if not done:
+                cls.hedged += 1
+                requests.append(asyncio.ensure_future(cls._request(tin)))
+
+            pending = set(requests)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for request in done:
+                    if request.exception() is None:
+                        return request.result()
+            return requests[0].result()
+        finally:
+            for request in requests:
+                if not request.done():
+                    request.cancel()
+
+    @classmethod
+    async def _fetch(cls, tin: str) -> tp.List[dict]:
+        if not cls.breaker.allow():
+            raise HTTPException(
+                status_code=503,
+                detail="Company registry is temporarily unavailable.",
+                headers={'Retry-After': str(max(1, int(cls.breaker.retry_after())))},
+            )
+
+        cls.upstream_calls += 1
+        try:
+            items = await asyncio.wait_for(cls._hedged_request(tin), timeout=settings.FNS_DEADLINE)
+        except asyncio.TimeoutError:
+            cls.breaker.record_failure()
+            raise HTTPException(status_code=504, detail="Company registry did not respond in time.")
+        except Exception:
+            cls.breaker.record_failure()
+            raise
+        cls.breaker.record_success()
+        return items
+
+    @classmethod
+    async def _read_shared(cls, tin: str) -> tp.List[dict] | None:
+        try:
+            redis = await cls.get_connection()
+            cached = await redis.get(cls._key(tin))
+        except Exception as e:
+            logger.warning(f"FNS shared cache is unavailable: {str(e)}")
+            return None
+        if cached is None:
+            return None
+        cls.redis_hits += 1
+        return json.loads(cached)
+
+    @classmethod
+    async def _write_shared(cls, tin: str, items: tp.List[dict]) -> None:
+        try:
+            redis = await cls.get_connection()
+            await redis.set(cls._key(tin), json.dumps(items), expire=cls._ttl(items))
+        except Exception as e:
+            logger.warning(f"FNS shared cache is unavailable: {str(e)}")
+
+    @classmethod
+    async def _read_mirror(cls, tin: str) -> tp.Dict[str, tp.Any] | None:
+        try:
+            return await CompaniesRepository().get_by_inn(tin)
+        except PyMongoError as e:
+            logger.warning(f"Company registry mirror is unavailable: {str(e)}")
+            return None
+
+    @classmethod
+    async def _write_mirror(cls, tin: str, items: tp.List[dict]) -> None:
+        try:
+            await CompaniesRepository().upsert(tin, items, source='live')
+        except PyMongoError as e:
+            logger.warning(f"Company registry mirror is unavailable: {str(e)}")
+
+    @classmethod
+    async def _fetch_or_mirror(cls, tin: str) -> tp.Tuple[tp.List[dict], bool]:
+        """
+        Fresh mirrored answer, otherwise the upstream one (and a stale mirrored one while upstream is down).
+        Second value tells whether the answer may be cached
+        """
+        company = await cls._read_mirror(tin)
+        if company is not None and company['updated_at'] > datetime.utcnow() - timedelta(
+                seconds=settings.COMPANY_MIRROR_MAX_AGE):
+            cls.mirror_hits += 1
+            return company['items'], True
+
+        try:
+            items = await cls._fetch(tin)
+        except HTTPException as e:
+            if company is None or e.status_code not in (502, 503, 504):
+                raise
+            cls.stale_mirror_hits += 1
+            logger.warning(f"Company registry is unavailable, serving a stale mirrored answer for {tin}")
+            return company['items'], False
+
+        if items:
+            await cls._write_mirror(tin, items)
+        return items, True
+
+    @classmethod
+    async def _lookup(cls, tin: str) -> tp.List[dict]:
+        items = await cls._read_shared(tin)
+        if items is None:
+            items, cacheable = await cls._fetch_or_mirror(tin)
+            if not cacheable:
+                return items
+            await cls._write_shared(tin, items)
+        cls.cache.set(tin, items, expires_at=time.time() + cls._ttl(items))
+        return items
+
+    @classmethod
+    async def find_companies(cls, tin: str) -> tp.List[dict]:
+        """
+        Registry entries for the TIN, empty list if there are none
+        """
+        items = cls.cache.get(tin)
+        if items is not None:
+            return items
+
+        future = cls.in_flight.get(tin)
+        if future is None:
+            future = asyncio.ensure_future(cls._lookup(tin))
+            cls.in_flight[tin] = future
+            future.add_done_callback(lambda _: cls.in_flight.pop(tin, None))
+        else:
+            cls.coalesced += 1
+        # a cancelled request must not cancel the lookup other requests are waiting for
+        return await asyncio.shield(future)
+
+    @classmethod
+    def metrics(cls) -> tp.Dict[str, tp.Any]:
+        return {
+            'local_cache': cls.cache.metrics(),
+            'redis_hits': cls.redis_hits,
+            'upstream_calls': cls.upstream_calls,
+            'coalesced': cls.coalesced,
+            'mirror_hits': cls.mirror_hits,
+            'stale_mirror_hits': cls.stale_mirror_hits,
+            'hedged': cls.hedged,
+            'latency': cls.stats.as_dict(),
+            'circuit_breaker': cls.breaker.as_dict(),
+        }
+
+
+def company_info(items: tp.List[dict]) -> tp.Dict[str, str]:
+    """
+    Name, head and address of the first legal entity in the registry answer
+    """
+    juridical_person = items[0]["ЮЛ"]
+    return {
+        "name": juridical_person["НаимСокрЮЛ"],
+        "head": juridical_person["Руководитель"]["ФИОПолн"],
+        "address": juridical_person["Адрес"]["АдресПолн"],
+    }
@@ -0,0 +1,215 @@
+import json
+import time
+import uuid
+import asyncio
+import jwt
+import typing as tp
+
+from datetime import datetime, timedelta
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from jwt.algorithms import get_default_algorithms
+
+from app.config import settings, logger
+from app.repositories import SigningKeysRepository
+
+EC_CURVES: tp.Dict[str, tp.Any] = {
+    'ES256': ec.SECP256R1,
+    'ES384': ec.SECP384R1,
+    'ES512': ec.SECP521R1,
+}
+
+
+class SigningKey(tp.NamedTuple):
+    kid: str
+    private_key: tp.Any
+    public_key: tp.Any
+    created_at: datetime
+    expires_at: datetime
+    jwk: tp.Dict[str, tp.Any]
+
+
+def _generate_private_key(algorithm: str) -> tp.Any:
+    if algorithm.startswith(('RS', 'PS')):
+        return rsa.generate_private_key(public_exponent=65537, key_size=settings.JWT_RSA_KEY_SIZE)
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+    if algorithm in EC_CURVES:
+        return ec.generate_private_key(EC_CURVES[algorithm]())
+    raise ValueError(f'Unsupported JWT algorithm: {algorithm}')
+
+
+def _load_key(document: dict) -> SigningKey:
+    private_key = serialization.load_pem_private_key(
+        document['private_key'].encode(), password=settings.SECRET_KEY.encode()
+    )
+    public_key = private_key.public_key()
+    jwk = json.loads(get_default_algorithms()[document['algorithm']].to_jwk(public_key))
+    jwk.update({'kid': document['_id'], 'alg': document['algorithm'], 'use': 'sig'})
+    return SigningKey(
+        kid=document['_id'],
+        private_key=private_key,
+        public_key=public_key,
+        created_at=document['created_at'],
+        expires_at=document['expires_at'],
+        jwk=jwk,
+    )
+
+
+class SigningKeys:
+    """
+    Key cache for JWT signing/verification.
+    HS* algorithms keep using the shared SECRET_KEY. For asymmetric algorithms(RS*, PS*, ES*, EdDSA) keys are
+    stored in mongo, tagged with a kid and rotated on schedule: a new key is published in JWKS before it is used for
+    signing and an old one stays verifiable until every token signed with it is expired
+    """
+
+    algorithm: str = settings.JWT_ALGORITHM
+    symmetric: bool = algorithm.startswith('HS')
+    keys: tp.Dict[str, SigningKey] = {}
+    loaded_at: float = 0.0
+    task: asyncio.Task | None = None
+    lock: asyncio.Lock | None = None
+
+    @classmethod
+    async def start(cls):
+        if cls.symmetric or cls.task is not None:
+            return
+        await cls.rotate_if_due()
+        cls.task = asyncio.create_task(cls._refresh_periodically())
+
+    @classmethod
+    async def close(cls):
+        if cls.task is not None:
+            cls.task.cancel()
+            cls.task = None
+
+    @classmethod
+    async def _refresh_periodically(cls):
+        while True:
+            await asyncio.sleep(settings.JWT_KEY_REFRESH_INTERVAL)
+            try:
+                await cls.rotate_if_due()
+            except Exception as e:
+                logger.error(f"Signing keys refresh failed: {str(e)}")
+
+    @classmethod
+    async def refresh(cls):
+        documents = await SigningKeysRepository().get_valid_keys(now=datetime.utcnow())
+        keys = {}
+        for document in documents:
+            if document['algorithm'] != cls.algorithm:
+                continue
+            key = cls.keys.get(document['_id'])
+            keys[document['_id']] = key if key is not None else _load_key(document)
+        cls.keys = keys
+        cls.loaded_at = time.monotonic()
+
+    @classmethod
+    def _rotation_due(cls) -> bool:
+        newest = max(cls.keys.values(), key=lambda key: key.created_at, default=None)
+        rotation_interval = timedelta(minutes=settings.JWT_KEY_ROTATION_INTERVAL)
+        return newest is None or newest.created_at + rotation_interval <= datetime.utcnow()
+
+    @classmethod
+    async def rotate_if_due(cls):
+        """
+        Generate a new key if the newest one is older than the rotation interval. The asyncio lock serializes
+        rotations of this process, the lease in mongo those of the replicas: a replica that does not get it
+        keeps the keys it has and picks up the new one on the next refresh
+        """
+        if cls.lock is None:
+            cls.lock = asyncio.Lock()
+        async with cls.lock:
+            await cls.refresh()
+            if not cls._rotation_due():
+                return
+
+            repository = SigningKeysRepository()
+            owner = uuid.uuid4().hex
+            if not await repository.acquire_rotation_lease(cls.algorithm, owner, settings.JWT_KEY_ROTATION_LEASE):
+                return
+            try:
+                # another replica may have rotated between the refresh and the lease
+                await cls.refresh()
+                if not cls._rotation_due():
+                    return
+
+                private_key = await asyncio.to_thread(_generate_private_key, cls.algorithm)
+                created_at = datetime.utcnow()
+                rotation_interval = timedelta(minutes=settings.JWT_KEY_ROTATION_INTERVAL)
+                document = {
+                    '_id': uuid.uuid4().hex,
+                    'algorithm': cls.algorithm,
+                    'private_key': private_key.private_bytes(
+                        encoding=serialization.Encoding.PEM,
+                        format=serialization.PrivateFormat.PKCS8,
+                        encryption_algorithm=serialization.BestAvailableEncryption(settings.SECRET_KEY.encode()),
+                    ).decode(),
+                    'created_at': created_at,
+                    'expires_at': created_at + rotation_interval + timedelta(
+                        seconds=settings.JWKS_MAX_AGE, minutes=settings.JWT_KEY_OVERLAP
+                    ),
+                }
+                await repository.create(instance=document)
+                cls.keys[document['_id']] = _load_key(document)
+                logger.info(f"New signing key generated: {document['_id']}")
+            finally:
+                await repository.release_rotation_lease(cls.algorithm, owner)
+
+    @classmethod
+    async def _ensure_loaded(cls):
+        # on the first start another replica may be generating the very first key
+        for _ in range(settings.JWT_KEY_WAIT_ATTEMPTS):
+            if cls.keys:
+                return
+            await cls.rotate_if_due()
+            if not cls.keys:
+                await asyncio.sleep(0.2)
+        if not cls.keys:
+            raise RuntimeError('No signing key is available')
+
+    @classmethod
+    async def signing_key(cls) -> tp.Tuple[str | None, tp.Any]:
+        """
+        Return (kid, key) to sign new tokens with. A key becomes active once JWKS consumers had time to fetch it
+        """
+        if cls.symmetric:
+            return None, settings.SECRET_KEY
+
+        await cls._ensure_loaded()
+        activated_before = datetime.utcnow() - timedelta(seconds=settings.JWKS_MAX_AGE)
+        keys = sorted(cls.keys.values(), key=lambda key: key.created_at)
+        active = [key for key in keys if key.created_at <= activated_before] or keys
+        return active[-1].kid, active[-1].private_key
+
+    @classmethod
+    async def verification_key(cls, token: str) -> tp.Tuple[str | None, tp.Any]:
+        """
+        Return (kid, key) to verify the token with, unknown kid forces a reload of the key cache
+        """
+        if cls.symmetric:
+            return None, settings.SECRET_KEY
+
+        kid = jwt.get_unverified_header(token).get('kid')
+        if kid is None:
+            raise jwt.InvalidTokenError('Token has no kid')
+
+        if kid not in cls.keys and time.monotonic() - cls.loaded_at > settings.JWT_KEY_MIN_RELOAD_INTERVAL:
+            await cls.refresh()
+        key = cls.keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError('Unknown signing key')
+        return kid, key.public_key
+
+    @classmethod
+    def is_known(cls, kid: str | None) -> bool:
+        return cls.symmetric or kid in cls.keys
+
+    @classmethod
+    async def jwks(cls) -> tp.Dict[str, tp.Any]:
+        if cls.symmetric:
+            return {'keys': []}
+        await cls._ensure_loaded()
+        return {'keys': [key.jwk for key in cls.keys.values()]}
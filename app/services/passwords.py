@@ -0,0 +1,82 @@
+import asyncio
+import typing as tp
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.config import settings, logger
+from app.utils.metrics import TimingStats
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing/verification in a bounded worker pool so the event loop stays responsive
+    """
+
+    executor: Executor | None = None
+    workers: int = settings.PASSWORD_HASH_WORKERS
+    queue_size: int = settings.PASSWORD_HASH_QUEUE_SIZE
+    in_flight: int = 0
+    rejected: int = 0
+    stats: tp.Dict[str, TimingStats] = {'hash': TimingStats(), 'verify': TimingStats()}
+
+    @classmethod
+    def start(cls) -> Executor:
+        if cls.executor is None:
+            if settings.PASSWORD_HASH_EXECUTOR == 'process':
+                cls.executor = ProcessPoolExecutor(max_workers=cls.workers)
+            else:
+                cls.executor = ThreadPoolExecutor(max_workers=cls.workers, thread_name_prefix='password-hasher')
+            logger.info(f"Password hasher started: {settings.PASSWORD_HASH_EXECUTOR} pool of {cls.workers} workers")
+        return cls.executor
+
+    @classmethod
+    async def close(cls):
+        if cls.executor is not None:
+            cls.executor.shutdown(wait=False, cancel_futures=True)
+            cls.executor = None
+
+    @classmethod
+    async def _run(cls, operation: str, func: tp.Callable[..., tp.Any], *args: tp.Any) -> tp.Any:
+        if cls.in_flight >= cls.workers + cls.queue_size:
+            cls.rejected += 1
+            raise HTTPException(status_code=503, detail='Server is busy, try again later.')
+
+        executor = cls.start()
+        cls.in_flight += 1
+        try:
+            with cls.stats[operation].measure():
+                return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        finally:
+            cls.in_flight -= 1
+
+    @classmethod
+    async def hash(cls, password: str) -> str:
+        return await cls._run('hash', _hash_password, password)
+
+    @classmethod
+    async def verify(cls, plain_password: str, hashed_password: str) -> bool:
+        return await cls._run('verify', _verify_password, plain_password, hashed_password)
+
+    @classmethod
+    def metrics(cls) -> tp.Dict[str, tp.Any]:
+        return {
+            'executor': settings.PASSWORD_HASH_EXECUTOR,
+            'workers': cls.workers,
+            'queue_size': cls.queue_size,
+            'in_flight': cls.in_flight,
+            'rejected': cls.rejected,
+            **{operation: stats.as_dict() for operation, stats in cls.stats.items()},
+        }
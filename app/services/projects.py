@@ -1,12 +1,27 @@
+import typing as tp
+
 from fastapi import HTTPException
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 from app.repositories.projects import ProjectsRepository
 from app.schemas.projects import PatchProjectUpdateRequest
+from app.services.events import publish_event
+
+
+def project_object_id(project_id: str) -> ObjectId:
+    if not ObjectId.is_valid(project_id):
+        raise HTTPException(status_code=404, detail='No such project.')
+    return ObjectId(project_id)
 
 
-async def get_project_by_id(project_id: str, owner_id: str) -> dict:
-    return await ProjectsRepository().get_project_by_id(_id=ObjectId(project_id), owner_id=owner_id)  # type: ignore
+async def get_project_by_id(project_id: str, owner_id: str, projection: tp.Dict[str, int] | None = None) -> dict:
+    project = await ProjectsRepository().get_project_by_id(
+        _id=project_object_id(project_id), owner_id=owner_id, projection=projection
+    )
+    if project is None:
+        raise HTTPException(status_code=404, detail='No such project.')
+    return project
 
 
 async def update_project(project_id: str, instance: PatchProjectUpdateRequest, owner_id: str):
@@ -14,20 +29,39 @@ async def update_project(project_id: str, instance: PatchProjectUpdateRequest, o
     if not data:
         raise HTTPException(status_code=400, detail='Bad request.')
 
-    await ProjectsRepository().update_by_id(instance_id=ObjectId(project_id), instance=data)
-    return await ProjectsRepository().get_project_by_id(_id=ObjectId(project_id), owner_id=owner_id)
+    try:
+        project = await ProjectsRepository().update_and_get(
+            query={'_id': project_object_id(project_id), 'owner': owner_id}, fields=data
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail='Project with such name already exists')
+    if project is None:
+        raise HTTPException(status_code=404, detail='No such project.')
+    publish_event('project.updated', {'project_id': project_id, 'owner_id': owner_id, 'fields': list(data)})
+    return project
+
+
+async def get_all_projects(owner_id: str, projection: tp.Dict[str, int] | None = None,
+                           after: ObjectId | None = None, limit: int | None = None):
+    return await ProjectsRepository().get_all_projects(owner_id=owner_id, projection=projection, after=after, limit=limit)
 
 
-async def get_all_projects(owner_id: str):
-    return await ProjectsRepository().get_all_projects(owner_id=owner_id)
+def iterate_projects(owner_id: str, projection: tp.Dict[str, int] | None = None) -> tp.AsyncIterator[dict]:
+    return ProjectsRepository().iterate({"owner": owner_id}, projection=projection)
 
 
 async def create_project(project) -> dict:
-    user = await ProjectsRepository().get_by_name(name=project.name)
-    if user:
-        raise HTTPException(status_code=409, detail='User with such name already exists')
-    return await ProjectsRepository().create(instance=project.dict())
+    existing = await ProjectsRepository().get_by_owner_and_name(owner_id=project.owner, name=project.name)
+    if existing:
+        raise HTTPException(status_code=409, detail='Project with such name already exists')
+    try:
+        created = await ProjectsRepository().create(instance=project.dict())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail='Project with such name already exists')
+    publish_event('project.created', {'project_id': str(created['_id']), 'owner_id': str(created.get('owner'))})
+    return created
 
 
 async def delete_project_by_id(project_id: str, owner_id: str):
-    return await ProjectsRepository().delete_project_by_id(_id=project_id, owner_id=owner_id)
+    await ProjectsRepository().delete_project_by_id(_id=project_object_id(project_id), owner_id=owner_id)
+    publish_event('project.deleted', {'project_id': project_id, 'owner_id': owner_id})
@@ -0,0 +1,180 @@
+import time
+import ipaddress
+import typing as tp
+
+from fastapi import HTTPException
+
+from app.config import settings, logger
+from app.database.redis import RedisRepository
+from app.utils.cache import TTLCache
+
+
+class RateLimit(tp.NamedTuple):
+    limit: int
+    window: int
+
+    @classmethod
+    def parse(cls, value: str) -> 'RateLimit':
+        """ '<requests>/<seconds>', e.g. '10/60' """
+        limit, window = value.split('/')
+        return cls(limit=int(limit), window=int(window))
+
+
+RATE_LIMITS: tp.Dict[str, tp.Dict[str, RateLimit]] = {
+    'login': {
+        'ip': RateLimit.parse(settings.RATE_LIMIT_LOGIN_IP),
+        'email': RateLimit.parse(settings.RATE_LIMIT_LOGIN_EMAIL),
+    },
+    'forgot_password': {
+        'ip': RateLimit.parse(settings.RATE_LIMIT_FORGOT_PASSWORD_IP),
+        'email': RateLimit.parse(settings.RATE_LIMIT_FORGOT_PASSWORD_EMAIL),
+    },
+    'reset_password': {
+        'ip': RateLimit.parse(settings.RATE_LIMIT_RESET_PASSWORD_IP),
+    },
+    'register': {
+        'ip': RateLimit.parse(settings.RATE_LIMIT_REGISTER_IP),
+        'email': RateLimit.parse(settings.RATE_LIMIT_REGISTER_EMAIL),
+    },
+}
+
+TRUSTED_PROXIES: tp.List[ipaddress.IPv4Network | ipaddress.IPv6Network] = [
+    ipaddress.ip_network(proxy.strip(), strict=False) for proxy in settings.TRUSTED_PROXIES.split(',') if proxy.strip()
+]
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(peer: str | None, forwarded_for: str | None = None) -> str:
+    """
+    Address the limits are keyed by. X-Forwarded-For is walked from the right past trusted proxies,
+    it is ignored unless the direct peer is a trusted proxy itself(a client can put anything there)
+    """
+    if peer is None:
+        return 'unknown'
+    address = peer
+    if forwarded_for and _is_trusted_proxy(peer):
+        for hop in reversed([hop.strip() for hop in forwarded_for.split(',') if hop.strip()]):
+            address = hop
+            if not _is_trusted_proxy(hop):
+                break
+    return address
+
+
+class TokenBucket:
+    def __init__(self, rate_limit: RateLimit):
+        self.capacity = float(rate_limit.limit)
+        self.refill_rate = rate_limit.limit / rate_limit.window
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def _too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail='Too many requests, try again later.',
+        headers={'Retry-After': str(max(1, int(retry_after)))},
+    )
+
+
+class RateLimiter(RedisRepository):
+    """
+    Sliding-window limiter shared through redis. A local token bucket and a local cache of blocked keys
+    reject most of the excessive requests without a redis round trip
+    """
+
+    buckets = TTLCache(maxsize=settings.RATE_LIMIT_LOCAL_KEYS)
+    blocked = TTLCache(maxsize=settings.RATE_LIMIT_LOCAL_KEYS)
+
+    def _check_blocked(self, key: str) -> None:
+        blocked_until = self.blocked.get(key)
+        if blocked_until is not None:
+            raise _too_many_requests(blocked_until - time.time())
+
+    def _block(self, key: str, seconds: float) -> HTTPException:
+        self.blocked.set(key, time.time() + seconds, expires_at=time.time() + seconds)
+        return _too_many_requests(seconds)
+
+    async def hit(self, action: str, scope: str, identity: str) -> None:
+        rate_limit = RATE_LIMITS[action][scope]
+        key = f'rate_limit:{action}:{scope}:{identity}'
+        self._check_blocked(key)
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate_limit)
+            self.buckets.set(key, bucket, expires_at=time.time() + rate_limit.window)
+        if not bucket.take():
+            raise self._block(key, 1 / bucket.refill_rate)
+
+        now = time.time()
+        window = int(now // rate_limit.window)
+        try:
+            redis = await self.get_connection()
+            transaction = redis.multi_exec()
+            transaction.incr(f'{key}:{window}')
+            transaction.expire(f'{key}:{window}', rate_limit.window * 2)
+            transaction.get(f'{key}:{window - 1}')
+            current, _, previous = await transaction.execute()
+        except Exception as e:
+            # shared counter is unavailable: rely on the local bucket only
+            logger.warning(f"Rate limiter is degraded: {str(e)}")
+            return
+
+        elapsed = now / rate_limit.window - window
+        if int(previous or 0) * (1 - elapsed) + current > rate_limit.limit:
+            raise self._block(key, (1 - elapsed) * rate_limit.window)
+
+    async def check_lockout(self, action: str, identity: str) -> None:
+        key = f'lockout:{action}:{identity}'
+        self._check_blocked(key)
+        try:
+            redis = await self.get_connection()
+            ttl = await redis.ttl(key)
+        except Exception as e:
+            logger.warning(f"Lockout check is degraded: {str(e)}")
+            return
+        if ttl > 0:
+            raise self._block(key, ttl)
+
+    async def register_failure(self, action: str, identity: str) -> None:
+        """
+        Count a failed attempt, every failure past the threshold doubles the lockout time
+        """
+        failures_key = f'failures:{action}:{identity}'
+        try:
+            redis = await self.get_connection()
+            transaction = redis.multi_exec()
+            transaction.incr(failures_key)
+            transaction.expire(failures_key, settings.LOCKOUT_FAILURES_WINDOW)
+            failures, _ = await transaction.execute()
+
+            excess = failures - settings.LOCKOUT_THRESHOLD
+            if excess >= 0:
+                seconds = min(settings.LOCKOUT_BASE_SECONDS * 2 ** excess, settings.LOCKOUT_MAX_SECONDS)
+                await redis.set(f'lockout:{action}:{identity}', failures, expire=seconds)
+                self._block(f'lockout:{action}:{identity}', seconds)
+        except Exception as e:
+            logger.warning(f"Failure counting is degraded: {str(e)}")
+
+
+async def check_rate_limit(action: str, ip: str, email: str | None = None) -> None:
+    rate_limiter = RateLimiter()
+    await rate_limiter.hit(action, 'ip', ip)
+    if email is not None and 'email' in RATE_LIMITS[action]:
+        await rate_limiter.hit(action, 'email', email.strip().lower())
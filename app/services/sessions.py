@@ -0,0 +1,107 @@
+import time
+import asyncio
+import typing as tp
+
+from app.config import settings, logger
+from app.repositories.sessions import SessionsRepository
+
+
+class RevocationFilter:
+    """
+    In-process copy of recently revoked users and of revoked, not yet expired access tokens, synced from redis
+    periodically. Checking an access token against it is a dict lookup, revocations made by this process
+    apply immediately
+    """
+
+    revoked: tp.Dict[str, float] = {}
+    # sha256 digest of the access token -> its expiration
+    revoked_tokens: tp.Dict[bytes, float] = {}
+    task: asyncio.Task | None = None
+
+    @classmethod
+    def keep_for(cls) -> int:
+        # access tokens issued before the revocation are dead once they expire
+        return settings.JWT_ACCESS_TTL * 60
+
+    @classmethod
+    def is_revoked(cls, user_id: str, issued_at: float) -> bool:
+        revoked_at = cls.revoked.get(user_id)
+        return revoked_at is not None and issued_at <= revoked_at
+
+    @classmethod
+    def add(cls, user_id: str, revoked_at: float) -> None:
+        cls.revoked[user_id] = max(revoked_at, cls.revoked.get(user_id, 0.0))
+
+    @classmethod
+    def is_token_revoked(cls, digest: bytes) -> bool:
+        return digest in cls.revoked_tokens
+
+    @classmethod
+    def add_token(cls, digest: bytes, expires_at: float) -> None:
+        cls.revoked_tokens[digest] = expires_at
+
+    @classmethod
+    async def sync(cls):
+        started = time.time()
+        revocations = await SessionsRepository().get_revocations(since=started - cls.keep_for())
+        revoked = {user_id: float(revoked_at) for user_id, revoked_at in revocations}
+        for user_id, revoked_at in cls.revoked.items():
+            # keep revocations made by this process while the sync was in progress
+            if revoked_at >= started:
+                revoked[user_id] = max(revoked_at, revoked.get(user_id, 0.0))
+        cls.revoked = revoked
+
+        tokens = await SessionsRepository().get_revoked_tokens(now=started)
+        revoked_tokens = {bytes.fromhex(digest): float(expires_at) for digest, expires_at in tokens}
+        for digest, expires_at in cls.revoked_tokens.items():
+            # tokens stay revoked until they expire, expired ones fail verification anyway
+            if expires_at > started:
+                revoked_tokens.setdefault(digest, expires_at)
+        cls.revoked_tokens = revoked_tokens
+
+    @classmethod
+    async def _sync_periodically(cls):
+        while True:
+            try:
+                await cls.sync()
+            except Exception as e:
+                logger.error(f"Revocation filter sync failed: {str(e)}")
+            await asyncio.sleep(settings.REVOCATION_SYNC_INTERVAL)
+
+    @classmethod
+    async def start(cls):
+        if cls.task is None:
+            cls.task = asyncio.create_task(cls._sync_periodically())
+
+    @classmethod
+    async def close(cls):
+        if cls.task is not None:
+            cls.task.cancel()
+            cls.task = None
+
+
+async def register_refresh_token(user_id: str, jti: str) -> None:
+    await SessionsRepository().add_refresh_token(user_id=user_id, jti=jti, expire=settings.JWT_REFRESH_TTL * 60)
+
+
+async def consume_refresh_token(user_id: str, jti: str) -> bool:
+    return await SessionsRepository().consume_refresh_token(user_id=user_id, jti=jti)
+
+
+async def revoke_access_token(digest: bytes, expires_at: float) -> None:
+    """
+    Reject the access token(by its sha256 digest) until it expires
+    """
+    RevocationFilter.add_token(digest, expires_at)
+    await SessionsRepository().revoke_token(digest=digest.hex(), expires_at=expires_at, now=time.time())
+
+
+async def revoke_all_sessions(user_id: str) -> None:
+    """
+    Revoke every refresh token of the user and reject access tokens issued before now
+    """
+    revoked_at = time.time()
+    RevocationFilter.add(user_id, revoked_at)
+    await SessionsRepository().revoke_all(
+        user_id=user_id, revoked_at=revoked_at, keep_revocations_for=RevocationFilter.keep_for()
+    )
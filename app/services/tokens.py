@@ -1,4 +1,7 @@
 import jwt
+import time
+import uuid
+import hashlib
 import typing as tp
 
 from fastapi.exceptions import HTTPException
@@ -7,6 +10,15 @@ from datetime import timedelta, datetime
 
 from app.config import settings
 from app.schemas.tokens import ObtainTokenResponseSchema
+from app.services.keys import SigningKeys
+from app.services.sessions import (
+    RevocationFilter,
+    consume_refresh_token,
+    register_refresh_token,
+    revoke_access_token,
+    revoke_all_sessions,
+)
+from app.utils.cache import TTLCache
 
 TOKEN_CREATE_HELPING_DATA: tp.Any = {
     'refresh': {
@@ -19,8 +31,62 @@ TOKEN_CREATE_HELPING_DATA: tp.Any = {
     }
 }
 
+verified_tokens = TTLCache(maxsize=settings.ACCESS_TOKEN_CACHE_SIZE)
 
-async def create_token(token_type: str, user_id: str) -> str:
+
+class UnexpectedTokenSubject(jwt.InvalidTokenError):
+    ...
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def forget_token(token: str) -> None:
+    """
+    Drop a token from the verified-token cache, so that the next request verifies it again(on revocation)
+    """
+    verified_tokens.pop(token_digest(token))
+
+
+def forget_all_tokens() -> None:
+    """
+    Drop every verified token
+    """
+    verified_tokens.clear()
+
+
+async def decode_token(token: str) -> tp.Tuple[str | None, tp.Dict[str, tp.Any]]:
+    """ Verify token signature and expiration, return (kid, payload) """
+
+    kid, key = await SigningKeys.verification_key(token)
+    payload = jwt.decode(token, key, algorithms=[settings.JWT_ALGORITHM])
+    return kid, payload
+
+
+async def decode_access_token(access_token: str) -> tp.Dict[str, tp.Any]:
+    """
+    Verify access token, verified tokens are cached until their own expiration
+    (a cached token is ignored as soon as its signing key is retired).
+    Revocations are checked on every call, so a cached token is rejected once it or its owner's sessions are revoked
+    """
+
+    digest = token_digest(access_token)
+    cached = verified_tokens.get(digest)
+    if cached is not None and SigningKeys.is_known(cached[0]):
+        payload = cached[1]
+    else:
+        kid, payload = await decode_token(access_token)
+        if payload['sub'] != settings.ACCESS_TOKEN_JWT_SUBJECT:
+            raise UnexpectedTokenSubject('Access token is expected')
+        verified_tokens.set(digest, (kid, payload), expires_at=payload['exp'])
+
+    if RevocationFilter.is_revoked(payload['id'], payload.get('iat', 0)) or RevocationFilter.is_token_revoked(digest):
+        raise jwt.InvalidTokenError('Token is revoked')
+    return payload
+
+
+async def create_token(token_type: str, user_id: str, jti: str | None = None) -> str:
     """ Create access token using credentials or refresh token """
 
     expire = datetime.utcnow() + timedelta(minutes=float(TOKEN_CREATE_HELPING_DATA[token_type]['expire']))
@@ -28,17 +94,28 @@ async def create_token(token_type: str, user_id: str) -> str:
     payload = {
         'id': user_id,
         'exp': expire,
+        'iat': time.time(),
         'sub': TOKEN_CREATE_HELPING_DATA[token_type]['subject'],
     }
-    encoded_jwt: str = jwt.encode(payload=payload, key=settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    if jti is not None:
+        payload['jti'] = jti
+    kid, key = await SigningKeys.signing_key()
+    encoded_jwt: str = jwt.encode(
+        payload=payload,
+        key=key,
+        algorithm=settings.JWT_ALGORITHM,
+        headers={'kid': kid} if kid else None,
+    )
     return encoded_jwt
 
 
 async def create_tokens(user_id: str) -> ObtainTokenResponseSchema:
     """ Create tokens """
 
+    jti = uuid.uuid4().hex
     access_token = await create_token(token_type='access', user_id=user_id)
-    refresh_token = await create_token(token_type='refresh', user_id=user_id)
+    refresh_token = await create_token(token_type='refresh', user_id=user_id, jti=jti)
+    await register_refresh_token(user_id=user_id, jti=jti)
 
     return_data: tp.Dict[str, tp.Any] = {
         'refresh_token': refresh_token,
@@ -51,19 +128,70 @@ async def create_tokens(user_id: str) -> ObtainTokenResponseSchema:
 
 async def generate_access_token_from_refresh(refresh_token: str) -> tp.Dict[str, tp.Any]:
     """
-    Generate access token from refresh token
+    Generate access token from refresh token, the refresh token is rotated(can be used only once)
     Args:
         refresh_token: refresh_token
     Return:
         dict with access token
     """
 
-    try:
-        payload = jwt.decode(refresh_token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])  # type: ignore
+    payload = await _decode_refresh_token(refresh_token)
+    if not await consume_refresh_token(user_id=payload['id'], jti=payload['jti']):
+        # refresh token was rotated or revoked already: somebody replays it, kill the whole session family
+        await revoke_all_sessions(user_id=payload['id'])
+        raise HTTPException(status_code=401, detail='Refresh token has been revoked')
+
+    return_data = await create_tokens(user_id=payload['id'])
+    return return_data.dict()
 
-        if payload['sub'] != settings.REFRESH_TOKEN_JWT_SUBJECT:
-            raise HTTPException(status_code=401, detail='Refresh token is expected')
-        return_data = await create_tokens(user_id=payload['id'])
-        return return_data.dict()
+
+async def _decode_refresh_token(refresh_token: str) -> tp.Dict[str, tp.Any]:
+    try:
+        _, payload = await decode_token(refresh_token)
     except Exception:
         raise HTTPException(status_code=401, detail='Invalid token or token is expired')
+
+    if payload['sub'] != settings.REFRESH_TOKEN_JWT_SUBJECT or 'jti' not in payload:
+        raise HTTPException(status_code=401, detail='Refresh token is expected')
+    return payload
+
+
+async def logout(refresh_token: str, all_sessions: bool = False, access_token: str | None = None) -> None:
+    """
+    Revoke the refresh token, or every session of its owner.
+    The access token the client logs out with is revoked as well, if it belongs to the same user
+    """
+
+    payload = await _decode_refresh_token(refresh_token)
+    if all_sessions:
+        await revoke_all_sessions(user_id=payload['id'])
+    else:
+        await consume_refresh_token(user_id=payload['id'], jti=payload['jti'])
+    if access_token:
+        try:
+            _, access_payload = await decode_token(access_token)
+        except jwt.InvalidTokenError:
+            return
+        if access_payload['sub'] == settings.ACCESS_TOKEN_JWT_SUBJECT and access_payload['id'] == payload['id']:
+            await revoke_access_token(token_digest(access_token), expires_at=access_payload['exp'])
+
+
+async def introspect_tokens(tokens: tp.List[str]) -> tp.List[tp.Dict[str, tp.Any]]:
+    """
+    Verify a batch of access tokens the same way the auth middleware does
+    Args:
+        tokens: access tokens, duplicates are verified once
+    Return:
+        list of {active, user_id, sub, exp} in the order of tokens
+    """
+
+    results: tp.Dict[str, tp.Dict[str, tp.Any]] = {}
+    for token in tokens:
+        if token in results:
+            continue
+        try:
+            payload = await decode_access_token(token)
+            results[token] = {'active': True, 'user_id': payload['id'], 'sub': payload['sub'], 'exp': payload['exp']}
+        except Exception:
+            results[token] = {'active': False}
+    return [results[token] for token in tokens]
@@ -1,19 +1,18 @@
 import os
-import json
 import uuid
 import secrets
-import aiohttp
 import mimetypes
 import typing as tp
 
 from fastapi import HTTPException, UploadFile
 
-from datetime import datetime, timedelta
 from bson import ObjectId
-from passlib.context import CryptContext
+from pymongo.errors import DuplicateKeyError
 
 from app.config import settings
-from app.repositories import UsersRepository, ProjectsRepository
+from app.enums import UserRole
+from app.repositories import DeletionJobsRepository, UsersRepository
+from app.repositories.reset_codes import get_reset_codes_repository
 from app.schemas import (
     Token as TokenSchema,
     Login as LoginSchema,
@@ -23,41 +22,19 @@ from app.schemas import (
     RetrieveLogin as RetrieveLoginSchema,
 )
 from app import services
-from app.schemas.users import PatchUserUpdateRequest
+from app.schemas.users import EnrichmentStatus as EnrichmentStatusSchema, PatchUserUpdateRequest
+from app.services.passwords import PasswordHasher
+from app.services.rate_limit import RateLimiter
+from app.services.deletion import CascadeDeletion
+from app.services.events import publish_event
+from app.services.fns import FnsClient, company_info
+from app.services.sessions import revoke_all_sessions
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+reset_codes = get_reset_codes_repository()
 
 
-async def append_to_json_file(file_name, expire_date, _id, secure_number):
-    try:
-        with open(file_name, "r") as file:
-            data = dict(json.load(file))
-
-        data[secure_number] = [expire_date, _id]
-        with open(file_name, "w") as file:
-            json.dump(data, file)
-    except FileNotFoundError:
-        data_test = []
-        with open(file_name, "w") as file:
-            json.dump(data_test, file)
-
-
-async def read_secure_number(file_name, secure_number):
-    # TODO refactor
-    with open(file_name, "r") as file:
-        data = json.load(file)
-
-    if secure_number not in data:
-        raise HTTPException(status_code=409, detail="Invalid secure number.")
-
-    expire_date, _id = data[secure_number]
-    if datetime.now() > datetime.fromisoformat(expire_date):
-        raise HTTPException(status_code=409, detail="Secure number has expired.")
-    return _id
-
-
-async def get_user_by_id(user_id: str) -> dict:
-    return await UsersRepository().get_by_id(_id=ObjectId(user_id))  # type: ignore
+async def get_user_by_id(user_id: str, projection: tp.Dict[str, int] | None = None) -> dict:
+    return await UsersRepository().get_by_id(_id=ObjectId(user_id), projection=projection)  # type: ignore
 
 
 async def save_user_avatar_image(
@@ -110,117 +87,159 @@ async def update_user(
     if not data:
         raise HTTPException(status_code=400, detail="Bad request.")
 
-    await UsersRepository().update_by_id(instance_id=ObjectId(user_id), instance=data)
-    return await UsersRepository().get_by_id(_id=ObjectId(user_id))
+    try:
+        user = await UsersRepository().update_and_get(query={"_id": ObjectId(user_id)}, fields=data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="User with such email already exists")
+    if user is None:
+        raise HTTPException(status_code=404, detail="No such user.")
+    return user
 
 
 async def get_all():
     return await UsersRepository().get_all()
 
 
+async def get_users_page(after: ObjectId | None, limit: int, projection: tp.Dict[str, int] | None = None):
+    return await UsersRepository().find_page({}, after=after, limit=limit, projection=projection)
+
+
+def iterate_users(projection: tp.Dict[str, int] | None = None) -> tp.AsyncIterator[dict]:
+    return UsersRepository().iterate({}, projection=projection)
+
+
+async def require_admin(user_id: str) -> None:
+    user = await get_user_by_id(user_id=user_id, projection={"role": 1})
+    if user is None or user.get("role") != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only administrators can do this.")
+
+
 async def create_user(person) -> dict:
     user = await UsersRepository().get_by_email(email=person.email)
-    person.password = pwd_context.hash(person.password)
     if user:
         raise HTTPException(
             status_code=409, detail="User with such email already exists"
         )
-    return await UsersRepository().create(instance=person.dict())
+    person.password = await PasswordHasher.hash(person.password)
+    try:
+        user = await UsersRepository().create(instance=person.dict())
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=409, detail="User with such email already exists"
+        )
+    publish_event('user.created', {'user_id': str(user['_id']), 'email': user.get('email')})
+    return user
 
 
 async def login_user(data: LoginSchema) -> TokenSchema:
     user = await UsersRepository().get_by_email(email=data.email)
-    if user is None:
+    if user is None or user.get("deleting"):
         raise HTTPException(status_code=404, detail="No such user with chosen email.")
 
-    if not pwd_context.verify(data.password, user.get("password")):
+    if not await PasswordHasher.verify(data.password, user.get("password")):
         raise HTTPException(status_code=401, detail="Incorrect credentials.")
 
     tokens = await services.create_tokens(user_id=str(user.get("_id")))
     return RetrieveLoginSchema(user=user, **tokens.dict())
 
 
-async def check_exist_company_by_inn(tin: str) -> dict:
+async def check_exist_company_by_inn(tin: str) -> tp.List[dict]:
     """
     :param tin: Taxpayer Identification Number
     :return: True if there is an entry in the registry with this TIN, else return False
     """
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            f"https://api-fns.ru/api/egr?req={tin}&key={settings.API_FNS_KEY}"
-        ) as response:
-            # TODO: Fix the description
-            if response.status == 403:
-                raise HTTPException(
-                    status_code=500,
-                    detail="I'll fix the description later, if I threw it out, "
-                    "then it means you can't make a request to the api-fns",
-                )
-            company_exist = await response.json()
-            data = company_exist.get("items", None)
-            if data is None or data == []:
-                raise HTTPException(
-                    status_code=404, detail="There no company with such TIN."
-                )
-            return data
+    data = await FnsClient.find_companies(tin)
+    if not data:
+        raise HTTPException(
+            status_code=404, detail="There no company with such TIN."
+        )
+    return data
 
 
 async def collect_additional_info(additional_info: dict):
     data = await check_exist_company_by_inn(tin=additional_info.get("inn", None))
-    juridical_person = data[0]["ЮЛ"]
-    name = juridical_person["НаимСокрЮЛ"]
-    full_name = juridical_person["Руководитель"]["ФИОПолн"]
-    address = juridical_person["Адрес"]["АдресПолн"]
-    return {"name": name, "head": full_name, "address": address} | additional_info
+    return company_info(data) | additional_info
 
 
-async def forgot_password(email: EmailSchema):
-    secure_number = secrets.randbelow(1000000)
-    secure_number_str = f"{secure_number:06}"
+async def prepare_legal_additional_info(additional_info: dict):
+    """
+    Company details are looked up now or, in the deferred mode, later by the enrichment worker
+    """
+    if settings.COMPANY_ENRICHMENT == 'deferred':
+        return additional_info | {"enrichment": "pending"}
+    return await collect_additional_info(additional_info)
 
+
+async def get_enrichment_status(user_id: str) -> EnrichmentStatusSchema:
+    user = await get_user_by_id(user_id=user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="No such user.")
+    additional_info = user.get("additional_info") or {}
+    status = additional_info.get("enrichment") or ("done" if "inn" in additional_info else "not_applicable")
+    return EnrichmentStatusSchema(
+        status=status, attempts=user.get("enrichment_attempts", 0), retry_at=user.get("enrichment_retry_at")
+    )
+
+
+async def forgot_password(email: EmailSchema):
     # TODO move to depends
     user = await UsersRepository().get_by_email(email=email.email)
     if user is None:
         raise HTTPException(status_code=404, detail="No such user with chosen email.")
 
-    expire_date = datetime.now() + timedelta(minutes=30)
-    await append_to_json_file(
-        "reset_passwords.json",
-        str(expire_date),
-        str(user.get("_id")),
-        secure_number_str,
-    )
+    for _ in range(settings.RESET_CODE_ATTEMPTS):
+        secure_number_str = f"{secrets.randbelow(1000000):06}"
+        if await reset_codes.save(secure_number_str, str(user.get("_id")), expire=settings.RESET_CODE_TTL):
+            break
+    else:
+        raise HTTPException(status_code=503, detail="Could not issue a secure number, try again later.")
 
     user_first_name = str(user.get("additional_info")["first_name"])
     await services.send_mail(
         email=email.email,
-        content=f"{await services.open_html(str(user.get('email')), user_first_name, secure_number_str, email.is_change)}",
+        content=f"{await services.open_html(str(user.get('email')), user_first_name, secure_number_str, email.is_change, email.locale)}",
     )
 
 
-async def reset_password(data: ResetPasswordsSchema):
-    _id = await read_secure_number(
-        "reset_passwords.json", secure_number=data.secure_code
-    )
-    user = await get_user_by_id(user_id=_id)
-    user["password"] = pwd_context.hash(data.password)
-    await UsersRepository().update_by_id(ObjectId(_id), user)
+async def reset_password(data: ResetPasswordsSchema, client_ip: str):
+    rate_limiter = RateLimiter()
+    await rate_limiter.check_lockout('reset_password', client_ip)
+    _id = await reset_codes.consume(data.secure_code)
+    if _id is None:
+        await rate_limiter.register_failure('reset_password', client_ip)
+        raise HTTPException(status_code=409, detail="Invalid or expired secure number.")
+    # the failures of the address are not cleared: redeeming a code of one's own account
+    # must not reset the count of codes guessed for other accounts, it expires on its own
+    password = await PasswordHasher.hash(data.password)
+    await UsersRepository().set_fields(ObjectId(_id), {"password": password})
+    await revoke_all_sessions(user_id=_id)
 
 
 async def activate_person(user_id: str):
-    # TODO add fastapi Depends(404 status code will be returned)
-    instance = await get_user_by_id(user_id=user_id)
-    instance["is_verified"] = True
-    await UsersRepository().update_by_id(
-        instance_id=ObjectId(user_id), instance=instance
-    )
+    if not await UsersRepository().set_fields(ObjectId(user_id), {"is_verified": True}):
+        raise HTTPException(status_code=404, detail="No such user.")
+    publish_event('user.verified', {'user_id': user_id})
 
 
 async def delete_person(user_id: str):
-    await UsersRepository().delete_by_id(_id=ObjectId(user_id))
-    await UsersRepository().delete_user_parsers(owner_id=ObjectId(user_id))
-    await ProjectsRepository().delete_all_user_projects(owner_id=ObjectId(user_id))
-    return {"result": f"User {user_id} sucessfully deleted"}
+    """
+    Mark the user as deleting, the user and everything it owns are removed by the background deletion job
+    """
+    await revoke_all_sessions(user_id=user_id)
+    if not await UsersRepository().set_fields(ObjectId(user_id), {"deleting": True}):
+        raise HTTPException(status_code=404, detail="No such user.")
+    job = await DeletionJobsRepository().schedule(user_id=user_id)
+    CascadeDeletion.notify()
+    return {"result": f"User {user_id} deletion is scheduled", "job_id": str(job["_id"])}
+
+
+async def get_deletion_status(job_id: str, user_id: str) -> dict:
+    job = None
+    if ObjectId.is_valid(job_id):
+        job = await DeletionJobsRepository().get_for_user(_id=ObjectId(job_id), user_id=user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No such deletion job.")
+    return job
 
 
 async def get_user_by_token(self, authorization: str) -> dict:
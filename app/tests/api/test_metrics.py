@@ -0,0 +1,34 @@
+import pytest
+
+from app.api.v1 import metrics
+from app.config import settings
+from app.services import create_token
+
+
+@pytest.mark.asyncio
+async def test_metrics(monkeypatch, async_client):
+    monkeypatch.setattr(metrics, 'METRICS_API_KEYS', [b'monitoring-key'])
+
+    response = await async_client.get('/api/v1/metrics/', headers={'X-Api-Key': 'monitoring-key'})
+
+    assert response.status_code == 200
+    assert 'access_token_cache' in response.json()
+
+
+@pytest.mark.asyncio
+async def test_metrics_require_api_key(monkeypatch, async_client):
+    monkeypatch.setattr(metrics, 'METRICS_API_KEYS', [b'monitoring-key'])
+    access_token = await create_token(token_type='access', user_id='some_user_id')
+
+    for headers in ({}, {'X-Api-Key': 'other-key'}, {'Authorization': f'{settings.TOKEN_TYPE} {access_token}'}):
+        response = await async_client.get('/api/v1/metrics/', headers=headers)
+        assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_disabled_without_keys(monkeypatch, async_client):
+    monkeypatch.setattr(metrics, 'METRICS_API_KEYS', [])
+
+    response = await async_client.get('/api/v1/metrics/', headers={'X-Api-Key': ''})
+
+    assert response.status_code == 401
@@ -0,0 +1,144 @@
+import json
+
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+
+from app.config import settings
+from app.enums import UserRole
+from app.repositories import ProjectsRepository, UsersRepository
+from app.tests.data.projects_factories import ProjectCreateFactory
+from app.tests.data.user_factories import PrivatePersonCreateFactory
+
+
+async def create_projects(owner_id: str, count: int) -> list:
+    created = []
+    for number in range(count):
+        project = ProjectCreateFactory.build().dict() | {
+            'name': f'project {number}', 'owner': owner_id, 'created_at': datetime.now()
+        }
+        created.append(await ProjectsRepository().create(instance=project))
+    return created
+
+
+def authorization(user: dict) -> dict:
+    return {'Authorization': f'{settings.TOKEN_TYPE} {user["access_token"]}'}
+
+
+@pytest.mark.asyncio
+async def test_projects_are_walked_through_next_page_header(async_client, private_user_with_token):
+    created = await create_projects(str(private_user_with_token['_id']), 3)
+
+    seen = []
+    params = {'limit': 2}
+    for _ in range(3):
+        response = await async_client.get(
+            '/api/v1/projects/get_projects/', params=params, headers=authorization(private_user_with_token)
+        )
+        assert response.status_code == 200
+        seen.extend(project['_id'] for project in response.json())
+        if 'X-Next-After' not in response.headers:
+            break
+        params['after'] = response.headers['X-Next-After']
+
+    assert seen == [str(project['_id']) for project in created]
+
+
+@pytest_asyncio.fixture()
+async def admin_with_token(private_user_with_token):
+    await UsersRepository().set_fields(private_user_with_token['_id'], {'role': UserRole.ADMIN.value})
+    return private_user_with_token
+
+
+@pytest.mark.asyncio
+async def test_projects_page_after_cursor(async_client, private_user_with_token):
+    created = await create_projects(str(private_user_with_token['_id']), 3)
+
+    response = await async_client.get(
+        '/api/v1/projects/get_projects/',
+        params={'limit': 1, 'after': str(created[0]['_id'])},
+        headers=authorization(private_user_with_token),
+    )
+
+    assert response.status_code == 200
+    assert [project['_id'] for project in response.json()] == [str(created[1]['_id'])]
+    assert response.headers['X-Next-After'] == str(created[1]['_id'])
+
+
+@pytest.mark.asyncio
+async def test_projects_last_page_has_no_next_page_header(async_client, private_user_with_token):
+    created = await create_projects(str(private_user_with_token['_id']), 3)
+
+    response = await async_client.get(
+        '/api/v1/projects/get_projects/',
+        params={'limit': 3, 'after': str(created[0]['_id'])},
+        headers=authorization(private_user_with_token),
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert 'X-Next-After' not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_projects_invalid_cursor(async_client, private_user_with_token):
+    response = await async_client.get(
+        '/api/v1/projects/get_projects/', params={'after': 'invalid'}, headers=authorization(private_user_with_token)
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_projects_stream(async_client, private_user_with_token):
+    created = await create_projects(str(private_user_with_token['_id']), 3)
+
+    response = await async_client.get(
+        '/api/v1/projects/get_projects/',
+        params={'stream': 'true', 'fields': 'id,name'},
+        headers=authorization(private_user_with_token),
+    )
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{'_id': str(project['_id']), 'name': project['name']} for project in created]
+
+
+@pytest.mark.asyncio
+async def test_users_are_walked_through_next_page_header(async_client, admin_with_token):
+    others = [await UsersRepository().create(PrivatePersonCreateFactory.build().dict()) for _ in range(2)]
+
+    seen = []
+    params = {'limit': 2, 'fields': 'id'}
+    for _ in range(3):
+        response = await async_client.get('/api/v1/users/', params=params, headers=authorization(admin_with_token))
+        assert response.status_code == 200
+        seen.extend(user['_id'] for user in response.json())
+        if 'X-Next-After' not in response.headers:
+            break
+        params['after'] = response.headers['X-Next-After']
+
+    assert seen == [str(user['_id']) for user in [admin_with_token, *others]]
+
+
+@pytest.mark.asyncio
+async def test_users_invalid_cursor(async_client, admin_with_token):
+    response = await async_client.get(
+        '/api/v1/users/', params={'after': 'invalid'}, headers=authorization(admin_with_token)
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_users_stream(async_client, admin_with_token):
+    response = await async_client.get(
+        '/api/v1/users/', params={'stream': 'true', 'fields': 'id,email'}, headers=authorization(admin_with_token)
+    )
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{'_id': str(admin_with_token['_id']), 'email': admin_with_token['email']}]
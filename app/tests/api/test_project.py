@@ -5,8 +5,20 @@ from app.config import settings
 from app.tests.data.projects_factories import ProjectCreateFactory, ProjectUpdateFactory
 
 
+@pytest.fixture(scope='module')
+def storage(module_storage):
+    # the tests create, read, update and delete one project, documents are kept between them
+    return module_storage
+
+
+@pytest.fixture(scope='module')
+def private_user_with_token(module_user_with_token):
+    # projects are scoped by their owner, so every test acts as the same user
+    return module_user_with_token
+
+
 @pytest.mark.asyncio
-async def test_create_project(async_client: AsyncClient, base_repository, global_dict, private_user_with_token):
+async def test_create_project(async_client: AsyncClient, storage, global_dict, private_user_with_token):
     project_payload = ProjectCreateFactory.build()
     response = await async_client.post(
         '/api/v1/projects/create/',
@@ -73,3 +85,15 @@ async def test_delete_project(async_client, private_user_with_token, global_dict
         },
     )
     assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_get_missing_project(async_client, private_user_with_token, global_dict):
+    for project_id in (global_dict["project_id"], 'invalid'):
+        response = await async_client.get(
+            url=f'/api/v1/projects/get/{project_id}/',
+            headers={
+                'Authorization': f'{settings.TOKEN_TYPE} {private_user_with_token["access_token"]}'
+            },
+        )
+        assert response.status_code == 404
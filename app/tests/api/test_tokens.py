@@ -0,0 +1,43 @@
+import pytest
+
+from app.api.v1 import tokens
+from app.config import settings
+from app.services import create_token
+
+
+@pytest.mark.asyncio
+async def test_introspect_tokens(monkeypatch, async_client):
+    monkeypatch.setattr(tokens, 'SERVICE_API_KEYS', [b'service-key'])
+    access_token = await create_token(token_type='access', user_id='some_user_id')
+    refresh_token = await create_token(token_type='refresh', user_id='some_user_id')
+
+    response = await async_client.post(
+        '/api/v1/tokens/introspect',
+        json={'tokens': [access_token, refresh_token, 'invalid', access_token]},
+        headers={'X-Api-Key': 'service-key'},
+    )
+
+    assert response.status_code == 200
+    results = response.json()['tokens']
+    assert [result['active'] for result in results] == [True, False, False, True]
+    assert results[0]['user_id'] == 'some_user_id'
+    assert results[0]['sub'] == settings.ACCESS_TOKEN_JWT_SUBJECT
+
+
+@pytest.mark.asyncio
+async def test_introspect_tokens_requires_service_key(monkeypatch, async_client):
+    monkeypatch.setattr(tokens, 'SERVICE_API_KEYS', [b'service-key'])
+    access_token = await create_token(token_type='access', user_id='some_user_id')
+
+    for headers in ({}, {'X-Api-Key': 'other-key'}, {'Authorization': f'{settings.TOKEN_TYPE} {access_token}'}):
+        response = await async_client.post('/api/v1/tokens/introspect', json={'tokens': [access_token]}, headers=headers)
+        assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_introspect_tokens_is_disabled_without_keys(monkeypatch, async_client):
+    monkeypatch.setattr(tokens, 'SERVICE_API_KEYS', [])
+
+    response = await async_client.post('/api/v1/tokens/introspect', json={'tokens': ['token']}, headers={'X-Api-Key': ''})
+
+    assert response.status_code == 401
@@ -2,9 +2,11 @@ import pytest
 import mock
 import jwt
 
+from fastapi import HTTPException
 from httpx import AsyncClient
 
 from app.repositories import UsersRepository
+from app.repositories.reset_codes import MemoryResetCodesRepository
 from app.tests.data.user_factories import (
     UserFactoryLoginUnauthorized,
     LegalPersonCreateFactory,
@@ -12,6 +14,16 @@ from app.tests.data.user_factories import (
 )
 from app import services
 from app.config import settings
+from app.services.deletion import CascadeDeletion
+from app.services.fns import FnsClient
+from app.utils.cache import TTLCache
+from app.utils.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture(scope='module')
+def storage(module_storage):
+    # the tests register, log in, refresh and delete one user, documents are kept between them
+    return module_storage
 
 
 class TestUsers:
@@ -52,7 +64,7 @@ class TestUsers:
         assert response.status_code == 401
 
     @pytest.mark.asyncio
-    async def test_register_private_person(self, async_client: AsyncClient, base_repository, global_dict):
+    async def test_register_private_person(self, async_client: AsyncClient, storage, global_dict):
         person_payload = PrivatePersonCreateFactory.build()
         response = await async_client.post('/api/v1/users/private_person/register/', json=person_payload.dict())
         # TODO move to docker-compose db
@@ -67,7 +79,7 @@ class TestUsers:
         assert "access_token" in response.json()
 
     @pytest.mark.asyncio
-    async def test_register_legal_person(self, async_client: AsyncClient, base_repository):
+    async def test_register_legal_person(self, async_client: AsyncClient, storage):
         person_payload = LegalPersonCreateFactory.build()
         response = await async_client.post('/api/v1/users/legal_person/register/', json=person_payload.dict())
         payload = jwt.decode(response.json()["access_token"], settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
@@ -79,7 +91,7 @@ class TestUsers:
         await services.delete_person(user_id)
 
     @pytest.mark.asyncio
-    async def test_login(self, async_client: AsyncClient, base_repository, global_dict):
+    async def test_login(self, async_client: AsyncClient, storage, global_dict):
         login_user = {
             "email": global_dict["email"],
             "password": global_dict["password"]
@@ -89,7 +101,7 @@ class TestUsers:
         assert response.status_code == 200
 
     @pytest.mark.asyncio
-    async def test_unauthorized_login(self, async_client: AsyncClient, base_repository):
+    async def test_unauthorized_login(self, async_client: AsyncClient, storage):
         login_payload = UserFactoryLoginUnauthorized.build()
         response = await async_client.post('/api/v1/users/login/', json=login_payload.dict())
 
@@ -97,14 +109,13 @@ class TestUsers:
         assert response.json()['detail'] == 'No such user with chosen email.'
 
     @mock.patch('app.services.users.services.send_mail')
-    @mock.patch('app.services.users.append_to_json_file')
+    @mock.patch('app.services.users.reset_codes', MemoryResetCodesRepository())
     @pytest.mark.asyncio
     async def test_forgot_password(
             self,
-            mock_append_to_json_file,
             mock_send_email,
             async_client: AsyncClient,
-            base_repository,
+            storage,
             global_dict,
     ):
         user_data = {
@@ -117,13 +128,12 @@ class TestUsers:
         user = await UsersRepository().create(user_data)
         person_payload = {'email': user_data['email']}
         mock_send_email.return_value = {}
-        mock_append_to_json_file.return_value = {}
         response = await async_client.post('/api/v1/users/forgot_password/', json=person_payload)
         assert response.status_code == 200
         await UsersRepository().delete_by_id(str(user['_id']))
 
     @pytest.mark.asyncio
-    async def test_forgot_password_invalid_email(self, async_client: AsyncClient, base_repository):
+    async def test_forgot_password_invalid_email(self, async_client: AsyncClient, storage):
         person_payload = {
             "email": "test@gmail.com",
         }
@@ -132,14 +142,26 @@ class TestUsers:
         assert response.status_code == 404
 
     @pytest.mark.asyncio
-    async def test_refresh_token(self, async_client: AsyncClient, base_repository, global_dict):
+    async def test_refresh_token(self, async_client: AsyncClient, storage, global_dict):
         person_payload = {"refresh_token": global_dict["refresh_token"]}
         response = await async_client.post('/api/v1/users/refresh_token/', json=person_payload)
 
         assert response.status_code == 200
+        global_dict["rotated_refresh_token"] = response.json()["refresh_token"]
+
+    @pytest.mark.asyncio
+    async def test_refresh_token_reuse(self, async_client: AsyncClient, storage, global_dict):
+        person_payload = {"refresh_token": global_dict["refresh_token"]}
+        response = await async_client.post('/api/v1/users/refresh_token/', json=person_payload)
+
+        assert response.status_code == 401
+        # reuse of a rotated token revokes the whole session family
+        person_payload = {"refresh_token": global_dict["rotated_refresh_token"]}
+        response = await async_client.post('/api/v1/users/refresh_token/', json=person_payload)
+        assert response.status_code == 401
 
     # @pytest.mark.asyncio
-    # async def test_refresh_token_unexpected(self, async_client: AsyncClient, base_repository):
+    # async def test_refresh_token_unexpected(self, async_client: AsyncClient, storage):
     #     person_payload = {"refresh_token": "test"}
     #
     #     response = await async_client.post('/api/v1/users/refresh_token/', json=person_payload)
@@ -148,21 +170,64 @@ class TestUsers:
     #     assert response.status_code == 500
     #     assert response.json()['detail'] == 'Unexpected Error occurred'
 
-    # TODO
-    @mock.patch('app.services.users.check_exist_company_by_inn')
     @pytest.mark.asyncio
-    async def test_inn(self, exist_company, async_client: AsyncClient, base_repository):
-        inn_id = settings.USER_INN
-        exist_company.return_value = None
-        response = await async_client.post(f'/api/v1/users/check_inn/?inn={inn_id}')
+    async def test_inn(self, monkeypatch, async_client: AsyncClient, storage):
+        responses = {
+            '1000000001': [],
+            '1000000002': HTTPException(status_code=502, detail='Company registry is unavailable.'),
+        }
+
+        async def request(cls, tin):
+            if isinstance(responses[tin], Exception):
+                raise responses[tin]
+            return responses[tin]
+
+        monkeypatch.setattr(FnsClient, '_request', classmethod(request))
+        monkeypatch.setattr(FnsClient, 'cache', TTLCache(maxsize=10))
+        monkeypatch.setattr(FnsClient, 'breaker', CircuitBreaker(failure_threshold=1, reset_timeout=60))
+
+        response = await async_client.post('/api/v1/users/check_inn/?inn=1000000001')
+        assert response.status_code == 404
+
+        response = await async_client.post('/api/v1/users/check_inn/?inn=1000000002')
+        assert response.status_code == 502
 
-        assert response.status_code == 500
+        # the failure opened the circuit breaker, the registry is not called until it resets
+        response = await async_client.post('/api/v1/users/check_inn/?inn=1000000003')
+        assert response.status_code == 503
+        assert int(response.headers['Retry-After']) > 0
 
     @pytest.mark.asyncio
-    async def test_activate(self, async_client: AsyncClient, base_repository, global_dict):
+    async def test_activate(self, async_client: AsyncClient, storage, global_dict):
         response = await async_client.post(f'/api/v1/users/activate/{global_dict["user_id"]}/')
         assert response.status_code == 200
 
     @pytest.mark.asyncio
-    async def test_delete_user(self, async_client: AsyncClient, base_repository, global_dict):
-        await services.delete_person(global_dict["user_id"])
+    async def test_delete_user(self, async_client: AsyncClient, storage, global_dict):
+        result = await services.delete_person(global_dict["user_id"])
+        await CascadeDeletion.run_pending()
+
+        # sessions issued before the deletion are revoked
+        access_token = await services.create_token(token_type='access', user_id=global_dict["user_id"])
+        response = await async_client.get(
+            f'/api/v1/users/deletion/{result["job_id"]}/',
+            headers={'Authorization': f'{settings.TOKEN_TYPE} {access_token}'}
+        )
+        assert response.status_code == 200
+        assert response.json()['status'] == 'done'
+        assert await UsersRepository().get_by_id(global_dict["user_id"]) is None
+
+    @pytest.mark.asyncio
+    async def test_deletion_status_of_other_user(self, async_client: AsyncClient, storage, private_user_with_token):
+        person_payload = PrivatePersonCreateFactory.build().dict()
+        user = await UsersRepository().create(person_payload)
+        result = await services.delete_person(str(user['_id']))
+        url = f'/api/v1/users/deletion/{result["job_id"]}/'
+
+        response = await async_client.get(url)
+        assert response.status_code == 401
+
+        response = await async_client.get(
+            url, headers={'Authorization': f'{settings.TOKEN_TYPE} {private_user_with_token["access_token"]}'}
+        )
+        assert response.status_code == 404
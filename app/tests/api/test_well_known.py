@@ -0,0 +1,26 @@
+import pytest
+
+from app.config import settings
+from app.services.keys import SigningKeys
+from app.tests.services.test_keys import use_algorithm
+
+
+@pytest.mark.asyncio
+async def test_jwks(monkeypatch, async_client):
+    use_algorithm(monkeypatch, 'EdDSA')
+
+    response = await async_client.get('/.well-known/jwks.json')
+
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == f'public, max-age={settings.JWKS_MAX_AGE}'
+    [key] = response.json()['keys']
+    assert key['kid'] in SigningKeys.keys
+    assert key['kty'] == 'OKP' and key['crv'] == 'Ed25519' and 'd' not in key
+
+
+@pytest.mark.asyncio
+async def test_jwks_of_symmetric_algorithm_is_empty(async_client):
+    response = await async_client.get('/.well-known/jwks.json')
+
+    assert response.status_code == 200
+    assert response.json() == {'keys': []}
@@ -1,15 +1,21 @@
-import mongomock
+import os
+
 import pytest
 
 from asyncio import get_event_loop
 
+# tests run on in-process collections unless STORAGE_BACKEND=mongo is given explicitly(e.g. for query plans)
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
 
 import pytest_asyncio
 from httpx import AsyncClient
 from datetime import datetime
+from app.config import settings
 from app.main import app
 
-from app.repositories import UsersRepository
+from app.repositories import BaseRepository, UsersRepository
+from app.repositories.storage import MemoryStorage
 from app.services import create_token
 
 from app.tests.data.user_factories import (
@@ -17,11 +23,9 @@ from app.tests.data.user_factories import (
     LegalPersonCreateFactory,
     PrivatePersonCreateFactory
 )
-from app.repositories import UsersRepository
 
 
-@pytest_asyncio.fixture()
-async def private_user_with_token():
+async def create_user_with_token() -> dict:
     person_payload = PrivatePersonCreateFactory.build()
     person_payload = person_payload.dict()
     person_payload.update({'is_verified': True, 'role': 'legal person', 'created_at': datetime.now()})
@@ -31,6 +35,20 @@ async def private_user_with_token():
     return user_data
 
 
+@pytest_asyncio.fixture()
+async def private_user_with_token():
+    return await create_user_with_token()
+
+
+@pytest_asyncio.fixture(scope='module')
+async def module_user_with_token(module_storage):
+    """
+    User shared by the tests of a module that act on the same documents(projects are scoped by their owner),
+    such a module overrides private_user_with_token with it
+    """
+    return await create_user_with_token()
+
+
 @pytest_asyncio.fixture(scope="session")
 def event_loop():
     loop = get_event_loop()
@@ -43,20 +61,32 @@ async def async_client():
         yield client
 
 
-@pytest_asyncio.fixture
-def mongo_client():
-    return None
-    return mongomock.MongoClient()
-
-
-@pytest_asyncio.fixture
-async def base_repository(mongo_client):
-    return None
-    db = mongo_client['testdb']
-    collection = db['test']
-    repository = UsersRepository()
-    repository.collection = collection
-    return repository
+def _isolated_storage():
+    if settings.STORAGE_BACKEND != 'memory':
+        # the mongo storage is shared, it is used by the tests of query plans
+        yield BaseRepository.storage
+        return
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        storage = MemoryStorage()
+        monkeypatch.setattr(BaseRepository, 'storage', storage)
+        yield storage
+
+
+@pytest.fixture(autouse=True)
+def storage():
+    """
+    Empty in-process storage for every test, so that tests do not see each other's documents
+    """
+    yield from _isolated_storage()
+
+
+@pytest.fixture(scope='module')
+def module_storage():
+    """
+    Storage shared by the tests of a module that form one flow(register, login, refresh, ...),
+    such a module overrides storage with it
+    """
+    yield from _isolated_storage()
 
 
 @pytest_asyncio.fixture(scope="session")
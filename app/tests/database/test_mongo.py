@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from pymongo import monitoring
+
+from app.config import settings
+from app.database import MongoManager
+from app.database.mongo import PoolMonitor
+
+ADDRESS = ('mongo-1', 27017)
+
+
+def test_pool_monitor_measures_checkout_wait():
+    pool_monitor = PoolMonitor()
+
+    pool_monitor.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    pool_monitor.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, 1))
+    pool_monitor.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, 1))
+    pool_monitor.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    pool_monitor.connection_check_out_failed(monitoring.ConnectionCheckOutFailedEvent(ADDRESS, 'timeout'))
+
+    server = pool_monitor.as_dict()['servers']['mongo-1:27017']
+    assert server['in_use'] == 1
+    assert server['checkout_wait']['count'] == 2
+    assert server['checkout_wait']['errors'] == 1
+
+    pool_monitor.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+    assert pool_monitor.as_dict()['servers']['mongo-1:27017']['in_use'] == 0
+
+
+def test_pool_monitor_counts_events_of_many_threads():
+    pool_monitor = PoolMonitor()
+
+    def check_out_and_in():
+        for _ in range(1000):
+            pool_monitor.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, 1))
+            pool_monitor.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, 1))
+            pool_monitor.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+
+    threads = [threading.Thread(target=check_out_and_in) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pool_monitor.created == 8000
+    assert pool_monitor.in_use['mongo-1:27017'] == 0
+
+
+@pytest.mark.asyncio
+async def test_client_is_created_lazily_with_pool_options():
+    await MongoManager.close()
+    assert MongoManager.client is None
+
+    assert MongoManager.db.name == settings.DB_NAME
+    pool_options = MongoManager.client.delegate.options.pool_options  # type: ignore
+    assert pool_options.max_pool_size == settings.MONGO_MAX_POOL_SIZE
+    assert pool_options.min_pool_size == settings.MONGO_MIN_POOL_SIZE
+    await MongoManager.close()
@@ -0,0 +1,105 @@
+import pytest
+
+from fastapi import Request
+
+from app.config import settings
+from app.middlewares.auth_middleware import AUTH_POLICIES, RouteMatcher, RoutePolicy, authenticate
+from app.services import create_token, create_tokens, logout
+from app.services.sessions import RevocationFilter
+from app.services.tokens import forget_token, verified_tokens
+
+
+def build_request(token: str) -> Request:
+    return Request({
+        'type': 'http',
+        'headers': [(b'authorization', f'{settings.TOKEN_TYPE} {token}'.encode())],
+    })
+
+
+@pytest.mark.asyncio
+async def test_verified_token_is_cached():
+    access_token = await create_token(token_type='access', user_id='some_user_id')
+    hits = verified_tokens.hits
+
+    assert await authenticate(build_request(access_token)) == (True, {})
+    assert await authenticate(build_request(access_token)) == (True, {})
+    assert verified_tokens.hits == hits + 1
+
+    forget_token(access_token)
+    request = build_request(access_token)
+    assert await authenticate(request) == (True, {})
+    assert request.state.user_id == 'some_user_id'
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_is_not_cached():
+    refresh_token = await create_token(token_type='refresh', user_id='some_user_id')
+    size = len(verified_tokens)
+
+    is_valid, _ = await authenticate(build_request(refresh_token))
+
+    assert not is_valid
+    assert len(verified_tokens) == size
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_access_token(async_client, private_user_with_token):
+    user_id = str(private_user_with_token['_id'])
+    tokens = await create_tokens(user_id=user_id)
+    other_access_token = await create_token(token_type='access', user_id=user_id)
+    for access_token in (tokens.access_token, other_access_token):
+        response = await async_client.get(
+            '/api/v1/users/me/', headers={'Authorization': f'{settings.TOKEN_TYPE} {access_token}'}
+        )
+        assert response.status_code == 200
+
+    response = await async_client.post(
+        '/api/v1/users/logout/',
+        json={'refresh_token': tokens.refresh_token},
+        headers={'Authorization': f'{settings.TOKEN_TYPE} {tokens.access_token}'},
+    )
+    assert response.status_code == 200
+
+    response = await async_client.get(
+        '/api/v1/users/me/', headers={'Authorization': f'{settings.TOKEN_TYPE} {tokens.access_token}'}
+    )
+    assert response.status_code == 401
+    # other sessions of the user are kept
+    response = await async_client.get(
+        '/api/v1/users/me/', headers={'Authorization': f'{settings.TOKEN_TYPE} {other_access_token}'}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_revoked_access_token_survives_sync():
+    tokens = await create_tokens(user_id='some_user_id')
+    await logout(refresh_token=tokens.refresh_token, access_token=tokens.access_token)
+
+    # another process learns about the revocation from redis
+    RevocationFilter.revoked_tokens = {}
+    await RevocationFilter.sync()
+
+    assert await authenticate(build_request(tokens.access_token)) == (False, {'error': 'Invalid token or token is expired'})
+
+
+@pytest.mark.asyncio
+async def test_logout_of_all_sessions_revokes_tokens_of_user():
+    tokens = await create_tokens(user_id='some_user_id')
+    assert await authenticate(build_request(tokens.access_token)) == (True, {})
+
+    await logout(refresh_token=tokens.refresh_token, all_sessions=True)
+
+    assert await authenticate(build_request(tokens.access_token)) == (False, {'error': 'Invalid token or token is expired'})
+
+
+def test_route_matcher():
+    matcher = RouteMatcher(AUTH_POLICIES)
+
+    assert matcher.match('/api/v1/users/me/') == RoutePolicy('/api/v1/users/me/')
+    assert matcher.match('/api/v1/projects/get/64b7f0c2e13823a0a4d5a8a1/') == RoutePolicy(
+        '/api/v1/projects/get/{project_id}/'
+    )
+    assert matcher.match('/api/v1/projects/get/a/b/') is None
+    assert matcher.match('/api/v1/users/login/') is None
+
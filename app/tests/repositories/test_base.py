@@ -0,0 +1,54 @@
+import pytest
+
+from bson import ObjectId
+
+from app.repositories import ProjectsRepository, UsersRepository
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_reports_per_item_results():
+    repository = UsersRepository()
+    await repository.create_indexes()
+    emails = [f'bulk_{index}_{ObjectId()}@mail.ru' for index in range(5)]
+    users = [{'email': email, 'additional_info': {}} for email in emails]
+    # same email in another case violates the unique normalized email
+    users.append({'email': emails[0].upper(), 'additional_info': {}})
+
+    results = await repository.bulk_create(users, batch_size=2)
+
+    assert [result.ok for result in results] == [True] * 5 + [False]
+    assert 'duplicate key' in results[5].error
+    created = [result.id for result in results if result.ok]
+    assert await repository.get_by_email(emails[3].upper()) is not None
+
+    updated = await repository.bulk_update([(_id, {'phone': '+375291234567'}) for _id in created], batch_size=2)
+    assert all(result.ok for result in updated)
+    assert (await repository.get_by_id(created[4]))['phone'] == '+375291234567'
+
+    deleted = await repository.bulk_delete([str(_id) for _id in created], batch_size=2)
+    assert [result.id for result in deleted] == created
+    assert await repository.get_by_id(created[0]) is None
+
+
+@pytest.mark.asyncio
+async def test_create_returns_inserted_document():
+    project = await ProjectsRepository().create({'name': 'project', 'owner': str(ObjectId())})
+
+    assert isinstance(project['_id'], ObjectId)
+    assert await ProjectsRepository().get_by_id(project['_id']) == project
+    await ProjectsRepository().delete_by_id(project['_id'])
+
+
+@pytest.mark.asyncio
+async def test_update_and_get_is_filtered_by_query():
+    repository = ProjectsRepository()
+    owner = str(ObjectId())
+    project = await repository.create({'name': 'project', 'owner': owner, 'region': 'Minsk'})
+
+    assert await repository.update_and_get({'_id': project['_id'], 'owner': str(ObjectId())}, {'name': 'x'}) is None
+    updated = await repository.update_and_get({'_id': project['_id'], 'owner': owner}, {'name': 'renamed'})
+
+    assert updated == project | {'name': 'renamed'}
+    assert await repository.set_fields(project['_id'], {'region': 'Brest'})
+    assert not await repository.set_fields(ObjectId(), {'region': 'Brest'})
+    await repository.delete_by_id(project['_id'])
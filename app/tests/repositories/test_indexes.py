@@ -0,0 +1,87 @@
+import typing as tp
+
+from datetime import datetime
+
+import pytest
+
+from bson import ObjectId
+
+from app.config import settings
+from app.database import MongoManager
+from app.repositories import (
+    CompaniesRepository,
+    DeletionJobsRepository,
+    ParsersRepository,
+    ProjectsRepository,
+    SigningKeysRepository,
+    UsersRepository,
+)
+from app.repositories.users import normalize_email
+
+# query plans exist in mongo only
+pytestmark = pytest.mark.skipif(settings.STORAGE_BACKEND != 'mongo', reason='needs MongoDB')
+
+
+def _stages(plan: tp.Dict[str, tp.Any]) -> tp.Iterator[str]:
+    yield plan['stage']
+    for child in [plan.get('inputStage')] + plan.get('inputStages', []):
+        if child:
+            yield from _stages(child)
+
+
+async def assert_uses_index(collection: str, query: tp.Dict[str, tp.Any],
+                            sort: tp.Dict[str, int] | None = None) -> None:
+    """
+    Fail if the winning plan of the query scans the whole collection
+    """
+    command: tp.Dict[str, tp.Any] = {'find': collection, 'filter': query}
+    if sort:
+        command['sort'] = sort
+    explanation: tp.Dict[str, tp.Any] = await MongoManager.db.command('explain', command, verbosity='queryPlanner')
+    stages = list(_stages(explanation['queryPlanner']['winningPlan']))
+    assert 'COLLSCAN' not in stages, f'{collection} query {query} does a collection scan: {stages}'
+
+
+# every query the repositories run with its sort, keep in sync when adding repository methods
+REPOSITORY_QUERIES: tp.List[tp.Tuple[tp.Callable[[], tp.Any], tp.Dict[str, tp.Any], tp.Dict[str, int] | None]] = [
+    (UsersRepository, {'_id': ObjectId()}, None),
+    (UsersRepository, {'email_normalized': normalize_email('Some_Mail@mail.ru ')}, None),
+    (UsersRepository, {
+        'additional_info.enrichment': 'pending',
+        '$or': [{'enrichment_retry_at': {'$exists': False}}, {'enrichment_retry_at': {'$lte': datetime.utcnow()}}],
+    }, None),
+    # keyset listing and streaming of users
+    (UsersRepository, {}, {'_id': 1}),
+    (UsersRepository, {'_id': {'$gt': ObjectId()}}, {'_id': 1}),
+    (ProjectsRepository, {'_id': ObjectId(), 'owner': str(ObjectId())}, None),
+    (ProjectsRepository, {'owner': str(ObjectId())}, None),
+    (ProjectsRepository, {'owner': str(ObjectId()), 'name': 'project'}, None),
+    (ProjectsRepository, {'owner': str(ObjectId()), '_id': {'$gt': ObjectId()}}, {'_id': 1}),
+    (ParsersRepository, {'owner_id': ObjectId()}, None),
+    (SigningKeysRepository, {'expires_at': {'$gt': datetime.utcnow()}}, {'created_at': 1}),
+    (SigningKeysRepository, {'_id': 'rotation:ES256', 'locked_until': {'$lte': datetime.utcnow()}}, None),
+    (CompaniesRepository, {'_id': '7707083893'}, None),
+    (DeletionJobsRepository, {'user_id': str(ObjectId())}, None),
+    (DeletionJobsRepository, {'_id': ObjectId(), 'user_id': str(ObjectId())}, None),
+    (DeletionJobsRepository, {
+        'status': {'$in': ['pending', 'running']}, 'locked_until': {'$lte': datetime.utcnow()},
+    }, {'locked_until': 1}),
+]
+
+
+@pytest.mark.asyncio
+async def test_create_indexes_is_idempotent():
+    await MongoManager.create_indexes()
+    indexes = await MongoManager.db['projects'].index_information()
+    await MongoManager.create_indexes()
+
+    assert await MongoManager.db['projects'].index_information() == indexes
+    assert indexes['owner_name']['unique']
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('repository_class, query, sort', REPOSITORY_QUERIES)
+async def test_repository_queries_use_indexes(repository_class, query, sort):
+    await MongoManager.create_indexes()
+
+    await assert_uses_index(repository_class().collection, query, sort)
@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from bson import ObjectId
+from pymongo import ASCENDING, DeleteMany, DeleteOne, IndexModel, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.repositories import ProjectsRepository
+from app.repositories.memory import MemoryCollection
+from app.repositories.storage import MemoryStorage
+
+
+@pytest.mark.asyncio
+async def test_queries_and_updates():
+    collection = MemoryCollection('users')
+    now = datetime.utcnow()
+    await collection.insert_many([
+        {'email': 'a@mail.ru', 'info': {'inn': '1'}, 'retry_at': now - timedelta(minutes=1)},
+        {'email': 'b@mail.ru', 'info': {'inn': '2'}},
+        {'email': 'c@mail.ru', 'info': {'inn': '3'}, 'retry_at': now + timedelta(minutes=1)},
+    ])
+
+    due = await collection.find(
+        {'$or': [{'retry_at': {'$exists': False}}, {'retry_at': {'$lte': now}}]}, {'email': 1, '_id': 0}
+    ).sort('email', -1).to_list(length=None)
+    assert due == [{'email': 'b@mail.ru'}, {'email': 'a@mail.ru'}]
+
+    result = await collection.update_many({'info.inn': {'$in': ['1', '3']}}, {'$set': {'info.name': 'company'}})
+    assert (result.matched_count, result.modified_count) == (2, 2)
+    assert await collection.find_one({'info.name': 'company', 'email': 'c@mail.ru'}, {'info': 0}) is not None
+
+    job = await collection.find_one_and_update(
+        {'email': 'd@mail.ru'}, {'$setOnInsert': {'attempts': 0}, '$inc': {'runs': 1}},
+        upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    assert job['email'] == 'd@mail.ru' and job['attempts'] == 0 and job['runs'] == 1
+    assert (await collection.delete_many({'email': {'$ne': 'd@mail.ru'}})).deleted_count == 3
+
+
+@pytest.mark.asyncio
+async def test_unique_indexes_are_enforced():
+    collection = MemoryCollection('projects')
+    await collection.create_indexes([IndexModel([('owner', ASCENDING), ('name', ASCENDING)], unique=True)])
+    await collection.insert_one({'owner': '1', 'name': 'project'})
+
+    with pytest.raises(DuplicateKeyError):
+        await collection.insert_one({'owner': '1', 'name': 'project'})
+    with pytest.raises(BulkWriteError) as error:
+        await collection.bulk_write(
+            [UpdateOne({'owner': '2'}, {'$set': {'name': 'project'}}, upsert=True),
+             UpdateOne({'owner': '2'}, {'$set': {'owner': '1'}})],
+            ordered=False,
+        )
+    assert [write_error['index'] for write_error in error.value.details['writeErrors']] == [1]
+    assert await collection.find_one({'owner': '2'}) is not None
+
+
+@pytest.mark.asyncio
+async def test_repository_runs_on_memory_storage(monkeypatch):
+    monkeypatch.setattr(ProjectsRepository, 'storage', MemoryStorage())
+    repository = ProjectsRepository()
+    owner = str(ObjectId())
+    projects = [await repository.create({'name': f'project_{index}', 'owner': owner}) for index in range(5)]
+
+    page = await repository.get_all_projects(owner, projection={'name': 1}, after=projects[1]['_id'], limit=2)
+
+    assert page == [{'_id': project['_id'], 'name': project['name']} for project in projects[2:4]]
+    assert await repository.delete_batch({'owner': owner}, limit=3) == 3
+    assert len(await repository.get_all()) == 2
+
+
+# bulk_write reads the arguments of the pymongo operations from their private attributes,
+# one test per operation type catches a pymongo upgrade that renames them
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_one():
+    collection = MemoryCollection('projects')
+
+    result = await collection.bulk_write([InsertOne({'_id': 1, 'name': 'a'}), InsertOne({'name': 'b'})])
+
+    assert result.inserted_count == 2
+    assert await collection.find_one({'_id': 1}) == {'_id': 1, 'name': 'a'}
+    assert await collection.find_one({'name': 'b'}) is not None
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_one():
+    collection = MemoryCollection('projects')
+    await collection.insert_many([{'_id': 1, 'owner': '1'}, {'_id': 2, 'owner': '1'}])
+
+    result = await collection.bulk_write([
+        UpdateOne({'owner': '1'}, {'$set': {'name': 'a'}}),
+        UpdateOne({'owner': '2'}, {'$set': {'name': 'b'}}, upsert=True),
+    ])
+
+    assert (result.matched_count, result.modified_count, result.upserted_count) == (1, 1, 1)
+    assert len(await collection.find({'name': 'a'}).to_list()) == 1
+    assert await collection.find_one({'owner': '2', 'name': 'b'}) is not None
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_many():
+    collection = MemoryCollection('projects')
+    await collection.insert_many([{'_id': 1, 'owner': '1'}, {'_id': 2, 'owner': '1'}, {'_id': 3, 'owner': '2'}])
+
+    result = await collection.bulk_write([UpdateMany({'owner': '1'}, {'$set': {'name': 'a'}})])
+
+    assert (result.matched_count, result.modified_count) == (2, 2)
+    assert [document['_id'] for document in await collection.find({'name': 'a'}).to_list()] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_one():
+    collection = MemoryCollection('projects')
+    await collection.insert_many([{'_id': 1, 'owner': '1'}, {'_id': 2, 'owner': '1'}])
+
+    result = await collection.bulk_write([DeleteOne({'owner': '1'})])
+
+    assert result.deleted_count == 1
+    assert len(await collection.find({'owner': '1'}).to_list()) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_many():
+    collection = MemoryCollection('projects')
+    await collection.insert_many([{'_id': 1, 'owner': '1'}, {'_id': 2, 'owner': '1'}, {'_id': 3, 'owner': '2'}])
+
+    result = await collection.bulk_write([DeleteMany({'owner': '1'})])
+
+    assert result.deleted_count == 2
+    assert [document['_id'] for document in await collection.find().to_list()] == [3]
+
+
+def test_storage_is_isolated_per_test(storage):
+    assert isinstance(storage, MemoryStorage)
+    assert storage.collections == {}
+    storage.collection('projects').documents[1] = {'_id': 1}
+
+
+def test_storage_is_isolated_per_test_again(storage):
+    assert storage.collections == {}
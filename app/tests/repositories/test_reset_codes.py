@@ -0,0 +1,22 @@
+import pytest
+
+from app.repositories.reset_codes import MemoryResetCodesRepository
+
+
+@pytest.mark.asyncio
+async def test_reset_code_is_single_use():
+    reset_codes = MemoryResetCodesRepository()
+
+    assert await reset_codes.save('123456', 'some_user_id', expire=60)
+    assert not await reset_codes.save('123456', 'other_user_id', expire=60)
+    assert await reset_codes.consume('123456') == 'some_user_id'
+    assert await reset_codes.consume('123456') is None
+
+
+@pytest.mark.asyncio
+async def test_reset_code_expires():
+    reset_codes = MemoryResetCodesRepository()
+
+    assert await reset_codes.save('123456', 'some_user_id', expire=0)
+    assert await reset_codes.consume('123456') is None
+    assert not reset_codes.codes and not reset_codes.expirations
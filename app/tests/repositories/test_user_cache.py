@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from bson import ObjectId
+
+from app.config import settings
+from app.repositories.user_cache import UserCache
+
+
+@pytest.mark.asyncio
+async def test_fill_after_write_is_rejected():
+    user_cache = UserCache()
+    user_id = str(ObjectId())
+
+    missed = await user_cache.get(user_id)
+    assert missed.document is None
+    # a write lands between reading the document from mongo and storing it
+    await user_cache.invalidate(user_id)
+    await user_cache.fill(user_id, missed.version, {'_id': ObjectId(user_id), 'email': 'old@mail.ru'})
+    assert (await user_cache.get(user_id)).document is None
+
+    fresh = await user_cache.get(user_id)
+    await user_cache.fill(user_id, fresh.version, {'_id': ObjectId(user_id), 'email': 'new@mail.ru'})
+    assert (await user_cache.get(user_id)).document == {'_id': ObjectId(user_id), 'email': 'new@mail.ru'}
+
+
+@pytest_asyncio.fixture()
+async def listening():
+    await UserCache.start()
+    for _ in range(100):
+        if UserCache.subscribed:
+            break
+        await asyncio.sleep(0.01)
+    yield
+    await UserCache.close()
+
+
+async def unavailable(cls):
+    raise ConnectionError('redis is unavailable')
+
+
+@pytest.mark.asyncio
+async def test_local_entry_is_dropped_after_write_elsewhere_without_listener():
+    user_cache = UserCache()
+    user_id = str(ObjectId())
+    version = (await user_cache.get(user_id)).version
+    await user_cache.fill(user_id, version, {'_id': ObjectId(user_id), 'email': 'old@mail.ru'})
+    assert UserCache.local.get(user_id) is not None
+
+    # another process bumps the version in redis, the local copy here is still present
+    redis = await user_cache.get_connection()
+    await redis.hincrby(f'user_cache:{user_id}', 'version', 1)
+    await redis.hdel(f'user_cache:{user_id}', 'doc')
+
+    assert (await user_cache.get(user_id)).document is None
+    assert UserCache.local.get(user_id) is None
+
+
+@pytest.mark.asyncio
+async def test_failed_invalidation_is_retried(monkeypatch):
+    monkeypatch.setattr(UserCache, 'pending', set())
+    user_cache = UserCache()
+    user_id = str(ObjectId())
+    version = (await user_cache.get(user_id)).version
+    await user_cache.fill(user_id, version, {'_id': ObjectId(user_id), 'email': 'old@mail.ru'})
+
+    with monkeypatch.context() as outage:
+        outage.setattr(UserCache, 'get_connection', classmethod(unavailable))
+        await user_cache.invalidate(user_id)
+    assert UserCache.pending == {user_id}
+
+    # the first operation after the outage drops the old document
+    assert (await user_cache.get(str(ObjectId()))).document is None
+    assert UserCache.pending == set()
+    assert (await user_cache.get(user_id)).document is None
+
+
+@pytest.mark.asyncio
+async def test_document_is_served_for_bounded_time(monkeypatch):
+    user_cache = UserCache()
+    user_id = str(ObjectId())
+    version = (await user_cache.get(user_id)).version
+    await user_cache.fill(user_id, version, {'_id': ObjectId(user_id), 'email': 'old@mail.ru'})
+    UserCache.local.pop(user_id)
+
+    monkeypatch.setattr(settings, 'USER_CACHE_MAX_STALENESS', -1)
+    assert (await user_cache.get(user_id)).document is None
+
+
+@pytest.mark.asyncio
+async def test_local_hit_does_not_ask_redis(monkeypatch, listening):
+    user_cache = UserCache()
+    user_id = str(ObjectId())
+    version = (await user_cache.get(user_id)).version
+    await user_cache.fill(user_id, version, {'_id': ObjectId(user_id), 'email': 'old@mail.ru'})
+
+    monkeypatch.setattr(UserCache, 'get_connection', classmethod(unavailable))
+    assert (await user_cache.get(user_id)).document == {'_id': ObjectId(user_id), 'email': 'old@mail.ru'}
+
+
+@pytest.mark.asyncio
+async def test_local_entry_is_dropped_on_invalidation_elsewhere(listening):
+    user_cache = UserCache()
+    user_id = str(ObjectId())
+    version = (await user_cache.get(user_id)).version
+    await user_cache.fill(user_id, version, {'_id': ObjectId(user_id), 'email': 'old@mail.ru'})
+
+    # another process writes the user and publishes the invalidation
+    redis = await user_cache.get_connection()
+    await redis.hincrby(f'user_cache:{user_id}', 'version', 1)
+    await redis.hdel(f'user_cache:{user_id}', 'doc')
+    await redis.publish(UserCache.channel, user_id)
+    for _ in range(100):
+        if UserCache.local.get(user_id) is None:
+            break
+        await asyncio.sleep(0.01)
+
+    assert UserCache.local.get(user_id) is None
+    assert (await user_cache.get(user_id)).document is None
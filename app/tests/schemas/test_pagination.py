@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.schemas import BaseUserRead
+from app.schemas.pagination import cursor, next_cursor, stream_ndjson
+from app.schemas.projections import sparse_fields
+
+
+def test_next_cursor_is_set_for_full_pages_only():
+    page = [{'_id': ObjectId()} for _ in range(3)]
+
+    assert next_cursor(page, limit=3) == str(page[-1]['_id'])
+    assert next_cursor(page, limit=5) is None
+    assert next_cursor(page, limit=None) is None
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        cursor(after='not-an-id', limit=10)
+
+    assert error.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_stream_ndjson_writes_a_line_per_document():
+    ids = [ObjectId() for _ in range(3)]
+
+    async def documents():
+        for _id in ids:
+            yield {'_id': _id, 'email': f'{_id}@mail.ru'}
+
+    response = stream_ndjson(documents(), sparse_fields(BaseUserRead)(fields='email'))
+    lines = [line async for line in response.body_iterator]
+
+    assert response.media_type == 'application/x-ndjson'
+    assert [json.loads(line) for line in lines] == [{'email': f'{_id}@mail.ru'} for _id in ids]
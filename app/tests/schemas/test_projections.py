@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.schemas import BaseUserRead
+from app.schemas.projections import projection_for, sparse_fields
+
+
+def test_projection_follows_response_model():
+    projection = projection_for(BaseUserRead)
+
+    assert projection['_id'] == 1
+    assert 'email' in projection
+    assert 'password' not in projection
+
+
+def test_sparse_fields_render_only_requested_fields():
+    fields = sparse_fields(BaseUserRead)(fields='_id,email')
+    user_id = ObjectId()
+
+    assert fields.projection == {'_id': 1, 'email': 1}
+    response = fields.render({'_id': user_id, 'email': 'some_mail@mail.ru'})
+    assert json.loads(response.body) == {'_id': str(user_id), 'email': 'some_mail@mail.ru'}
+
+
+def test_sparse_fields_reject_unknown_field():
+    with pytest.raises(HTTPException) as error:
+        sparse_fields(BaseUserRead)(fields='email,password')
+
+    assert error.value.status_code == 400
+
+
+def test_without_fields_the_response_model_is_used():
+    fields = sparse_fields(BaseUserRead)(fields=None)
+    user = {'_id': ObjectId()}
+
+    assert fields.render(user) is user
+    assert fields.projection == projection_for(BaseUserRead)
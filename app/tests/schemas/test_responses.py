@@ -0,0 +1,60 @@
+import json
+
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+from app.enums import UserRole
+from app.schemas import BaseUserRead
+from app.schemas.projects import BaseProjectRead
+from app.schemas.projections import SparseFields
+from app.schemas.responses import ORJSONResponse
+
+USER = {
+    '_id': ObjectId(),
+    'email': 'some_mail@mail.ru',
+    'phone': '+375291234567',
+    'created_at': datetime(2023, 6, 1, 12, 30, 15, 123000),
+    'is_verified': True,
+    'role': UserRole.LEGAL_PERSON.value,
+    'additional_info': {'inn': '7707083893'},
+    'password': 'hash',
+}
+
+
+def test_response_renders_mongo_types():
+    project_id = ObjectId()
+    response = ORJSONResponse({'_id': project_id, 'role': UserRole.ADMIN, 'at': USER['created_at']})
+
+    assert json.loads(response.body) == {
+        '_id': str(project_id), 'role': UserRole.ADMIN.value, 'at': '2023-06-01T12:30:15.123000',
+    }
+
+
+def test_trusted_path_matches_validated_one():
+    validated = jsonable_encoder(BaseUserRead.parse_obj(USER), by_alias=True)
+
+    trusted = SparseFields(BaseUserRead, trusted=True).render([USER])
+
+    assert json.loads(trusted.body) == [validated]
+    assert validated['avatar_link'] is None
+
+
+def test_trusted_path_renders_avatar_url():
+    user = USER | {'avatar_link': 'media/avatar.png'}
+    validated = jsonable_encoder(BaseUserRead.parse_obj(user), by_alias=True)
+
+    trusted = SparseFields(BaseUserRead, trusted=True).render(user)
+
+    assert json.loads(trusted.body) == validated
+    assert validated['avatar_link'] == f'{settings.SERVICE_URL}/media/avatar.png/'
+
+
+def test_trusted_path_renders_requested_fields():
+    project = {'_id': ObjectId(), 'name': 'project', 'owner': str(ObjectId())}
+
+    response = SparseFields(BaseProjectRead, frozenset({'id', 'name'}), trusted=True).render(project)
+
+    assert json.loads(response.body) == {'_id': str(project['_id']), 'name': 'project'}
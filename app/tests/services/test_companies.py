@@ -0,0 +1,27 @@
+import json
+
+from app.services.companies import chunked, read_companies, registry_item
+from app.services.fns import company_info
+
+
+def test_read_csv_dump(tmp_path):
+    dump = tmp_path / 'companies.csv'
+    dump.write_text('inn,name,head,address\n7707083893,ПАО Сбербанк,Греф Герман Оскарович,г. Москва\n', encoding='utf-8')
+
+    companies = list(read_companies(str(dump), 'csv'))
+
+    assert [company['inn'] for company in companies] == ['7707083893']
+    assert company_info(companies[0]['items']) == {
+        'name': 'ПАО Сбербанк', 'head': 'Греф Герман Оскарович', 'address': 'г. Москва'
+    }
+
+
+def test_read_json_lines_dump(tmp_path):
+    dump = tmp_path / 'companies.json'
+    items = [registry_item(str(inn), 'name', 'head', 'address') for inn in range(5)]
+    dump.write_text('\n'.join(json.dumps(item, ensure_ascii=False) for item in items) + '\n', encoding='utf-8')
+
+    chunks = list(chunked(read_companies(str(dump), 'json'), size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[2][0] == {'inn': '4', 'items': [items[4]]}
@@ -0,0 +1,61 @@
+import pytest
+
+from bson import ObjectId
+
+from app.config import settings
+from app.services import deletion
+from app.services.deletion import CascadeDeletion
+
+
+class DependentsStub:
+    def __init__(self, count):
+        self.count = count
+        self.batches = []
+        self.write_concerns = []
+
+    async def delete_batch(self, query, limit, write_concern=None):
+        self.write_concerns.append(write_concern)
+        deleted = min(self.count, limit)
+        self.count -= deleted
+        self.batches.append(deleted)
+        return deleted
+
+
+class DeletionJobsRepositoryStub:
+    progress: list = []
+    finished: list = []
+
+    async def record_progress(self, _id, collection, deleted, lease):
+        self.progress.append((collection, deleted))
+
+    async def finish(self, _id):
+        self.finished.append(_id)
+
+
+class UsersRepositoryStub:
+    deleted: list = []
+
+    async def delete_by_id(self, _id):
+        self.deleted.append(_id)
+
+
+@pytest.mark.asyncio
+async def test_dependents_are_deleted_in_batches(monkeypatch):
+    user_id = str(ObjectId())
+    parsers, projects = DependentsStub(count=5), DependentsStub(count=0)
+    monkeypatch.setattr(settings, 'DELETION_BATCH_SIZE', 2)
+    monkeypatch.setattr(settings, 'DELETION_THROTTLE_MS', 0)
+    monkeypatch.setattr(deletion, '_dependents', lambda _: [('parsers', parsers, {}), ('projects', projects, {})])
+    monkeypatch.setattr(deletion, 'DeletionJobsRepository', DeletionJobsRepositoryStub)
+    monkeypatch.setattr(deletion, 'UsersRepository', UsersRepositoryStub)
+
+    await CascadeDeletion.run_job({'_id': 'job', 'user_id': user_id})
+
+    assert parsers.batches == [2, 2, 1]
+    # erasure is not downgraded to FAST_WRITES
+    assert parsers.write_concerns == [None, None, None]
+    assert projects.batches == [0]
+    assert DeletionJobsRepositoryStub.progress == [('parsers', 2), ('parsers', 2), ('parsers', 1)]
+    # the user document goes last, an interrupted job still finds it and is resumed
+    assert UsersRepositoryStub.deleted == [ObjectId(user_id)]
+    assert DeletionJobsRepositoryStub.finished == ['job']
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from aiosmtpd.controller import Controller
+
+from app.config import settings
+from app.services.emails import EmailOutbox, TemplateRegistry, open_html, send_mail
+
+
+class CollectingHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('rejected'):
+            return '550 No such user here'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return '250 Message accepted for delivery'
+
+
+@pytest.fixture
+def smtp_server(monkeypatch, unused_tcp_port):
+    handler = CollectingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=unused_tcp_port)
+    controller.start()
+    monkeypatch.setattr(settings, 'EMAIL_HOST', '127.0.0.1')
+    monkeypatch.setattr(settings, 'EMAIL_PORT', unused_tcp_port)
+    monkeypatch.setattr(settings, 'EMAIL_USE_SSL', False)
+    monkeypatch.setattr(settings, 'EMAIL_HOST_PASSWORD', '')
+    yield handler
+    controller.stop()
+
+
+@pytest.mark.asyncio
+async def test_send_mail_through_outbox(smtp_server):
+    sent = EmailOutbox.sent
+
+    for index in range(3):
+        await send_mail(email=f'user{index}@mail.ru', content='<p>code</p>')
+    await asyncio.wait_for(EmailOutbox.queue.join(), timeout=10)  # type: ignore
+
+    assert EmailOutbox.sent == sent + 3
+    assert sorted(envelope.rcpt_tos[0] for envelope in smtp_server.messages) == [
+        'user0@mail.ru', 'user1@mail.ru', 'user2@mail.ru'
+    ]
+    await EmailOutbox.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_email_does_not_block_the_worker(monkeypatch, smtp_server):
+    monkeypatch.setattr(settings, 'EMAIL_WORKERS', 1)
+    monkeypatch.setattr(settings, 'EMAIL_RETRY_BACKOFF', 60)
+    retries = EmailOutbox.retries
+
+    await send_mail(email='rejected@mail.ru', content='<p>code</p>')
+    await send_mail(email='user@mail.ru', content='<p>code</p>')
+    await asyncio.wait_for(EmailOutbox.queue.join(), timeout=10)  # type: ignore
+
+    # the retry waits for its backoff out of the queue
+    assert EmailOutbox.retries == retries + 1
+    assert len(EmailOutbox.delayed) == 1
+    assert [envelope.rcpt_tos for envelope in smtp_server.messages] == [['user@mail.ru']]
+    await EmailOutbox.close()
+    assert not EmailOutbox.delayed
+
+
+@pytest.mark.asyncio
+async def test_failed_email_is_retried(monkeypatch, smtp_server):
+    monkeypatch.setattr(settings, 'EMAIL_RETRY_BACKOFF', 0.01)
+    monkeypatch.setattr(settings, 'EMAIL_MAX_RETRIES', 2)
+    failed, retries = EmailOutbox.failed, EmailOutbox.retries
+
+    async def given_up():
+        while EmailOutbox.failed == failed:
+            await asyncio.sleep(0.01)
+
+    await send_mail(email='rejected@mail.ru', content='<p>code</p>')
+    await asyncio.wait_for(given_up(), timeout=10)
+
+    assert EmailOutbox.retries == retries + 2
+    await EmailOutbox.close()
+
+
+@pytest.mark.asyncio
+async def test_open_html_uses_locale_variant(monkeypatch):
+    TemplateRegistry.start()
+    monkeypatch.setattr(TemplateRegistry, 'available', TemplateRegistry.available | {'reset.en.html'})
+
+    assert TemplateRegistry.resolve('reset.html', locale='en') == 'reset.en.html'
+    assert TemplateRegistry.resolve('reset.html', locale='de') == 'reset.html'
+
+    content = await open_html('user@mail.ru', 'first_name', '012345', action=False)
+    assert '012345' in content
+    assert TemplateRegistry.metrics()['reset.html']['count'] >= 1
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.repositories import UsersRepository
+from app.services.enrichment import CompanyEnrichment
+from app.services.fns import FnsClient
+
+REGISTRY_ITEMS = [{
+    'ЮЛ': {
+        'НаимСокрЮЛ': 'ООО "Ромашка"',
+        'Руководитель': {'ФИОПолн': 'Иванов Иван Иванович'},
+        'Адрес': {'АдресПолн': 'г. Москва'},
+    }
+}]
+
+
+class UsersRepositoryStub:
+    def __init__(self):
+        self.updates = []
+
+    async def update_enrichment(self, _id, status, fields=None, attempts=0, retry_at=None):
+        self.updates.append({'status': status, 'fields': fields, 'attempts': attempts, 'retry_at': retry_at})
+
+
+@pytest.mark.asyncio
+async def test_enrichment_patches_company_details(monkeypatch):
+    async def find_companies(cls, tin):
+        return REGISTRY_ITEMS
+
+    monkeypatch.setattr(FnsClient, 'find_companies', classmethod(find_companies))
+    repository = UsersRepositoryStub()
+
+    await CompanyEnrichment._enrich(repository, {'_id': 'id', 'additional_info': {'inn': '7707083893'}})
+
+    assert repository.updates == [{
+        'status': 'done',
+        'fields': {'name': 'ООО "Ромашка"', 'head': 'Иванов Иван Иванович', 'address': 'г. Москва'},
+        'attempts': 1,
+        'retry_at': None,
+    }]
+
+
+@pytest.mark.asyncio
+async def test_enrichment_keeps_values_entered_by_user(monkeypatch):
+    async def find_companies(cls, tin):
+        return REGISTRY_ITEMS
+
+    monkeypatch.setattr(FnsClient, 'find_companies', classmethod(find_companies))
+    repository = UsersRepositoryStub()
+    additional_info = {'inn': '7707083893', 'name': 'Ромашка', 'head': None}
+
+    await CompanyEnrichment._enrich(repository, {'_id': 'id', 'additional_info': additional_info})
+
+    assert repository.updates[0]['fields'] == {'head': 'Иванов Иван Иванович', 'address': 'г. Москва'}
+
+
+@pytest.mark.asyncio
+async def test_pending_users_are_claimed_once():
+    repository = UsersRepository()
+    for index in range(3):
+        await repository.create({
+            'email': f'legal_{index}@mail.ru', 'additional_info': {'inn': str(index), 'enrichment': 'pending'}
+        })
+
+    first, second = await asyncio.gather(
+        repository.claim_pending_enrichment(limit=2, lease=60),
+        repository.claim_pending_enrichment(limit=2, lease=60),
+    )
+
+    claimed = [user['additional_info']['inn'] for user in first + second]
+    assert sorted(claimed) == ['0', '1', '2']
+    assert await repository.claim_pending_enrichment(limit=2, lease=60) == []
+
+
+@pytest.mark.asyncio
+async def test_enrichment_failures_are_retried_then_given_up(monkeypatch):
+    async def find_companies(cls, tin):
+        raise HTTPException(status_code=504)
+
+    monkeypatch.setattr(FnsClient, 'find_companies', classmethod(find_companies))
+    repository = UsersRepositoryStub()
+    user = {'_id': 'id', 'additional_info': {'inn': '7707083893'}}
+
+    await CompanyEnrichment._enrich(repository, user)
+    await CompanyEnrichment._enrich(repository, user | {'enrichment_attempts': settings.ENRICHMENT_MAX_ATTEMPTS - 1})
+
+    assert [update['status'] for update in repository.updates] == ['pending', 'failed']
+    assert all(update['retry_at'] is not None for update in repository.updates)
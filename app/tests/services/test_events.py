@@ -0,0 +1,51 @@
+import json
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.database.rabbit_mq import MemoryBroker, RabbitManager
+from app.services.events import publish_event
+
+
+@pytest.mark.asyncio
+async def test_events_are_published_in_batches(monkeypatch):
+    monkeypatch.setattr(settings, 'EVENT_LINGER_MS', 50)
+    broker = MemoryBroker()
+    await RabbitManager.connect(broker=broker)
+    try:
+        for index in range(5):
+            publish_event('project.created', {'project_id': str(index)})
+    finally:
+        await RabbitManager.close()
+
+    assert len(broker.batches) == 1
+    assert [json.loads(message.body)['data']['project_id'] for message in broker.messages] == list('01234')
+    assert {message.routing_key for message in broker.messages} == {'project.created'}
+
+
+@pytest.mark.asyncio
+async def test_close_publishes_the_lingering_batch(monkeypatch):
+    monkeypatch.setattr(settings, 'EVENT_LINGER_MS', 200)
+    broker = MemoryBroker()
+    await RabbitManager.connect(broker=broker)
+    dropped = RabbitManager.dropped
+    try:
+        publish_event('user.created', {'user_id': '0'})
+        # the worker takes the first event off the queue and lingers for the rest
+        await asyncio.sleep(0.05)
+        assert RabbitManager.queue.empty()
+        for index in range(1, 3):
+            publish_event('user.created', {'user_id': str(index)})
+    finally:
+        await RabbitManager.close()
+
+    assert [json.loads(message.body)['data']['user_id'] for message in broker.messages] == list('012')
+    assert RabbitManager.dropped == dropped
+    assert RabbitManager.task is None
+
+
+def test_publish_without_broker_is_noop():
+    publish_event('user.created', {'user_id': 'id'})
+
+    assert RabbitManager.queue is None
@@ -0,0 +1,164 @@
+import asyncio
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from aiohttp import web
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.fns import FnsClient
+from app.utils.cache import TTLCache
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.metrics import TimingStats
+
+
+@pytest.fixture
+def mirror(monkeypatch):
+    companies = {}
+
+    async def read_mirror(cls, tin):
+        return companies.get(tin)
+
+    async def write_mirror(cls, tin, items):
+        companies[tin] = {'_id': tin, 'items': items, 'source': 'live', 'updated_at': datetime.utcnow()}
+
+    monkeypatch.setattr(FnsClient, '_read_mirror', classmethod(read_mirror))
+    monkeypatch.setattr(FnsClient, '_write_mirror', classmethod(write_mirror))
+    return companies
+
+
+@pytest.fixture
+def fns_client(monkeypatch, mirror):
+    calls = []
+
+    async def fetch(cls, tin):
+        calls.append(tin)
+        await asyncio.sleep(0.01)
+        return [{'ЮЛ': {'ИНН': tin}}] if tin == '7707083893' else []
+
+    async def unavailable(cls):
+        raise ConnectionError('redis is unavailable')
+
+    monkeypatch.setattr(FnsClient, 'cache', TTLCache(maxsize=10))
+    monkeypatch.setattr(FnsClient, '_fetch', classmethod(fetch))
+    monkeypatch.setattr(FnsClient, 'get_connection', classmethod(unavailable))
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_upstream_call(fns_client):
+    results = await asyncio.gather(*(FnsClient.find_companies('7707083893') for _ in range(10)))
+
+    assert fns_client == ['7707083893']
+    assert all(result == results[0] for result in results)
+    assert FnsClient.in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_lookup_results_are_cached(fns_client):
+    assert await FnsClient.find_companies('000') == []
+    assert await FnsClient.find_companies('000') == []
+    assert await FnsClient.find_companies('7707083893')
+    assert await FnsClient.find_companies('7707083893')
+
+    assert fns_client == ['000', '7707083893']
+
+
+@pytest.mark.asyncio
+async def test_fresh_mirror_answers_without_upstream(fns_client, mirror):
+    mirror['7707083893'] = {'items': [{'ЮЛ': {}}], 'updated_at': datetime.utcnow()}
+    mirror['000'] = {'items': [{'ЮЛ': {}}], 'updated_at': datetime.utcnow() - timedelta(days=365)}
+
+    assert await FnsClient.find_companies('7707083893') == [{'ЮЛ': {}}]
+    # a stale entry is refreshed from upstream
+    assert await FnsClient.find_companies('000') == []
+    assert fns_client == ['000']
+
+
+@pytest_asyncio.fixture
+async def fns_stub(monkeypatch, unused_tcp_port, mirror):
+    """
+    Local registry stub, every request takes the next (delay, status) from stub['responses']
+    """
+    stub = {'responses': [], 'requests': 0}
+    released = asyncio.Event()
+
+    async def egr(request):
+        delay, status = stub['responses'][min(stub['requests'], len(stub['responses']) - 1)]
+        stub['requests'] += 1
+        try:
+            await asyncio.wait_for(released.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        return web.json_response({'items': [{'ЮЛ': {'ИНН': request.query['req']}}]}, status=status)
+
+    application = web.Application()
+    application.router.add_get('/api/egr', egr)
+    runner = web.AppRunner(application)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', unused_tcp_port).start()
+
+    async def unavailable(cls):
+        raise ConnectionError('redis is unavailable')
+
+    monkeypatch.setattr(settings, 'API_FNS_URL', f'http://127.0.0.1:{unused_tcp_port}/api/egr')
+    monkeypatch.setattr(settings, 'FNS_DEADLINE', 0.5)
+    monkeypatch.setattr(FnsClient, 'get_connection', classmethod(unavailable))
+    monkeypatch.setattr(FnsClient, 'cache', TTLCache(maxsize=10))
+    monkeypatch.setattr(FnsClient, 'breaker', CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    monkeypatch.setattr(FnsClient, 'stats', TimingStats())
+    monkeypatch.setattr(FnsClient, 'session', None)
+    yield stub
+    released.set()
+    await asyncio.sleep(0.01)
+    await FnsClient.close()
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_slow_registry_hits_deadline(fns_stub):
+    fns_stub['responses'] = [(2, 200)]
+
+    with pytest.raises(HTTPException) as error:
+        await FnsClient.find_companies('1')
+
+    assert error.value.status_code == 504
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast(fns_stub):
+    fns_stub['responses'] = [(0, 500)]
+
+    for tin in ('1', '2'):
+        with pytest.raises(HTTPException) as error:
+            await FnsClient.find_companies(tin)
+        assert error.value.status_code == 502
+    with pytest.raises(HTTPException) as error:
+        await FnsClient.find_companies('3')
+
+    assert error.value.status_code == 503
+    assert fns_stub['requests'] == 2
+    assert FnsClient.metrics()['circuit_breaker']['state'] == CircuitBreaker.OPEN
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged(monkeypatch, fns_stub):
+    monkeypatch.setattr(settings, 'FNS_HEDGE', True)
+    monkeypatch.setattr(settings, 'FNS_HEDGE_MIN_SAMPLES', 0)
+    monkeypatch.setattr(settings, 'FNS_HEDGE_MIN_DELAY', 20)
+    fns_stub['responses'] = [(2, 200), (0, 200)]
+
+    assert await FnsClient.find_companies('1') == [{'ЮЛ': {'ИНН': '1'}}]
+    assert fns_stub['requests'] == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_mirror_is_served_while_registry_is_down(fns_stub, mirror):
+    fns_stub['responses'] = [(0, 500)]
+    mirror['1'] = {'items': [{'ЮЛ': {'ИНН': '1'}}], 'updated_at': datetime.utcnow() - timedelta(days=365)}
+
+    assert await FnsClient.find_companies('1') == [{'ЮЛ': {'ИНН': '1'}}]
+    assert FnsClient.cache.get('1') is None
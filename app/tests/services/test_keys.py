@@ -0,0 +1,112 @@
+import jwt
+import pytest
+
+from datetime import datetime, timedelta
+
+from cryptography.hazmat.primitives import serialization
+
+from app.config import settings
+from app.repositories import SigningKeysRepository
+from app.services.keys import SigningKeys
+from app.services.tokens import create_token, decode_token
+
+
+def use_algorithm(monkeypatch, algorithm: str) -> None:
+    monkeypatch.setattr(settings, 'JWT_ALGORITHM', algorithm)
+    monkeypatch.setattr(SigningKeys, 'algorithm', algorithm)
+    monkeypatch.setattr(SigningKeys, 'symmetric', False)
+    monkeypatch.setattr(SigningKeys, 'keys', {})
+    monkeypatch.setattr(SigningKeys, 'loaded_at', 0.0)
+    monkeypatch.setattr(SigningKeys, 'lock', None)
+
+
+@pytest.fixture
+def asymmetric(monkeypatch):
+    use_algorithm(monkeypatch, 'ES256')
+    monkeypatch.setattr(settings, 'JWKS_MAX_AGE', 0)
+    monkeypatch.setattr(settings, 'JWT_KEY_MIN_RELOAD_INTERVAL', 0)
+
+
+async def stored_keys() -> list:
+    return await SigningKeysRepository().get_valid_keys(now=datetime.utcnow())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('algorithm', ['RS256', 'PS256', 'ES256', 'ES384', 'ES512', 'EdDSA'])
+async def test_sign_and_verify(monkeypatch, algorithm):
+    use_algorithm(monkeypatch, algorithm)
+
+    token = await create_token(token_type='access', user_id='user')
+    kid, payload = await decode_token(token)
+
+    assert jwt.get_unverified_header(token) == {'alg': algorithm, 'kid': kid, 'typ': 'JWT'}
+    assert payload['id'] == 'user'
+    # the private key is kept encrypted with SECRET_KEY
+    [document] = await stored_keys()
+    assert document['_id'] == kid
+    assert 'ENCRYPTED PRIVATE KEY' in document['private_key']
+    with pytest.raises(TypeError):
+        serialization.load_pem_private_key(document['private_key'].encode(), password=None)
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_is_rejected(asymmetric):
+    token = await create_token(token_type='access', user_id='user')
+    header = jwt.get_unverified_header(token)
+    forged = jwt.encode({'id': 'user'}, 'secret', algorithm='HS256', headers={'kid': 'unknown'})
+
+    with pytest.raises(jwt.InvalidTokenError):
+        await decode_token(forged)
+    assert SigningKeys.is_known(header['kid'])
+    assert not SigningKeys.is_known('unknown')
+
+
+@pytest.mark.asyncio
+async def test_rotation_keeps_retired_key_verifiable(monkeypatch, asymmetric):
+    old_token = await create_token(token_type='access', user_id='user')
+    old_kid = jwt.get_unverified_header(old_token)['kid']
+
+    monkeypatch.setattr(settings, 'JWT_KEY_ROTATION_INTERVAL', 0)
+    await SigningKeys.rotate_if_due()
+    new_token = await create_token(token_type='access', user_id='user')
+    new_kid = jwt.get_unverified_header(new_token)['kid']
+
+    assert new_kid != old_kid
+    # a replica that has not loaded the keys yet verifies both
+    monkeypatch.setattr(SigningKeys, 'keys', {})
+    assert (await decode_token(old_token))[0] == old_kid
+    assert (await decode_token(new_token))[0] == new_kid
+
+    await SigningKeysRepository().set_fields(old_kid, {'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    monkeypatch.setattr(SigningKeys, 'keys', {})
+    with pytest.raises(jwt.InvalidTokenError):
+        await decode_token(old_token)
+
+
+@pytest.mark.asyncio
+async def test_rotation_waits_for_lease_of_another_replica(monkeypatch, asymmetric):
+    await SigningKeys.rotate_if_due()
+    monkeypatch.setattr(settings, 'JWT_KEY_ROTATION_INTERVAL', 0)
+    repository = SigningKeysRepository()
+    assert await repository.acquire_rotation_lease('ES256', 'other replica', lease=60)
+
+    await SigningKeys.rotate_if_due()
+    assert len(await stored_keys()) == 1
+
+    await repository.release_rotation_lease('ES256', 'other replica')
+    await SigningKeys.rotate_if_due()
+    assert len(await stored_keys()) == 2
+
+
+@pytest.mark.asyncio
+async def test_jwks_lists_public_keys(monkeypatch, asymmetric):
+    await SigningKeys.rotate_if_due()
+    monkeypatch.setattr(settings, 'JWT_KEY_ROTATION_INTERVAL', 0)
+    await SigningKeys.rotate_if_due()
+
+    jwks = await SigningKeys.jwks()
+
+    assert {key['kid'] for key in jwks['keys']} == {document['_id'] for document in await stored_keys()}
+    for key in jwks['keys']:
+        assert key['alg'] == 'ES256' and key['use'] == 'sig' and key['kty'] == 'EC'
+        assert 'd' not in key
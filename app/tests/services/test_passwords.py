@@ -0,0 +1,24 @@
+import pytest
+
+from fastapi import HTTPException
+
+from app.services.passwords import PasswordHasher
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_password():
+    hashed = await PasswordHasher.hash('some_password')
+
+    assert await PasswordHasher.verify('some_password', hashed)
+    assert not await PasswordHasher.verify('other_password', hashed)
+    assert PasswordHasher.metrics()['verify']['count'] >= 2
+
+
+@pytest.mark.asyncio
+async def test_hash_password_rejected_when_queue_is_full(monkeypatch):
+    monkeypatch.setattr(PasswordHasher, 'in_flight', PasswordHasher.workers + PasswordHasher.queue_size)
+
+    with pytest.raises(HTTPException) as error:
+        await PasswordHasher.hash('some_password')
+
+    assert error.value.status_code == 503
@@ -0,0 +1,52 @@
+import ipaddress
+
+import pytest
+
+from fastapi import HTTPException
+
+from app.services import rate_limit
+from app.services.rate_limit import RateLimit, RateLimiter, check_rate_limit, client_ip
+
+
+@pytest.mark.asyncio
+async def test_local_bucket_rejects_without_redis(monkeypatch):
+    async def unavailable(cls):
+        raise ConnectionError('redis is unavailable')
+
+    monkeypatch.setitem(rate_limit.RATE_LIMITS, 'test', {'ip': RateLimit(limit=2, window=60)})
+    monkeypatch.setattr(RateLimiter, 'get_connection', classmethod(unavailable))
+
+    await check_rate_limit('test', ip='10.0.0.1')
+    await check_rate_limit('test', ip='10.0.0.1')
+    with pytest.raises(HTTPException) as error:
+        await check_rate_limit('test', ip='10.0.0.1')
+
+    assert error.value.status_code == 429
+    assert int(error.value.headers['Retry-After']) > 0
+    await check_rate_limit('test', ip='10.0.0.2')
+
+
+@pytest.mark.asyncio
+async def test_failures_fail_open_without_redis(monkeypatch):
+    async def unavailable(cls):
+        raise ConnectionError('redis is unavailable')
+
+    monkeypatch.setattr(RateLimiter, 'get_connection', classmethod(unavailable))
+
+    await RateLimiter().register_failure('test', '10.0.0.3')
+    await RateLimiter().check_lockout('test', '10.0.0.3')
+
+
+def test_client_ip_behind_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(rate_limit, 'TRUSTED_PROXIES', [ipaddress.ip_network('10.1.0.0/16')])
+
+    assert client_ip('10.1.0.5', '203.0.113.7, 10.1.0.9') == '203.0.113.7'
+    # everything left of the first untrusted hop is written by the client
+    assert client_ip('10.1.0.5', '198.51.100.1, 203.0.113.7') == '203.0.113.7'
+    assert client_ip('203.0.113.7', '198.51.100.1') == '203.0.113.7'
+    assert client_ip('10.1.0.5', None) == '10.1.0.5'
+    assert client_ip(None) == 'unknown'
+
+
+def test_parse_rate_limit():
+    assert RateLimit.parse('10/60') == RateLimit(limit=10, window=60)
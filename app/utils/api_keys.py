@@ -0,0 +1,14 @@
+import hmac
+import typing as tp
+
+
+def parse_api_keys(keys: str) -> tp.List[bytes]:
+    """
+    Comma-separated API keys of a setting, an empty setting gives no keys
+    """
+    return [key.strip().encode() for key in keys.split(',') if key.strip()]
+
+
+def api_key_matches(api_key: str, keys: tp.Sequence[bytes]) -> bool:
+    # every key is compared in constant time, the result does not tell how much of a key matched
+    return any([hmac.compare_digest(api_key.encode(), key) for key in keys])
@@ -0,0 +1,54 @@
+import time
+import typing as tp
+
+from collections import deque
+from contextlib import contextmanager
+
+
+class TimingStats:
+    """
+    Counters and latency samples for a single operation (calls, errors, total/max time)
+    """
+
+    def __init__(self, samples: int = 1024):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._samples: tp.Deque[float] = deque(maxlen=samples)
+
+    def observe(self, elapsed_ms: float, failed: bool = False) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self._samples.append(elapsed_ms)
+        if failed:
+            self.errors += 1
+
+    @contextmanager
+    def measure(self) -> tp.Iterator[None]:
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.observe((time.perf_counter() - started) * 1000, failed=failed)
+
+    def percentile(self, quantile: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(quantile * len(ordered)))
+        return ordered[index]
+
+    def as_dict(self) -> tp.Dict[str, tp.Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'p95_ms': self.percentile(0.95),
+        }
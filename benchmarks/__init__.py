@@ -0,0 +1,24 @@
+"""
+Microbenchmarks, run as modules from the repository root, e.g. `python -m benchmarks.auth_middleware`.
+Required settings get dummy defaults, so the benchmarks do not need a configured .env
+"""
+import os
+
+for name, value in {
+    'MONGO_URI': 'mongodb://localhost:27017',
+    'DB_NAME': 'benchmarks',
+    'SERVICE_URL': 'http://localhost:8000',
+    'PARSER_COLLECTION_NAME': 'parsers',
+    'SECRET_KEY': 'benchmark-secret',
+    'JWT_ALGORITHM': 'HS256',
+    'REDIS_HOST': 'localhost',
+    'REDIS_PORT': '6379',
+    'EMAIL_HOST_USER': 'benchmark@localhost',
+    'EMAIL_HOST_PASSWORD': 'benchmark',
+    'EMAIL_HOST': 'localhost',
+    'API_FNS_KEY': 'benchmark',
+    'TOKEN_INTROSPECTION_API_KEYS': 'benchmark',
+    # repositories keep documents in process, results do not depend on a database server
+    'STORAGE_BACKEND': 'memory',
+}.items():
+    os.environ.setdefault(name, value)
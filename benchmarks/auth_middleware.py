@@ -0,0 +1,78 @@
+"""
+Per-request overhead of the auth middleware: the previous BaseHTTPMiddleware implementation
+against the pure ASGI ApiKeyMiddleware, measured around a no-op endpoint
+"""
+import asyncio
+import json
+import time
+import typing as tp
+
+import benchmarks  # noqa: F401
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+
+from app.middlewares.auth_middleware import ApiKeyMiddleware, authenticate
+from app.services import create_token
+
+REQUESTS = 10000
+
+
+class LegacyApiKeyMiddleware(BaseHTTPMiddleware):
+    authorize_paths = [
+        '/api/v1/users/me/',
+        '/api/v1/media/me/avatar/'
+    ]
+
+    async def dispatch(self, request: Request, call_next: tp.Any) -> tp.Any:
+        if request.url.path in self.authorize_paths and request.method != 'OPTIONS':
+            is_valid, error_message = await authenticate(request=request)
+            if not is_valid:
+                return Response(content=json.dumps(error_message), status_code=401)
+        else:
+            request.state.user_id = "1"
+        return await call_next(request)
+
+
+async def endpoint(scope, receive, send):
+    await PlainTextResponse('ok')(scope, receive, send)
+
+
+async def run(app, path: str, headers: tp.List[tp.Tuple[bytes, bytes]]) -> float:
+    async def send(message):
+        pass
+
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+        'headers': headers, 'scheme': 'http', 'server': ('testserver', 80), 'root_path': '',
+    }
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        messages = iter([{'type': 'http.request', 'body': b'', 'more_body': False}])
+
+        async def receive():
+            # like a real server: the request body, then a disconnect once the response is sent
+            return next(messages, {'type': 'http.disconnect'})
+
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / REQUESTS * 1_000_000
+
+
+async def main():
+    token = await create_token(token_type='access', user_id='benchmark')
+    headers = [(b'authorization', f'Bearer {token}'.encode())]
+    cases = [
+        ('public path', '/api/v1/users/login/', []),
+        ('authenticated path', '/api/v1/users/me/', headers),
+    ]
+
+    baseline = await run(endpoint, '/', [])
+    print(f'no middleware: {baseline:8.2f} us/request')
+    for name, path, case_headers in cases:
+        legacy = await run(LegacyApiKeyMiddleware(endpoint), path, case_headers)
+        current = await run(ApiKeyMiddleware(endpoint), path, case_headers)
+        print(f'{name:>20}: BaseHTTPMiddleware {legacy - baseline:8.2f} us, ASGI {current - baseline:8.2f} us overhead')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""
+Serialization cost of the list endpoints per response: FastAPI's response_model path rendered by the stdlib
+JSONResponse (before), the same path rendered by ORJSONResponse, and the trusted path for documents read from
+our own database
+"""
+import asyncio
+import time
+import typing as tp
+
+from datetime import datetime
+
+import benchmarks  # noqa: F401
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.enums import UserRole
+from app.schemas import BaseUserRead
+from app.schemas.projects import BaseProjectRead
+from app.schemas.projections import SparseFields
+from app.schemas.responses import ORJSONResponse
+
+PAGE_SIZES = (1, 100, 1000)
+ROUNDS = 20
+
+
+def user(index: int) -> dict:
+    return {
+        '_id': ObjectId(),
+        'email': f'user_{index}@mail.ru',
+        'phone': '+375291234567',
+        'created_at': datetime.utcnow(),
+        'is_verified': True,
+        'role': UserRole.LEGAL_PERSON.value,
+        'additional_info': {'first_name': 'first_name', 'last_name': 'last_name', 'inn': '7707083893'},
+        'avatar_link': f'media/{index}.png',
+    }
+
+
+def project(index: int) -> dict:
+    return {
+        '_id': ObjectId(),
+        'name': f'project_{index}',
+        'owner': str(ObjectId()),
+        'created_at': datetime.utcnow(),
+        'members': ['member@mail.ru'] * 3,
+        'sites': ['https://example.com'],
+        'activity_types': ['retail'],
+        'country': 'Belarus',
+        'region': 'Minsk',
+        'social_networks': ['https://instagram.com/example'],
+    }
+
+
+ENDPOINTS: tp.Dict[str, tp.Tuple[tp.Any, tp.Callable[[int], dict]]] = {
+    'GET /users/': (BaseUserRead, user),
+    'GET /projects/get_projects/': (BaseProjectRead, project),
+}
+
+
+async def measure(render: tp.Callable[[tp.List[dict]], tp.Awaitable[bytes]], documents: tp.List[dict]) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await render(documents)
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+
+async def main():
+    for endpoint, (model, document) in ENDPOINTS.items():
+        field = create_response_field(name=f'Response_{model.__name__}', type_=tp.List[model])
+
+        async def validated(documents: tp.List[dict], response_class: tp.Type[JSONResponse]) -> bytes:
+            content = await serialize_response(field=field, response_content=documents, is_coroutine=True)
+            return response_class(content).body
+
+        async def with_json(documents: tp.List[dict]) -> bytes:
+            return await validated(documents, JSONResponse)
+
+        async def with_orjson(documents: tp.List[dict]) -> bytes:
+            return await validated(documents, ORJSONResponse)
+
+        async def trusted(documents: tp.List[dict]) -> bytes:
+            return SparseFields(model, trusted=True).render(documents).body
+
+        print(endpoint)
+        for page_size in PAGE_SIZES:
+            documents = [document(index) for index in range(page_size)]
+            before, after, fast = [await measure(render, documents) for render in (with_json, with_orjson, trusted)]
+            print(f'  page {page_size:>5}: json {before:9.3f} ms, orjson {after:9.3f} ms, '
+                  f'trusted {fast:9.3f} ms ({before / fast:5.1f}x)')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
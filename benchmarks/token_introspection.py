@@ -0,0 +1,43 @@
+"""
+Throughput of POST /api/v1/tokens/introspect at different batch sizes, for tokens seen for the first time(cold)
+and for tokens already in the verified-token cache(warm)
+"""
+import asyncio
+import time
+
+import benchmarks  # noqa: F401
+from httpx import AsyncClient
+
+from app.main import app
+from app.services import create_token
+from app.services.tokens import forget_all_tokens
+
+BATCH_SIZES = (1, 10, 100, 1000)
+TOKENS_PER_CASE = 5000
+
+
+async def measure(client: AsyncClient, tokens: list, batch_size: int, warm: bool) -> float:
+    if not warm:
+        forget_all_tokens()
+    started = time.perf_counter()
+    for offset in range(0, len(tokens), batch_size):
+        response = await client.post(
+            '/api/v1/tokens/introspect',
+            json={'tokens': tokens[offset:offset + batch_size]},
+            headers={'X-Api-Key': 'benchmark'},
+        )
+        assert response.status_code == 200, response.text
+    return len(tokens) / (time.perf_counter() - started)
+
+
+async def main():
+    tokens = [await create_token(token_type='access', user_id=str(index)) for index in range(TOKENS_PER_CASE)]
+    async with AsyncClient(app=app, base_url='http://testserver') as client:
+        for batch_size in BATCH_SIZES:
+            cold = await measure(client, tokens, batch_size, warm=False)
+            warm = await measure(client, tokens, batch_size, warm=True)
+            print(f'batch {batch_size:>5}: cold {cold:10.0f} tokens/s, warm {warm:10.0f} tokens/s')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())